@@ -0,0 +1,230 @@
+# backend/access_events.py
+# GET /api/access-events: Server-Sent Events com o status de user_access do
+# usuário do token. O front abre uma conexão e recebe o status atual e cada
+# mudança (ativação, expiração), em vez de chamar /api/user-status a cada load.
+#
+# Fan-out num hub por processo: email -> assinantes. Cada conexão custa um
+# objeto com __slots__, um asyncio.Event e o gerador da resposta; ninguém tem
+# fila (só o último status importa) nem timer próprio: um único loop acorda
+# todos para o heartbeat.
+#
+# De onde vêm as mudanças:
+#   - AccessIndex (ACCESS_INDEX=1): cada sync/recarga/webhook repassa as linhas
+#   - sem índice fresco: um poll por processo, só dos emails com assinantes,
+#     em lotes `in` (uma consulta por lote, não uma por cliente)
+#   - webhook POST /api/user-access/invalidate, com ou sem índice
+#
+# Fora de ADMISSION_PREFIXES de propósito: uma conexão longa não pode ocupar
+# vaga do limite de requisições em voo. No deploy, rode o uvicorn com
+# --timeout-graceful-shutdown: senão o shutdown espera os streams abertos.
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from access_index import add_change_listener, get_access_index
+from auth import get_token_email, get_user_access
+from db import execute, get_client
+from metrics import gauge_lines, register_collector
+from resilience import SupabaseUnavailable
+
+log = logging.getLogger("mandala5")
+
+ACCESS_EVENTS_HEARTBEAT = float(os.getenv("ACCESS_EVENTS_HEARTBEAT", "20"))
+ACCESS_EVENTS_POLL = float(os.getenv("ACCESS_EVENTS_POLL", "15"))
+ACCESS_EVENTS_POLL_CHUNK = int(os.getenv("ACCESS_EVENTS_POLL_CHUNK", "150"))
+ACCESS_EVENTS_MAX = int(os.getenv("ACCESS_EVENTS_MAX", "20000"))
+ACCESS_EVENTS_MAX_PER_USER = int(os.getenv("ACCESS_EVENTS_MAX_PER_USER", "10"))
+# Espera sugerida ao EventSource antes de reconectar
+ACCESS_EVENTS_RETRY_MS = int(os.getenv("ACCESS_EVENTS_RETRY_MS", "5000"))
+
+router = APIRouter()
+
+def status_of(row: Optional[dict]) -> str:
+    return (row or {}).get("status") or "none"
+
+def _event(status: str) -> str:
+    return f"event: status\ndata: {json.dumps({'status': status})}\n\n"
+
+class Subscriber:
+    __slots__ = ("email", "pending", "wake")
+
+    def __init__(self, email: str):
+        self.email = email
+        # Status ainda não enviado; None = só heartbeat
+        self.pending: Optional[str] = None
+        self.wake = asyncio.Event()
+
+class AccessEventHub:
+    def __init__(
+        self,
+        heartbeat: float = ACCESS_EVENTS_HEARTBEAT,
+        poll_interval: float = ACCESS_EVENTS_POLL,
+        max_subscribers: int = ACCESS_EVENTS_MAX,
+        max_per_user: int = ACCESS_EVENTS_MAX_PER_USER,
+    ):
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.max_per_user = max_per_user
+        self._subs: Dict[str, Set[Subscriber]] = {}
+        # Último status publicado por email assinado: só mudança real vira evento
+        self._last: Dict[str, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.polls = 0
+        self.poll_errors = 0
+
+    # ---------- ASSINATURAS ----------
+    def reserve(self, email: str) -> Subscriber:
+        # Limites checados e vaga ocupada sem await no meio: conexões simultâneas
+        # do mesmo usuário não passam todas pela checagem antes de alguma assinar
+        if self.connections >= self.max_subscribers:
+            raise HTTPException(status_code=503, detail="Limite de conexões de eventos", headers={"Retry-After": "30"})
+        if len(self._subs.get(email, ())) >= self.max_per_user:
+            raise HTTPException(status_code=429, detail="Conexões de eventos demais para este usuário")
+        sub = Subscriber(email)
+        self._subs.setdefault(email, set()).add(sub)
+        self.connections += 1
+        return sub
+
+    def activate(self, sub: Subscriber, status: str) -> None:
+        # Status lido depois da reserva; se outra conexão ou um publish já
+        # registrou o do email, esse vale
+        self._last.setdefault(sub.email, status)
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        subs = self._subs.get(sub.email)
+        if subs is None or sub not in subs:
+            return
+        subs.discard(sub)
+        self.connections -= 1
+        if not subs:
+            del self._subs[sub.email]
+            self._last.pop(sub.email, None)
+
+    # ---------- PUBLICAÇÃO ----------
+    def publish(self, email: str, status: str) -> None:
+        subs = self._subs.get(email)
+        if not subs or self._last.get(email) == status:
+            return
+        self._last[email] = status
+        self.published += 1
+        for sub in subs:
+            sub.pending = status
+            sub.wake.set()
+        self.delivered += len(subs)
+
+    def on_row(self, email: str, row: Optional[dict]) -> None:
+        # Listener do AccessIndex/webhook: chamado para muitas linhas, sai cedo
+        if email in self._subs:
+            self.publish(email, status_of(row))
+
+    # ---------- LOOPS ----------
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for subs in self._subs.values():
+                for sub in subs:
+                    sub.wake.set()
+
+    async def poll_once(self) -> None:
+        emails = list(self._subs)
+        client = await get_client()
+        for i in range(0, len(emails), ACCESS_EVENTS_POLL_CHUNK):
+            chunk = emails[i:i + ACCESS_EVENTS_POLL_CHUNK]
+            res = await execute(client.table("user_access").select("email,status").in_("email", chunk))
+            found = {row["email"]: status_of(row) for row in res.data or []}
+            for email in chunk:
+                self.publish(email, found.get(email, "none"))
+        self.polls += 1
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            index = get_access_index()
+            # Índice fresco já entrega as mudanças pelo listener
+            if not self._subs or (index is not None and index.fresh()):
+                continue
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.poll_errors += 1
+                log.info(f"AccessEvents: poll falhou: {e}")
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._heartbeat_loop()), asyncio.create_task(self._poll_loop())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "emails": len(self._subs),
+            "published": self.published,
+            "delivered": self.delivered,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+        }
+
+hub = AccessEventHub()
+add_change_listener(hub.on_row)
+register_collector(lambda: gauge_lines("access_events", "Conexões SSE de status de acesso", hub.stats()))
+
+async def _stream(sub: Subscriber, status: str):
+    yield f"retry: {ACCESS_EVENTS_RETRY_MS}\n" + _event(status)
+    while True:
+        await sub.wake.wait()
+        sub.wake.clear()
+        pending, sub.pending = sub.pending, None
+        yield _event(pending) if pending is not None else ": ping\n\n"
+
+class SubscriptionResponse(StreamingResponse):
+    # A vaga foi reservada na rota: devolve ao fim da resposta por qualquer
+    # caminho, inclusive cliente que sai antes de o gerador começar
+    def __init__(self, sub: Subscriber, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sub = sub
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            hub.unsubscribe(self.sub)
+
+# ---------- ROTAS ----------
+@router.get("/access-events")
+async def access_events(email: str = Depends(get_token_email)):
+    # EventSource(`${API}/access-events?access_token=${session.access_token}`)
+    sub = hub.reserve(email)
+    try:
+        status = status_of(await get_user_access(email))
+    except SupabaseUnavailable as e:
+        hub.unsubscribe(sub)
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
+    except BaseException:
+        hub.unsubscribe(sub)
+        raise
+    hub.activate(sub, status)
+    return SubscriptionResponse(
+        sub,
+        _stream(sub, status),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
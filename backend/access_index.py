@@ -0,0 +1,355 @@
+# backend/access_index.py
+# Réplica em memória de user_access (email -> linha), para get_current_user e
+# /api/user-status responderem sem ir ao Supabase a cada chamada.
+#
+# Carga completa no startup (em background) e depois sync incremental pelas
+# linhas com `updated_at` acima da marca d'água. Requer a coluna mantida por
+# trigger, ex.:
+#   alter table user_access add column updated_at timestamptz not null default now();
+#   create trigger user_access_updated before update on user_access
+#     for each row execute procedure moddatetime(updated_at);
+#   create index on user_access (updated_at, email);
+#
+# Staleness limitada: se o último sync bem-sucedido for mais velho que
+# ACCESS_INDEX_MAX_STALENESS, o índice não responde e as rotas voltam à consulta
+# direta. Deletes físicos não mudam updated_at: uma varredura só de emails
+# (ACCESS_INDEX_DELETE_SCAN, por padrão a própria staleness máxima) tira do índice
+# quem sumiu da tabela. Revogações urgentes usam o webhook
+# (POST /api/user-access/invalidate).
+#
+# Cada invalidate avança uma geração; carga, sync e varredura que começaram antes
+# dela não gravam a linha do email invalidado (poderia ser a linha de antes da revogação).
+#
+# Linhas novas/alteradas são repassadas aos listeners (access_events.py empurra
+# as mudanças de status para os clientes conectados).
+import asyncio
+import hmac
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Body, Header, HTTPException
+
+from db import execute, get_client
+from resilience import user_access_cache
+
+log = logging.getLogger("mandala5")
+
+ACCESS_INDEX = os.getenv("ACCESS_INDEX", "0").lower() in ("1", "true", "yes")
+ACCESS_INDEX_REFRESH = float(os.getenv("ACCESS_INDEX_REFRESH", "5"))
+ACCESS_INDEX_MAX_STALENESS = float(os.getenv("ACCESS_INDEX_MAX_STALENESS", "30"))
+ACCESS_INDEX_FULL_RELOAD = float(os.getenv("ACCESS_INDEX_FULL_RELOAD", "600"))
+ACCESS_INDEX_DELETE_SCAN = float(os.getenv("ACCESS_INDEX_DELETE_SCAN", str(ACCESS_INDEX_MAX_STALENESS)))
+# Janela relida a cada sync: cobre transações que commitam com updated_at
+# anterior à marca d'água já vista
+ACCESS_INDEX_OVERLAP = float(os.getenv("ACCESS_INDEX_OVERLAP", "5"))
+ACCESS_INDEX_PAGE = int(os.getenv("ACCESS_INDEX_PAGE", "1000"))
+ACCESS_WEBHOOK_SECRET = os.getenv("ACCESS_WEBHOOK_SECRET", "")
+
+TABLE = "user_access"
+HWM_COLUMN = "updated_at"
+
+router = APIRouter(prefix="/user-access")
+
+# fn(email, linha ou None); chamados no event loop, devem ser baratos
+_listeners: List[Callable[[str, Optional[dict]], None]] = []
+
+def add_change_listener(fn: Callable[[str, Optional[dict]], None]) -> None:
+    _listeners.append(fn)
+
+def _notify(email: str, row: Optional[dict]) -> None:
+    for fn in _listeners:
+        fn(email, row)
+
+async def read_row(email: str) -> Optional[dict]:
+    client = await get_client()
+    res = await execute(client.table(TABLE).select("*").eq("email", email).limit(1))
+    return res.data[0] if res.data else None
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+class AccessIndex:
+    def __init__(
+        self,
+        refresh_interval: float = ACCESS_INDEX_REFRESH,
+        max_staleness: float = ACCESS_INDEX_MAX_STALENESS,
+        full_reload: float = ACCESS_INDEX_FULL_RELOAD,
+        page_size: int = ACCESS_INDEX_PAGE,
+        delete_scan: float = ACCESS_INDEX_DELETE_SCAN,
+    ):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.full_reload = full_reload
+        self.page_size = page_size
+        self.delete_scan = delete_scan
+        self._rows: Dict[str, dict] = {}
+        # Emails invalidados pelo webhook e ainda não relidos: sempre consulta direta
+        self._dirty: Set[str] = set()
+        # email -> geração do último invalidate; só o que um sync em andamento pode ter lido antes
+        self._generation = 0
+        self._invalidated: Dict[str, int] = {}
+        self._scanned_at = 0.0
+        self._high_water: Optional[str] = None
+        self._synced_at: Optional[float] = None
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # contadores
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.rows_applied = 0
+        self.rows_deleted = 0
+        self.invalidations = 0
+
+    # ---------- LEITURA ----------
+    def fresh(self) -> bool:
+        return self._synced_at is not None and time.monotonic() - self._synced_at <= self.max_staleness
+
+    def lookup(self, email: str) -> Tuple[bool, Optional[dict]]:
+        # (respondeu, linha). Linha None com respondeu=True: email sem acesso.
+        # respondeu=False: índice frio, velho demais ou email invalidado -> consulte o banco
+        if email in self._dirty or not self.fresh():
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, self._rows.get(email)
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._synced_at if self._synced_at is not None else -1
+        return {
+            "rows": len(self._rows),
+            "fresh": int(self.fresh()),
+            "sync_age_seconds": round(age, 3),
+            "hits": self.hits,
+            "misses": self.misses,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "rows_applied": self.rows_applied,
+            "rows_deleted": self.rows_deleted,
+            "invalidations": self.invalidations,
+        }
+
+    # ---------- SYNC ----------
+    async def _pages(self, since: Optional[str]):
+        # Keyset por (updated_at, email): páginas estáveis mesmo com timestamps repetidos
+        client = await get_client()
+        cursor: Optional[Tuple[str, str]] = None
+        while True:
+            query = client.table(TABLE).select("*").order(HWM_COLUMN).order("email").limit(self.page_size)
+            if cursor is not None:
+                ts, email = cursor
+                query = query.or_(f'{HWM_COLUMN}.gt."{ts}",and({HWM_COLUMN}.eq."{ts}",email.gt."{email}")')
+            elif since is not None:
+                query = query.gte(HWM_COLUMN, since)
+            res = await execute(query)
+            rows = res.data or []
+            if rows:
+                yield rows
+            if len(rows) < self.page_size:
+                return
+            cursor = (rows[-1][HWM_COLUMN], rows[-1]["email"])
+
+    async def _emails(self):
+        # Só a chave, em keyset por email: barato perto da carga completa
+        client = await get_client()
+        last: Optional[str] = None
+        while True:
+            query = client.table(TABLE).select("email").order("email").limit(self.page_size)
+            if last is not None:
+                query = query.gt("email", last)
+            rows = (await execute(query)).data or []
+            for row in rows:
+                yield row["email"]
+            if len(rows) < self.page_size:
+                return
+            last = rows[-1]["email"]
+
+    def _stale(self, email: str, started: int) -> bool:
+        # Invalidado depois que o sync começou: o que ele leu pode ser a linha revogada
+        return self._invalidated.get(email, 0) > started
+
+    def _forget_invalidations(self, started: int) -> None:
+        # Syncs rodam um de cada vez: os próximos começam depois de `started`
+        self._invalidated = {e: g for e, g in self._invalidated.items() if g > started}
+
+    def _advance(self, rows: List[dict]) -> None:
+        for row in rows:
+            ts = row.get(HWM_COLUMN)
+            if ts and (self._high_water is None or _parse_ts(ts) > _parse_ts(self._high_water)):
+                self._high_water = ts
+
+    async def load(self) -> None:
+        # Carga completa num dict novo, trocado de uma vez no fim
+        started = time.perf_counter()
+        generation = self._generation
+        rows: Dict[str, dict] = {}
+        self._high_water = None
+        async for page in self._pages(None):
+            for row in page:
+                rows[row["email"]] = row
+            self._advance(page)
+        for email in [e for e in self._invalidated if self._stale(e, generation)]:
+            # Vale o que o invalidate leu (ou nada, se ele ainda está relendo)
+            if email in self._rows:
+                rows[email] = self._rows[email]
+            else:
+                rows.pop(email, None)
+        if _listeners:
+            # Mudanças desde a carga anterior, incluindo deletes físicos
+            for email in self._rows.keys() | rows.keys():
+                old, new = self._rows.get(email), rows.get(email)
+                if (old or {}).get("status") != (new or {}).get("status"):
+                    _notify(email, new)
+        self._rows = rows
+        self._dirty = {e for e in self._dirty if self._stale(e, generation)}
+        self._forget_invalidations(generation)
+        self._loaded_at = self._synced_at = self._scanned_at = time.monotonic()
+        self.syncs += 1
+        log.info(f"AccessIndex: {len(rows)} linhas carregadas em {(time.perf_counter() - started) * 1000:.0f}ms.")
+
+    async def refresh(self) -> int:
+        since = None
+        if self._high_water is not None:
+            since = (_parse_ts(self._high_water) - timedelta(seconds=ACCESS_INDEX_OVERLAP)).isoformat()
+        generation = self._generation
+        applied = 0
+        async for page in self._pages(since):
+            for row in page:
+                if self._stale(row["email"], generation):
+                    continue
+                self._rows[row["email"]] = row
+                self._dirty.discard(row["email"])
+                _notify(row["email"], row)
+            self._advance(page)
+            applied += len(page)
+        if time.monotonic() - self._scanned_at >= self.delete_scan:
+            await self.scan_deletes()
+        self._forget_invalidations(generation)
+        self._synced_at = time.monotonic()
+        self.syncs += 1
+        self.rows_applied += applied
+        return applied
+
+    async def scan_deletes(self) -> int:
+        generation = self._generation
+        present = {email async for email in self._emails()}
+        gone = [e for e in self._rows if e not in present and not self._stale(e, generation)]
+        for email in gone:
+            del self._rows[email]
+            _notify(email, None)
+        self._scanned_at = time.monotonic()
+        self.rows_deleted += len(gone)
+        return len(gone)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._synced_at is None or time.monotonic() - self._loaded_at >= self.full_reload:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Sem sync o índice envelhece até max_staleness e as rotas voltam ao banco
+                self.sync_errors += 1
+                log.error(f"AccessIndex: falha no sync: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        log.info(
+            f"AccessIndex ativo (refresh={self.refresh_interval}s, max_staleness={self.max_staleness}s, "
+            f"full_reload={self.full_reload}s)."
+        )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------- INVALIDAÇÃO ----------
+    async def invalidate(self, email: str) -> Optional[dict]:
+        # Tira o email do índice na hora e relê só a linha dele
+        self.invalidations += 1
+        self._generation += 1
+        generation = self._invalidated[email] = self._generation
+        self._dirty.add(email)
+        self._rows.pop(email, None)
+        row = await read_row(email)
+        if self._stale(email, generation):
+            # Outro invalidate do mesmo email chegou durante a leitura: ele aplica
+            return row
+        if row is not None:
+            self._rows[email] = row
+        self._dirty.discard(email)
+        _notify(email, row)
+        return row
+
+_index: Optional[AccessIndex] = None
+
+def get_access_index() -> Optional[AccessIndex]:
+    return _index
+
+async def start_access_index() -> Optional[AccessIndex]:
+    global _index
+    if ACCESS_INDEX and _index is None:
+        _index = AccessIndex()
+        await _index.start()
+    return _index
+
+async def stop_access_index() -> None:
+    global _index
+    if _index is not None:
+        await _index.stop()
+    _index = None
+
+# ---------- WEBHOOK ----------
+def _webhook_email(payload: dict) -> Optional[str]:
+    # {"email": ...} ou o payload dos Database Webhooks do Supabase
+    # ({"type": "UPDATE", "record": {...}, "old_record": {...}})
+    if isinstance(payload.get("email"), str):
+        return payload["email"]
+    for key in ("record", "old_record"):
+        record = payload.get(key)
+        if isinstance(record, dict) and isinstance(record.get("email"), str):
+            return record["email"]
+    return None
+
+@router.post("/invalidate")
+async def invalidate_user_access(
+    payload: dict = Body(...),
+    x_webhook_secret: str = Header(""),
+):
+    if not ACCESS_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook desabilitado (ACCESS_WEBHOOK_SECRET)")
+    if not hmac.compare_digest(x_webhook_secret.encode(), ACCESS_WEBHOOK_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Segredo inválido")
+    email = _webhook_email(payload)
+    if not email:
+        raise HTTPException(status_code=422, detail="Payload sem email")
+    # Próximo get_current_user relê do banco em vez de servir do cache SWR
+    user_access_cache.invalidate(email)
+    if _index is None:
+        if _listeners:
+            # Sem índice, quem assina eventos ainda precisa da linha nova
+            try:
+                _notify(email, await read_row(email))
+            except Exception as e:
+                log.error(f"user_access: falha ao reler {email}: {e}")
+        return {"email": email, "indexed": False}
+    try:
+        row = await _index.invalidate(email)
+    except Exception as e:
+        # O email fica marcado: as rotas consultam o banco até o próximo sync
+        log.error(f"AccessIndex: falha ao reler {email}: {e}")
+        return {"email": email, "indexed": True, "reloaded": False}
+    return {"email": email, "indexed": True, "reloaded": True, "status": (row or {}).get("status", "none")}
@@ -0,0 +1,227 @@
+# backend/admission.py
+# Controle de admissão na frente das rotas que vão ao Supabase: token bucket por
+# cliente (email do JWT quando houver, senão IP) e um teto de requisições em voo
+# com fila de espera curta. Excesso sai rápido com 429/503 + Retry-After, em vez
+# de virar fila no pool httpx/threadpool e deixar tudo lento junto.
+# Rotas fora de ADMISSION_PREFIXES (health, métricas, render) não passam por aqui,
+# nem as de ADMISSION_EXEMPT: o webhook de user_access vem sempre do mesmo IP do
+# Supabase, já é autenticado pelo segredo e não é reenviado se levar 429.
+# Leituras em streaming (GET com format=ndjson ou Accept: application/x-ndjson)
+# seguram a vaga até o fim do stream; elas têm um teto próprio
+# (ADMISSION_MAX_STREAMS) para não tomar as vagas das requisições curtas.
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import jwt
+
+from metrics import Counter, gauge_lines, register, register_collector
+
+ADMISSION = os.getenv("ADMISSION", "1").lower() in ("1", "true", "yes")
+ADMISSION_PREFIXES = tuple(
+    p.strip() for p in os.getenv(
+        "ADMISSION_PREFIXES", "/api/status,/api/user-status,/api/protected,/api/presets,/api/user-access"
+    ).split(",") if p.strip()
+)
+ADMISSION_EXEMPT = tuple(
+    p.strip() for p in os.getenv("ADMISSION_EXEMPT", "/api/user-access/invalidate").split(",") if p.strip()
+)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "40"))
+ADMISSION_MAX_STREAMS = int(os.getenv("ADMISSION_MAX_STREAMS", "4"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Atrás de proxy (Render): a chave por IP usa o primeiro X-Forwarded-For
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0").lower() in ("1", "true", "yes")
+
+ADMISSION_REJECTED = register(Counter("admission_rejected_total", "Requisições recusadas pelo controle de admissão", ("reason",)))
+
+# ---------- TOKEN BUCKET ----------
+class RateLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # chave -> (tokens, último refill); LRU para não crescer sem limite
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        # 0 se admitido; senão segundos até haver 1 token
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# ---------- CONCORRÊNCIA ----------
+class Overloaded(Exception):
+    pass
+
+class ConcurrencyLimiter:
+    # Semáforo com fila limitada e espera máxima; a vaga passa direto ao próximo da fila
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded("queue_full")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # A vaga chegou junto com o timeout: fica com ela
+                return
+            fut.cancel()
+            raise Overloaded("queue_timeout")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            else:
+                fut.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        # Transfere a vaga para o primeiro da fila ainda esperando
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, float]:
+        return {"in_flight": self.in_flight, "queued": len(self._waiters), "max_in_flight": self.max_in_flight}
+
+# ---------- MIDDLEWARE ----------
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def is_stream(scope) -> bool:
+    if scope["method"] != "GET":
+        return False
+    query = scope.get("query_string", b"")
+    if b"format=ndjson" in query.split(b"&"):
+        return True
+    return "application/x-ndjson" in (_header(scope, b"accept") or "")
+
+def client_key(scope, secret: Optional[str]) -> str:
+    # Mesmo usuário que get_current_user vai ver: email do JWT, só com a assinatura
+    # verificada (sem consulta ao banco). Sem token válido, o IP do cliente.
+    auth = _header(scope, b"authorization")
+    if secret and auth and auth[:7].lower() == "bearer ":
+        try:
+            email = jwt.decode(auth[7:], secret, algorithms=["HS256"]).get("email")
+            if email:
+                return f"user:{email}"
+        except jwt.PyJWTError:
+            pass
+    if ADMISSION_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return "ip:" + forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app,
+        secret: Optional[str] = None,
+        prefixes: Tuple[str, ...] = ADMISSION_PREFIXES,
+        enabled: bool = ADMISSION,
+        exempt: Tuple[str, ...] = ADMISSION_EXEMPT,
+    ):
+        self.app = app
+        self.secret = secret
+        self.prefixes = prefixes
+        self.exempt = exempt
+        self.enabled = enabled
+        self.limiter = RateLimiter(RATE_LIMIT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS)
+        self.concurrency = ConcurrencyLimiter(ADMISSION_MAX_IN_FLIGHT, ADMISSION_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+        # Streams não esperam na fila: sem vaga, 503 na hora
+        self.streams = ConcurrencyLimiter(ADMISSION_MAX_STREAMS, 0, 0)
+        register_collector(self._metrics)
+
+    def _metrics(self) -> List[str]:
+        streams = self.streams.stats()
+        return gauge_lines("admission", "Controle de admissão", {
+            **self.concurrency.stats(),
+            "streams_in_flight": streams["in_flight"],
+            "max_streams": streams["max_in_flight"],
+            "rate_keys": len(self.limiter),
+        })
+
+    @staticmethod
+    def _matches(path: str, prefixes: Tuple[str, ...]) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in prefixes)
+
+    def guarded(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return False
+        path = scope["path"]
+        return self._matches(path, self.prefixes) and not self._matches(path, self.exempt)
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or not self.guarded(scope):
+            return await self.app(scope, receive, send)
+
+        wait = self.limiter.take(client_key(scope, self.secret))
+        if wait > 0:
+            ADMISSION_REJECTED.inc("rate_limited")
+            return await _reject(send, 429, "Muitas requisições", wait)
+        limiter = self.streams if is_stream(scope) else self.concurrency
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            ADMISSION_REJECTED.inc(("stream_" if limiter is self.streams else "") + str(e))
+            return await _reject(send, 503, "Servidor sobrecarregado, tente novamente", 1.0)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,141 @@
+# backend/animation.py
+# /api/animate: sequência de quadros do mandala (u_time * u_speed) num intervalo
+# de tempo, calculada em paralelo no pool de export e enviada em streaming como
+# APNG ou zip de PNGs, na ordem, à medida que os quadros ficam prontos.
+import json
+import logging
+import os
+import zipfile
+from collections import deque
+from typing import TYPE_CHECKING, Iterator, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from pydantic import Field, FiniteFloat, model_validator
+
+from export import EXPORT_WORKERS, SlotStreamingResponse, acquire_slot, get_pool
+from params import Aspect, MandalaParams, export_size
+from png import apng_frame, apng_header, chunk, compress_image, png_from_payload
+
+if TYPE_CHECKING:
+    from mandala import Geometry
+
+log = logging.getLogger("mandala5")
+
+ANIM_MAX_SIDE = int(os.getenv("ANIM_MAX_SIDE", "1024"))
+ANIM_MAX_FRAMES = int(os.getenv("ANIM_MAX_FRAMES", "600"))
+ANIM_PNG_LEVEL = int(os.getenv("ANIM_PNG_LEVEL", "6"))
+
+router = APIRouter()
+
+class AnimationRequest(MandalaParams):
+    width: int = Field(512, ge=16, le=ANIM_MAX_SIDE)
+    aspect: Aspect = "1:1"
+    start: FiniteFloat = 0.0
+    duration: float = Field(4.0, gt=0, allow_inf_nan=False)
+    fps: int = Field(24, ge=1, le=60)
+    format: Literal["apng", "zip"] = "apng"
+
+    @model_validator(mode="after")
+    def _check_frames(self) -> "AnimationRequest":
+        # Antes de times() montar a lista: duration enorme seria CPU/memória à toa
+        if self.frame_count() > ANIM_MAX_FRAMES:
+            raise ValueError(f"Máximo de {ANIM_MAX_FRAMES} quadros por animação")
+        return self
+
+    def frame_count(self) -> int:
+        return max(1, round(self.duration * self.fps))
+
+    def size(self) -> Tuple[int, int]:
+        return export_size(self.width, self.aspect)
+
+    def times(self) -> List[float]:
+        return [self.start + i / self.fps for i in range(self.frame_count())]
+
+# ---------- WORKER ----------
+# Geometria do último pedido, por processo: grade r/ângulo, dobra de simetria e
+# campo de estrelas são calculados uma vez e reaproveitados em todos os quadros
+_geometry: Optional[Tuple[str, "Geometry"]] = None
+
+def _render_frame(params: dict, width: int, height: int, time: float, level: int) -> bytes:
+    global _geometry
+    from mandala import Geometry, shade, to_rgb8
+
+    p = MandalaParams(**params)
+    key = json.dumps({**p.canonical(), "t": None, "size": [width, height]}, sort_keys=True)
+    if _geometry is None or _geometry[0] != key:
+        _geometry = (key, Geometry(p, width, height))
+    return compress_image(to_rgb8(shade(_geometry[1], p, time)), level)
+
+def iter_frames(p: MandalaParams, width: int, height: int, times: List[float]) -> Iterator[bytes]:
+    # Janela limitada de quadros em voo: paralelo no pool, entregues em ordem
+    pool = get_pool()
+    params = p.model_dump()
+    pending = deque()
+    upcoming = iter(times)
+    window = max(2, 2 * EXPORT_WORKERS)
+    try:
+        for t in upcoming:
+            pending.append(pool.submit(_render_frame, params, width, height, t, ANIM_PNG_LEVEL))
+            if len(pending) >= window:
+                break
+        while pending:
+            payload = pending.popleft().result()
+            t = next(upcoming, None)
+            if t is not None:
+                pending.append(pool.submit(_render_frame, params, width, height, t, ANIM_PNG_LEVEL))
+            yield payload
+    finally:
+        for f in pending:
+            f.cancel()
+
+# ---------- FORMATOS ----------
+def stream_apng(p: MandalaParams, width: int, height: int, times: List[float], fps: int) -> Iterator[bytes]:
+    yield apng_header(width, height, len(times))
+    for i, payload in enumerate(iter_frames(p, width, height, times)):
+        yield apng_frame(i, width, height, payload, 1, fps)
+    yield chunk(b"IEND", b"")
+
+class _Sink:
+    # Destino sem seek para o ZipFile: acumula o que foi escrito até o próximo drain
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+def stream_zip(p: MandalaParams, width: int, height: int, times: List[float]) -> Iterator[bytes]:
+    sink = _Sink()
+    # PNG já é comprimido: ZIP_STORED
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for i, payload in enumerate(iter_frames(p, width, height, times)):
+            zf.writestr(f"frame_{i:05d}.png", png_from_payload(width, height, payload))
+            yield sink.drain()
+    yield sink.drain()
+
+# ---------- ROTAS ----------
+@router.post("/animate")
+async def animate(req: AnimationRequest):
+    width, height = req.size()
+    times = req.times()
+    if height > ANIM_MAX_SIDE:
+        raise HTTPException(status_code=422, detail=f"Altura máxima de animação é {ANIM_MAX_SIDE}px")
+    acquire_slot()
+    log.info(f"Animação {width}x{height}, {len(times)} quadros @ {req.fps}fps ({req.format}) iniciada.")
+    if req.format == "zip":
+        stream, media_type, ext = stream_zip(req, width, height, times), "application/zip", "zip"
+    else:
+        stream, media_type, ext = stream_apng(req, width, height, times, req.fps), "image/apng", "png"
+    return SlotStreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="mandala_{width}x{height}_{len(times)}f.{ext}"'},
+    )
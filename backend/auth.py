@@ -1,34 +1,140 @@
-# backend/auth.py
-import os
-from fastapi import Depends, HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt
-from supabase import create_client, Client
-from dotenv import load_dotenv
-from pathlib import Path
-
-load_dotenv(Path(__file__).parent / '.env')
-
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_ANON_KEY")
-)
-
-JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
-security = HTTPBearer()
-
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        email = payload.get("email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Token inválido")
-
-        res = supabase.table("user_access").select("*").eq("email", email).single().execute()
-        if not res.data or res.data.get("status") != "active":
-            raise HTTPException(status_code=403, detail="Acesso negado")
-
-        return res.data
-    except Exception:
-        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
\ No newline at end of file
+# backend/auth.py
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Query, Request
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import jwt
+from postgrest.exceptions import APIError
+from dotenv import load_dotenv
+from pathlib import Path
+
+from access_index import get_access_index
+from db import execute, get_client
+from resilience import SupabaseUnavailable, user_access_cache
+
+load_dotenv(Path(__file__).parent / '.env')
+
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Consultas de user_access em andamento, por (email, geração no cache) (single-flight)
+_inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+
+async def _query_user_access(email: str):
+    supabase = await get_client()
+    return await execute(supabase.table("user_access").select("*").eq("email", email).single())
+
+async def fetch_user_access(email: str):
+    # Chamadas simultâneas para o mesmo email compartilham uma única consulta;
+    # depois de um invalidate (webhook), quem chega não pega carona na de antes
+    key = (email, user_access_cache.generation(email))
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(_query_user_access(email))
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: se um cliente desconectar, a consulta continua para os demais
+    return await asyncio.shield(fut)
+
+async def load_user_access(email: str) -> Optional[dict]:
+    try:
+        res = await fetch_user_access(email)
+    except APIError as e:
+        # .single() sem linha: o email não tem acesso (resposta válida, vai para o cache)
+        if e.code == "PGRST116":
+            return None
+        raise
+    return res.data
+
+async def get_user_access(email: str) -> Optional[dict]:
+    # Índice em memória (ACCESS_INDEX=1) quando fresco; senão, consulta direta
+    # atrás do cache stale-while-revalidate (resilience.py)
+    index = get_access_index()
+    if index is not None:
+        hit, row = index.lookup(email)
+        if hit:
+            return row
+    return await user_access_cache.get(email, load_user_access)
+
+def token_email(token: str) -> str:
+    # Só assinatura/expiração do JWT do Supabase, sem consulta ao banco
+    try:
+        email = jwt.decode(token, JWT_SECRET, algorithms=["HS256"]).get("email")
+    except jwt.PyJWTError:
+        email = None
+    if not email:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+    return email
+
+async def get_token_email(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None),
+) -> str:
+    # Mesmo JWT do get_current_user, sem exigir status "active": quem assina os
+    # eventos de acesso precisa conectar antes de ser liberado. Aceita ?access_token=
+    # porque o EventSource do navegador não envia headers.
+    token = credentials.credentials if credentials is not None else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return token_email(token)
+
+_TOKEN_QUERY = re.compile(r"(access_token=)[^&\s\"]+")
+
+class RedactTokenFilter(logging.Filter):
+    # O access log do uvicorn grava o path com a query: tira o JWT de ?access_token=
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_QUERY.sub(r"\1[redacted]", arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        elif isinstance(record.msg, str):
+            record.msg = _TOKEN_QUERY.sub(r"\1[redacted]", record.msg)
+        return True
+
+def install_token_log_filter(name: str = "uvicorn.access") -> None:
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RedactTokenFilter) for f in logger.filters):
+        logger.addFilter(RedactTokenFilter())
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    started = time.perf_counter()
+    token = credentials.credentials
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        email = payload.get("email")
+        if not email:
+            raise HTTPException(status_code=401, detail="Token inválido")
+
+        row = await get_user_access(email)
+        if not row or row.get("status") != "active":
+            raise HTTPException(status_code=403, detail="Acesso negado")
+
+        return row
+    except HTTPException:
+        # 401/403 acima saem como estão; o except genérico abaixo é para o JWT
+        raise
+    except SupabaseUnavailable as e:
+        # Sem resposta do banco nem cópia stale: não é culpa do token
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
+    except Exception:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+    finally:
+        # Lido pelo middleware de Server-Timing em server.py
+        request.state.auth_ms = (time.perf_counter() - started) * 1000
+
+async def get_stream_user(email: str = Depends(get_token_email)):
+    # get_current_user para EventSource: token no header ou em ?access_token=,
+    # e o mesmo 403 para quem não está com acesso ativo
+    try:
+        row = await get_user_access(email)
+    except SupabaseUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
+    if not row or row.get("status") != "active":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return row
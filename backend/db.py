@@ -0,0 +1,168 @@
+# backend/db.py
+# Camada de acesso assíncrona ao Supabase, compartilhada por server.py e auth.py.
+# Um único AsyncClient sobre um único pool httpx (keep-alive), criado sob demanda:
+# o import do supabase (realtime, gotrue, storage...) só é pago na primeira chamada
+# ou no aquecimento em background do lifespan (server.py).
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Optional
+
+import anyio.to_thread
+import httpx
+
+from metrics import SUPABASE_CALLS, describe_query, observe_supabase
+from resilience import SUPABASE_HEDGE_MS, SUPABASE_READ_TIMEOUT, SupabaseUnavailable, breaker, hedged, is_infra_failure
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+log = logging.getLogger("mandala5")
+
+_http: Optional[httpx.AsyncClient] = None
+_client: Optional["AsyncClient"] = None
+_init_lock = asyncio.Lock()
+_call_timeout = 10.0
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+# ---------- CONFIG ----------
+def pool_settings() -> dict:
+    pool_size = _env_int("SUPABASE_POOL_SIZE", 20)
+    return {
+        "pool_size": pool_size,
+        "keepalive": _env_int("SUPABASE_POOL_KEEPALIVE", pool_size),
+        "keepalive_expiry": _env_float("SUPABASE_KEEPALIVE_EXPIRY", 30.0),
+        "connect_timeout": _env_float("SUPABASE_CONNECT_TIMEOUT", 5.0),
+        "pool_timeout": _env_float("SUPABASE_POOL_TIMEOUT", 5.0),
+        "call_timeout": _env_float("SUPABASE_TIMEOUT", 10.0),
+        "threadpool_limit": _env_int("THREADPOOL_LIMIT", 40),
+    }
+
+# ---------- CICLO DE VIDA ----------
+def configure_threadpool() -> int:
+    # Limita o threadpool do Starlette/anyio (dependências e rotas sync restantes).
+    # Chamado no lifespan: o limitador é do event loop, e tem de valer antes da
+    # primeira requisição, mesmo que o cliente do Supabase nunca seja criado.
+    limit = pool_settings()["threadpool_limit"]
+    anyio.to_thread.current_default_thread_limiter().total_tokens = limit
+    return limit
+
+async def init_db() -> "AsyncClient":
+    # Idempotente e single-flight: requisições concorrentes no cold start
+    # esperam o mesmo cliente em vez de criar um cada
+    if _client is not None:
+        return _client
+    async with _init_lock:
+        if _client is not None:
+            return _client
+        return await _create_client()
+
+async def _create_client() -> "AsyncClient":
+    global _http, _client, _call_timeout
+    from supabase import acreate_client, AsyncClientOptions
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")  # service role só no backend
+    if not url or not key:
+        # Log claro no Render; não vaza a chave inteira
+        log.error("Env faltando: SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY ausentes.")
+        raise RuntimeError("Defina SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY no Render/Env Group")
+    log.info(f"SUPABASE_URL OK; SERVICE_ROLE_KEY prefix: {key[:6]}******")
+
+    cfg = pool_settings()
+    _call_timeout = cfg["call_timeout"]
+
+    _http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=cfg["pool_size"],
+            max_keepalive_connections=cfg["keepalive"],
+            keepalive_expiry=cfg["keepalive_expiry"],
+        ),
+        timeout=httpx.Timeout(
+            cfg["call_timeout"],
+            connect=cfg["connect_timeout"],
+            pool=cfg["pool_timeout"],
+        ),
+        follow_redirects=True,
+    )
+    client = await acreate_client(
+        url,
+        key,
+        options=AsyncClientOptions(
+            httpx_client=_http,
+            auto_refresh_token=False,
+            persist_session=False,
+        ),
+    )
+    _client = client
+    log.info(
+        f"Supabase async client inicializado (pool={cfg['pool_size']}, "
+        f"keepalive={cfg['keepalive']}, timeout={cfg['call_timeout']}s)."
+    )
+    return _client
+
+async def close_db() -> None:
+    global _http, _client
+    if _http is not None:
+        await _http.aclose()
+    _http = None
+    _client = None
+
+async def get_client() -> "AsyncClient":
+    return _client if _client is not None else await init_db()
+
+# ---------- ACESSO ----------
+async def execute(query, timeout: Optional[float] = None):
+    # Prazo por operação: leituras usam SUPABASE_READ_TIMEOUT, escritas SUPABASE_TIMEOUT.
+    # Toda chamada passa por aqui, então é aqui que medimos latência por tabela/operação
+    # e alimentamos o circuit breaker (resilience.py). Estourou o prazo ou o circuito
+    # está aberto: SupabaseUnavailable (503 + Retry-After).
+    table, operation = describe_query(query)
+    read = operation == "select"
+    deadline = timeout or (min(SUPABASE_READ_TIMEOUT, _call_timeout) if read else _call_timeout)
+    try:
+        probe = breaker.before_call()
+    except SupabaseUnavailable:
+        SUPABASE_CALLS.inc(table, operation, "short_circuit")
+        raise
+    started = time.perf_counter()
+    outcome = "error"
+    recorded = False
+    try:
+        if read and SUPABASE_HEDGE_MS > 0 and not probe:
+            call = hedged(query.execute, SUPABASE_HEDGE_MS / 1000)
+        else:
+            call = query.execute()
+        result = await asyncio.wait_for(call, deadline)
+        outcome = "ok"
+        breaker.record(True, probe)
+        recorded = True
+        return result
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        breaker.record(False, probe, f"timeout em {table}.{operation} ({deadline}s)")
+        recorded = True
+        raise SupabaseUnavailable("timeout") from None
+    except Exception as e:
+        # Erro "de negócio" (ex.: .single() sem linha) prova que o Supabase respondeu
+        # e sobe como veio; falha de infraestrutura vira SupabaseUnavailable
+        infra = is_infra_failure(e)
+        breaker.record(not infra, probe, str(e)[:200] if infra else "")
+        recorded = True
+        if infra:
+            raise SupabaseUnavailable("upstream_error") from e
+        raise
+    finally:
+        if probe and not recorded:
+            # Teste do half_open cancelado no meio: libera para a próxima chamada testar
+            breaker.release_probe()
+        observe_supabase(table, operation, time.perf_counter() - started, outcome)
+
+async def get_supabase() -> "AsyncClient":
+    return await get_client()
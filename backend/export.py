@@ -0,0 +1,167 @@
+# backend/export.py
+# /api/export: pôster em alta resolução (16K+), renderizado em tiles num pool de
+# processos, montado num buffer memory-mapped em disco e enviado como PNG em
+# streaming, faixa por faixa. A RAM usada não cresce com o tamanho da imagem.
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import Field
+
+from params import Aspect, MandalaParams, export_size
+from png import iter_png
+
+if TYPE_CHECKING:
+    import numpy as np
+
+log = logging.getLogger("mandala5")
+
+EXPORT_MAX_SIDE = int(os.getenv("EXPORT_MAX_SIDE", "32768"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "0")) or os.cpu_count() or 1
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+EXPORT_PNG_LEVEL = int(os.getenv("EXPORT_PNG_LEVEL", "6"))
+EXPORT_TMP_DIR = os.getenv("EXPORT_TMP_DIR") or None
+# Linhas por bloco entregue ao zlib
+ROWS_PER_CHUNK = 64
+
+router = APIRouter()
+
+class ExportRequest(MandalaParams):
+    size: int = Field(16384, ge=16, le=EXPORT_MAX_SIDE)
+    aspect: Aspect = "1:1"
+    tile: int = Field(1024, ge=128, le=4096)
+
+    def dimensions(self) -> Tuple[int, int]:
+        return export_size(self.size, self.aspect)
+
+# ---------- POOL ----------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: o processo do servidor tem threads (uvicorn/anyio), fork não é seguro
+            _pool = ProcessPoolExecutor(
+                max_workers=EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            log.info(f"Pool de export iniciado com {EXPORT_WORKERS} processos.")
+        return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _render_tile(path: str, width: int, height: int, params: dict, box: Tuple[int, int, int, int]):
+    # Roda no processo filho: escreve o tile direto no arquivo mapeado
+    import numpy as np
+    from mandala import render
+
+    x0, y0, x1, y1 = box
+    out = np.memmap(path, dtype=np.uint8, mode="r+", shape=(height, width, 3))
+    out[y0:y1, x0:x1] = render(MandalaParams(**params), width, height, box)
+    out.flush()
+    del out
+    return box
+
+# ---------- STREAM ----------
+def stream_export(p: MandalaParams, width: int, height: int, tile: int) -> Iterator[bytes]:
+    fd, path = tempfile.mkstemp(prefix="mandala-export-", suffix=".rgb", dir=EXPORT_TMP_DIR)
+    os.close(fd)
+    # Arquivo esparso do tamanho da imagem; os workers escrevem nele via memmap
+    os.truncate(path, height * width * 3)
+    pool = get_pool()
+    params = p.model_dump()
+    boxes = (
+        (x0, y0, min(width, x0 + tile), min(height, y0 + tile))
+        for y0 in range(0, height, tile)
+        for x0 in range(0, width, tile)
+    )
+    # Janela limitada de tiles em voo, como em animation.iter_frames: futures e
+    # itens na fila do pool não crescem com o número de tiles, e um export
+    # grande não ocupa a fila do pool inteira sozinho
+    pending = deque()
+    window = max(2, 2 * EXPORT_WORKERS)
+
+    def fill() -> None:
+        for box in boxes:
+            pending.append(pool.submit(_render_tile, path, width, height, params, box))
+            if len(pending) >= window:
+                break
+
+    def rows() -> Iterator["np.ndarray"]:
+        import numpy as np
+
+        cols = -(-width // tile)
+        for y0 in range(0, height, tile):
+            y1 = min(height, y0 + tile)
+            # Tiles saem em ordem de faixa: os `cols` primeiros da fila são desta
+            for _ in range(cols):
+                fill()
+                pending.popleft().result()
+            # Mapeia só a faixa pronta; ao soltar, as páginas saem do RSS
+            band = np.memmap(path, dtype=np.uint8, mode="r", offset=y0 * width * 3, shape=(y1 - y0, width, 3))
+            for r0 in range(0, y1 - y0, ROWS_PER_CHUNK):
+                yield band[r0:r0 + ROWS_PER_CHUNK]
+            del band
+
+    try:
+        yield from iter_png(rows(), width, height, EXPORT_PNG_LEVEL)
+    finally:
+        # Cliente desconectou ou terminou: descarta tiles pendentes e o arquivo
+        for f in pending:
+            f.cancel()
+        os.unlink(path)
+
+# ---------- VAGAS ----------
+# Exports e animações dividem o pool e o limite de jobs simultâneos
+_active = 0
+_active_lock = threading.Lock()
+
+def acquire_slot() -> None:
+    global _active
+    with _active_lock:
+        if _active >= EXPORT_MAX_CONCURRENT:
+            raise HTTPException(status_code=503, detail="Exports em andamento demais", headers={"Retry-After": "30"})
+        _active += 1
+
+def release_slot() -> None:
+    global _active
+    with _active_lock:
+        _active -= 1
+
+class SlotStreamingResponse(StreamingResponse):
+    # Devolve a vaga de acquire_slot quando a resposta termina, por qualquer caminho.
+    # Um finally dentro do gerador não basta: se o cliente desconecta antes do
+    # primeiro chunk, o gerador nem começa e a vaga vazaria.
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            release_slot()
+
+# ---------- ROTAS ----------
+@router.post("/export")
+async def export_png(req: ExportRequest):
+    width, height = req.dimensions()
+    if height > EXPORT_MAX_SIDE:
+        raise HTTPException(status_code=422, detail=f"Altura máxima de export é {EXPORT_MAX_SIDE}px")
+    acquire_slot()
+    log.info(f"Export {width}x{height} (tile={req.tile}) iniciado.")
+    return SlotStreamingResponse(
+        stream_export(req, width, height, req.tile),
+        media_type="image/png",
+        headers={"Content-Disposition": f'attachment; filename="mandala_{width}x{height}.png"'},
+    )
@@ -0,0 +1,651 @@
+# backend/jobs.py
+# /api/jobs: trabalho pesado fora do ciclo da requisição. POST /api/jobs
+# enfileira e devolve 202 com o id; o progresso sai por SSE em
+# GET /api/jobs/{id}/events e o resultado fica num store local em disco.
+#
+# Tipos de job:
+#   - render: pôster em alta resolução, em tiles (mesmo caminho do /api/export),
+#     com o PNG final codificado também no pool
+#   - thumbnails: miniaturas dos presets salvos do usuário, num .zip
+#
+# Agendamento em dois níveis, tudo no event loop (sem locks):
+#   - jobs: no máximo JOBS_MAX_RUNNING ao mesmo tempo e JOBS_PER_USER por
+#     usuário; os demais esperam na fila por (prioridade, ordem de chegada)
+#   - tarefas (um tile, uma miniatura): cada job em execução põe as suas numa
+#     fila de prioridade única, e só JOBS_WORKERS ficam no pool ao mesmo tempo.
+#     Um job "high" que chega depois passa à frente dos tiles ainda não
+#     enviados de um "low" que já estava rodando.
+# Os jobs têm um pool de processos só deles (JOBS_WORKERS, por padrão metade
+# dos de export), alimentado só pela TaskQueue: /api/export e /api/animate
+# (limitados por EXPORT_MAX_CONCURRENT) não furam as prioridades, e um job
+# grande não ocupa os processos dos exports interativos.
+#
+# Artefatos: um arquivo por job em JOBS_STORE_DIR/<pid>, LRU limitado a
+# JOBS_STORE_MB por processo. Jobs terminados somem depois de JOBS_TTL; o índice
+# é só deste processo, então o diretório é limpo no startup. Rode com um worker
+# do uvicorn (ou afinidade por usuário) para que o GET caia no processo que
+# criou o job.
+import asyncio
+import heapq
+import multiprocessing
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional, Set, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from auth import get_current_user, get_stream_user
+from db import execute, get_supabase
+from export import EXPORT_PNG_LEVEL, EXPORT_TMP_DIR, EXPORT_WORKERS, ROWS_PER_CHUNK, _render_tile
+from metrics import gauge_lines, register_collector
+from params import Aspect, MandalaParams, export_size
+from png import encode_png, iter_png
+from render import cache_key, get_render_cache
+from resilience import SupabaseUnavailable
+
+log = logging.getLogger("mandala5")
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "0")) or max(1, EXPORT_WORKERS // 2)
+JOBS_MAX_RUNNING = int(os.getenv("JOBS_MAX_RUNNING", "4"))
+JOBS_PER_USER = int(os.getenv("JOBS_PER_USER", "1"))
+JOBS_QUEUED_PER_USER = int(os.getenv("JOBS_QUEUED_PER_USER", "10"))
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "500"))
+JOBS_MAX_SIDE = int(os.getenv("JOBS_MAX_SIDE", "16384"))
+JOBS_MAX_THUMBNAILS = int(os.getenv("JOBS_MAX_THUMBNAILS", "200"))
+JOBS_STORE_DIR = Path(os.getenv("JOBS_STORE_DIR", str(Path(tempfile.gettempdir()) / "mandala5-jobs")))
+JOBS_STORE_MB = int(os.getenv("JOBS_STORE_MB", "1024"))
+JOBS_TTL = float(os.getenv("JOBS_TTL", "3600"))
+JOBS_HEARTBEAT = float(os.getenv("JOBS_HEARTBEAT", "15"))
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+FINISHED = ("done", "error", "cancelled")
+
+router = APIRouter(prefix="/jobs")
+
+# ---------- MODELOS ----------
+class RenderJob(MandalaParams):
+    size: int = Field(8192, ge=16, le=JOBS_MAX_SIDE)
+    aspect: Aspect = "1:1"
+    tile: int = Field(1024, ge=128, le=4096)
+
+class ThumbnailsJob(BaseModel):
+    # Sem nomes: todos os presets (não apagados) do usuário
+    names: Optional[List[str]] = Field(None, max_length=JOBS_MAX_THUMBNAILS)
+    size: int = Field(256, ge=16, le=1024)
+    aspect: Aspect = "1:1"
+
+class JobIn(BaseModel):
+    kind: Literal["render", "thumbnails"]
+    priority: Literal["high", "normal", "low"] = "normal"
+    render: Optional[RenderJob] = None
+    thumbnails: Optional[ThumbnailsJob] = None
+
+# ---------- TAREFAS NO POOL ----------
+def _encode_file(src: str, dst: str, width: int, height: int, level: int) -> int:
+    # Roda no processo filho: PNG em faixas a partir do buffer cru em disco
+    import numpy as np
+
+    def rows():
+        img = np.memmap(src, dtype=np.uint8, mode="r", shape=(height, width, 3))
+        for r0 in range(0, height, ROWS_PER_CHUNK):
+            yield img[r0:r0 + ROWS_PER_CHUNK]
+        del img
+
+    size = 0
+    with open(dst, "wb") as f:
+        for data in iter_png(rows(), width, height, level):
+            f.write(data)
+            size += len(data)
+    return size
+
+def _render_png(params: dict, width: int, height: int) -> bytes:
+    from mandala import render
+
+    return encode_png(render(MandalaParams(**params), width, height))
+
+def _process_pool(workers: int) -> Executor:
+    # spawn, como o pool de export: o servidor tem threads, fork não é seguro
+    log.info(f"Pool de jobs iniciado com {workers} processos.")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+class TaskQueue:
+    # Fila de prioridade na frente do pool dos jobs: só `slots` tarefas dela ficam
+    # no executor ao mesmo tempo, o resto espera aqui na ordem (prioridade, chegada).
+    # O executor é criado no primeiro submit e só recebe tarefas desta fila.
+    def __init__(self, slots: int, executor: Optional[Callable[[], Executor]] = None):
+        self.slots = slots
+        self.busy = 0
+        self.submitted = 0
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._new_executor = executor or (lambda: _process_pool(slots))
+        self._executor: Optional[Executor] = None
+
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._new_executor()
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def submit(self, priority: int, fn: Callable, *args) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), fut, fn, args))
+        self._pump()
+        return fut
+
+    def _pump(self) -> None:
+        while self.busy < self.slots and self._heap:
+            _, _, fut, fn, args = heapq.heappop(self._heap)
+            # Job cancelado: a tarefa sai da fila sem ir para o pool
+            if fut.cancelled():
+                continue
+            self.busy += 1
+            self.submitted += 1
+            cf = self.executor().submit(fn, *args)
+            loop = fut.get_loop()
+            cf.add_done_callback(lambda cf, fut=fut: loop.call_soon_threadsafe(self._finish, fut, cf))
+
+    def _finish(self, fut: asyncio.Future, cf) -> None:
+        self.busy -= 1
+        if not fut.cancelled():
+            if cf.cancelled():
+                fut.cancel()
+            elif cf.exception() is not None:
+                fut.set_exception(cf.exception())
+            else:
+                fut.set_result(cf.result())
+        self._pump()
+
+    def waiting(self) -> int:
+        return sum(1 for item in self._heap if not item[2].cancelled())
+
+# ---------- STORE DE ARTEFATOS ----------
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class ArtifactStore:
+    # Um arquivo por job; LRU por bytes (leitura conta como uso)
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.directory = root / str(os.getpid())
+        self.max_bytes = max_bytes
+        self._files: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def reset(self) -> None:
+        # Índice só em memória: cada processo usa um subdiretório pelo pid e, no
+        # startup, apaga o seu e os de processos que já morreram
+        self.root.mkdir(parents=True, exist_ok=True)
+        for entry in self.root.iterdir():
+            if entry == self.directory or (entry.name.isdigit() and not _alive(int(entry.name))):
+                shutil.rmtree(entry, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._files.clear()
+        self.bytes = 0
+
+    def temp_path(self, job_id: str, suffix: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"{job_id}{suffix}.tmp"
+
+    def put(self, job_id: str, tmp: Path) -> bool:
+        size = tmp.stat().st_size
+        if size > self.max_bytes:
+            tmp.unlink(missing_ok=True)
+            return False
+        path = tmp.with_suffix("")
+        os.replace(tmp, path)
+        self._files[job_id] = (path, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (old, old_size) = self._files.popitem(last=False)
+            self._unlink(old, old_size)
+            self.evictions += 1
+        return True
+
+    def get(self, job_id: str) -> Optional[Path]:
+        entry = self._files.get(job_id)
+        if entry is None:
+            return None
+        self._files.move_to_end(job_id)
+        return entry[0]
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._files
+
+    def remove(self, job_id: str) -> None:
+        entry = self._files.pop(job_id, None)
+        if entry is not None:
+            self._unlink(*entry)
+
+    def _unlink(self, path: Path, size: int) -> None:
+        # Um download em andamento mantém o arquivo aberto; no Linux ele
+        # continua legível até o fim mesmo depois do unlink
+        path.unlink(missing_ok=True)
+        self.bytes -= size
+
+    def stats(self) -> dict:
+        return {"files": len(self._files), "bytes": self.bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+# ---------- JOBS ----------
+class Job:
+    def __init__(self, owner: str, kind: str, priority: str, spec: dict, filename: str, media_type: str):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.priority = priority
+        # Já validado e resolvido no POST (ex.: presets lidos do banco)
+        self.spec = spec
+        self.filename = filename
+        self.media_type = media_type
+        self.state = "queued"
+        self.done = 0
+        self.total = 0
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.seq = 0
+        self.task: Optional[asyncio.Task] = None
+        # Um Event por conexão SSE aberta neste job
+        self.watchers: Set[asyncio.Event] = set()
+
+    def notify(self) -> None:
+        for wake in self.watchers:
+            wake.set()
+
+    def advance(self) -> None:
+        self.done += 1
+        self.notify()
+
+class JobManager:
+    def __init__(
+        self,
+        store: ArtifactStore,
+        tasks: TaskQueue,
+        max_running: int = JOBS_MAX_RUNNING,
+        per_user: int = JOBS_PER_USER,
+        queued_per_user: int = JOBS_QUEUED_PER_USER,
+        max_queued: int = JOBS_MAX_QUEUED,
+        ttl: float = JOBS_TTL,
+    ):
+        self.store = store
+        self.tasks = tasks
+        self.max_running = max_running
+        self.per_user = per_user
+        self.queued_per_user = queued_per_user
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[Job] = []
+        self._running: Set[Job] = set()
+        self._running_by_user: Counter = Counter()
+        self._queued_by_user: Counter = Counter()
+        self._seq = itertools.count()
+        self._reaper: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.finished: Counter = Counter()
+
+    # ---------- ENTRADA ----------
+    def check(self, owner: str) -> None:
+        # Antes de qualquer trabalho no POST (ex.: ler presets do banco)
+        if self._queued_by_user[owner] >= self.queued_per_user:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Jobs na fila demais para este usuário")
+        if len(self._queue) >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Fila de jobs cheia", headers={"Retry-After": "30"})
+
+    def submit(self, job: Job) -> Job:
+        self.check(job.owner)
+        job.seq = next(self._seq)
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        self._queued_by_user[job.owner] += 1
+        self.submitted += 1
+        self._schedule()
+        return job
+
+    def _ordered(self) -> List[Job]:
+        return sorted(self._queue, key=lambda j: (PRIORITIES[j.priority], j.seq))
+
+    def _schedule(self) -> None:
+        # Próximo da fila cujo dono ainda tem cota; quem estourou a cota não
+        # segura os jobs de outros usuários atrás dele
+        for job in self._ordered():
+            if len(self._running) >= self.max_running:
+                break
+            if self._running_by_user[job.owner] >= self.per_user:
+                continue
+            self._queue.remove(job)
+            self._queued_by_user[job.owner] -= 1
+            self._running.add(job)
+            self._running_by_user[job.owner] += 1
+            job.state = "running"
+            job.started = time.time()
+            job.task = asyncio.create_task(self._run(job))
+            job.notify()
+        # Posição na fila mudou para quem ficou
+        for job in self._queue:
+            job.notify()
+
+    async def _run(self, job: Job) -> None:
+        try:
+            tmp = await RUNNERS[job.kind](self, job)
+            if self.store.put(job.id, tmp):
+                job.state = "done"
+            else:
+                job.state, job.error = "error", "Artefato maior que o store de jobs"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+        except Exception as e:
+            log.exception(f"Job {job.id} ({job.kind}) falhou: {e}")
+            job.state, job.error = "error", "Falha ao processar o job"
+        finally:
+            for tmp in self.store.directory.glob(f"{job.id}*.tmp"):
+                tmp.unlink(missing_ok=True)
+            job.finished = time.time()
+            job.task = None
+            self.finished[job.state] += 1
+            self._running.discard(job)
+            self._running_by_user[job.owner] -= 1
+            if not self._running_by_user[job.owner]:
+                del self._running_by_user[job.owner]
+            job.notify()
+            self._schedule()
+
+    def cancel(self, job: Job) -> None:
+        if job in self._queue:
+            self._queue.remove(job)
+            self._queued_by_user[job.owner] -= 1
+            job.state = "cancelled"
+            job.finished = time.time()
+            self.finished["cancelled"] += 1
+            job.notify()
+            self._schedule()
+        elif job.task is not None:
+            job.task.cancel()
+
+    # ---------- CONSULTA ----------
+    def get(self, job_id: str, owner: str) -> Job:
+        job = self.jobs.get(job_id)
+        # Job de outro usuário: mesmo 404 de job inexistente
+        if job is None or job.owner != owner:
+            raise HTTPException(status_code=404, detail="Job não encontrado")
+        return job
+
+    def owned_by(self, owner: str) -> List[Job]:
+        return sorted((j for j in self.jobs.values() if j.owner == owner), key=lambda j: j.created, reverse=True)
+
+    def snapshot(self, job: Job) -> dict:
+        out = {
+            "id": job.id,
+            "kind": job.kind,
+            "priority": job.priority,
+            "state": job.state,
+            "done": job.done,
+            "total": job.total,
+            "created": job.created,
+            "started": job.started,
+            "finished": job.finished,
+        }
+        if job.state == "queued":
+            out["position"] = self._ordered().index(job)
+        if job.error is not None:
+            out["error"] = job.error
+        if job.state == "done":
+            # Evicted pelo LRU: o job continua consultável, o arquivo não
+            out["artifact"] = f"/api/jobs/{job.id}/artifact" if job.id in self.store else None
+        return out
+
+    # ---------- CICLO DE VIDA ----------
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.ttl))
+            cutoff = time.time() - self.ttl
+            for job in [j for j in self.jobs.values() if j.finished is not None and j.finished < cutoff]:
+                del self.jobs[job.id]
+                self.store.remove(job.id)
+
+    async def start(self) -> None:
+        await run_in_threadpool(self.store.reset)
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self) -> None:
+        running = [job.task for job in self._running if job.task is not None]
+        tasks = running + ([self._reaper] if self._reaper is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reaper = None
+        self.tasks.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "tasks_busy": self.tasks.busy,
+            "tasks_waiting": self.tasks.waiting(),
+            "tasks_submitted": self.tasks.submitted,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "done": self.finished["done"],
+            "failed": self.finished["error"],
+            "cancelled": self.finished["cancelled"],
+            "tracked": len(self.jobs),
+            "store_files": self.store.stats()["files"],
+            "store_bytes": self.store.bytes,
+            "store_evictions": self.store.evictions,
+        }
+
+# ---------- EXECUÇÃO ----------
+async def _run_render(manager: JobManager, job: Job) -> Path:
+    spec = RenderJob(**job.spec)
+    width, height = export_size(spec.size, spec.aspect)
+    priority = PRIORITIES[job.priority]
+    fd, raw = tempfile.mkstemp(prefix="mandala-job-", suffix=".rgb", dir=EXPORT_TMP_DIR)
+    os.close(fd)
+    # Mesmo buffer esparso do /api/export; os workers escrevem via memmap
+    os.truncate(raw, height * width * 3)
+    out = manager.store.temp_path(job.id, ".png")
+    params = spec.model_dump()
+    boxes = [
+        (x0, y0, min(width, x0 + spec.tile), min(height, y0 + spec.tile))
+        for y0 in range(0, height, spec.tile)
+        for x0 in range(0, width, spec.tile)
+    ]
+    # +1: a codificação do PNG, também no pool
+    job.total = len(boxes) + 1
+    futures = [manager.tasks.submit(priority, _render_tile, raw, width, height, params, box) for box in boxes]
+    try:
+        for fut in asyncio.as_completed(futures):
+            await fut
+            job.advance()
+        await manager.tasks.submit(priority, _encode_file, raw, str(out), width, height, EXPORT_PNG_LEVEL)
+        job.advance()
+    finally:
+        for fut in futures:
+            fut.cancel()
+        os.unlink(raw)
+    return out
+
+def _entry_name(index: int, name: str) -> str:
+    safe = "".join(c if c.isalnum() or c in " ._-" else "_" for c in name).strip() or "preset"
+    return f"{index + 1:03d}_{safe[:80]}.png"
+
+async def _run_thumbnails(manager: JobManager, job: Job) -> Path:
+    width, height = export_size(job.spec["size"], job.spec["aspect"])
+    priority = PRIORITIES[job.priority]
+    presets = job.spec["presets"]
+    cache = get_render_cache()
+    job.total = len(presets)
+    out = manager.store.temp_path(job.id, ".zip")
+
+    async def thumbnail(index: int, params: dict) -> Tuple[int, bytes]:
+        # Mesmo cache do /api/render: miniatura de preset já vista não vai ao pool
+        p = MandalaParams(**params)
+        key = cache_key(p, width, height)
+        data, _ = await run_in_threadpool(cache.get, key)
+        if data is None:
+            data = await manager.tasks.submit(priority, _render_png, params, width, height)
+            await run_in_threadpool(cache.put, key, data)
+        return index, data
+
+    futures = [asyncio.ensure_future(thumbnail(i, preset["data"])) for i, preset in enumerate(presets)]
+    try:
+        # PNG já é comprimido: zip sem deflate
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+            for fut in asyncio.as_completed(futures):
+                index, data = await fut
+                await run_in_threadpool(zf.writestr, _entry_name(index, presets[index]["name"]), data)
+                job.advance()
+    finally:
+        for fut in futures:
+            fut.cancel()
+    return out
+
+RUNNERS = {"render": _run_render, "thumbnails": _run_thumbnails}
+
+async def _load_presets(supabase, email: str, spec: ThumbnailsJob) -> List[dict]:
+    query = (
+        supabase.table("presets").select("name,data").eq("user_email", email).eq("deleted", False)
+        .order("name").limit(JOBS_MAX_THUMBNAILS)
+    )
+    if spec.names is not None:
+        query = query.in_("name", spec.names)
+    rows = (await execute(query)).data or []
+    if spec.names is not None:
+        found = {row["name"] for row in rows}
+        missing = [name for name in spec.names if name not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail={"message": "Presets não encontrados", "names": missing})
+        # Ordem pedida pelo cliente (nomes repetidos saem uma vez)
+        by_name = {row["name"]: row for row in rows}
+        rows = [by_name[name] for name in dict.fromkeys(spec.names)]
+    if not rows:
+        raise HTTPException(status_code=404, detail="Nenhum preset salvo")
+    presets = []
+    for row in rows:
+        try:
+            params = MandalaParams(**(row["data"] or {})).model_dump()
+        except (TypeError, ValidationError):
+            raise HTTPException(status_code=422, detail=f"Preset inválido: {row['name']}")
+        presets.append({"name": row["name"], "data": params})
+    return presets
+
+manager = JobManager(ArtifactStore(JOBS_STORE_DIR, JOBS_STORE_MB * 1024 * 1024), TaskQueue(JOBS_WORKERS))
+register_collector(lambda: gauge_lines("jobs", "Fila de jobs (/api/jobs)", manager.stats()))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream(job: Job):
+    # Cada conexão começa pelo estado atual: reconectar não perde nada
+    wake = asyncio.Event()
+    job.watchers.add(wake)
+    last = None
+    try:
+        while True:
+            wake.clear()
+            snap = manager.snapshot(job)
+            if job.state in FINISHED:
+                yield _sse(job.state, snap)
+                return
+            if snap != last:
+                last = snap
+                yield _sse("progress", snap)
+            try:
+                await asyncio.wait_for(wake.wait(), JOBS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+    finally:
+        job.watchers.discard(wake)
+
+# ---------- ROTAS ----------
+@router.post("", status_code=202)
+async def create_job(req: JobIn, user=Depends(get_current_user), supabase=Depends(get_supabase)):
+    email = user["email"]
+    manager.check(email)
+    if req.kind == "render":
+        spec = req.render or RenderJob()
+        width, height = export_size(spec.size, spec.aspect)
+        if height > JOBS_MAX_SIDE:
+            raise HTTPException(status_code=422, detail=f"Altura máxima de render é {JOBS_MAX_SIDE}px")
+        job = Job(email, "render", req.priority, spec.model_dump(), f"mandala_{width}x{height}.png", "image/png")
+    else:
+        spec = req.thumbnails or ThumbnailsJob()
+        try:
+            presets = await _load_presets(supabase, email, spec)
+        except SupabaseUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=e.headers())
+        job = Job(
+            email, "thumbnails", req.priority, {"size": spec.size, "aspect": spec.aspect, "presets": presets},
+            f"mandala_thumbnails_{spec.size}.zip", "application/zip",
+        )
+    manager.submit(job)
+    log.info(f"Job {job.id} ({job.kind}, {job.priority}) enfileirado para {email}.")
+    return manager.snapshot(job)
+
+# Leituras exigem acesso ativo, como o POST: acesso revogado não lista nem baixa artefatos
+@router.get("")
+async def list_jobs(user=Depends(get_current_user)):
+    return {"jobs": [manager.snapshot(job) for job in manager.owned_by(user["email"])]}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, user=Depends(get_current_user)):
+    return manager.snapshot(manager.get(job_id, user["email"]))
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, user=Depends(get_stream_user)):
+    # EventSource(`${API}/jobs/${id}/events?access_token=...`); fechar no evento done/error/cancelled
+    job = manager.get(job_id, user["email"])
+    return StreamingResponse(
+        _stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{job_id}/artifact")
+async def job_artifact(job_id: str, user=Depends(get_current_user)):
+    job = manager.get(job_id, user["email"])
+    if job.state != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job.state}")
+    path = manager.store.get(job.id)
+    if path is None:
+        raise HTTPException(status_code=410, detail="Artefato expirado; envie o job de novo")
+    return FileResponse(path, media_type=job.media_type, filename=job.filename)
+
+@router.delete("/{job_id}", status_code=202)
+async def cancel_job(job_id: str, user=Depends(get_current_user)):
+    job = manager.get(job_id, user["email"])
+    if job.state in FINISHED:
+        # Já terminou: DELETE descarta o artefato e o registro
+        manager.jobs.pop(job.id, None)
+        manager.store.remove(job.id)
+        return {"id": job.id, "state": "deleted"}
+    manager.cancel(job)
+    return manager.snapshot(job)
@@ -0,0 +1,142 @@
+# backend/mandala.py
+# Porta vetorizada (NumPy) do fragment shader `frag` de
+# frontend/src/components/WebGLMandalaGenerator.js, sem a textura do caleidoscópio.
+# Mantenha em sincronia com o GLSL: mesmas constantes, mesma ordem de operações.
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from params import ASPECT_MAP, RENDERER_VERSION, MandalaParams, export_size  # noqa: F401
+
+# ---------- HELPERS GLSL ----------
+def hex_to_linear(value: str) -> np.ndarray:
+    # THREE.Color(hex) converte sRGB -> linear (ColorManagement ativo no three r152+)
+    h = value.lstrip("#")
+    if len(h) == 3:
+        h = "".join(c * 2 for c in h)
+    srgb = np.array([int(h[i:i + 2], 16) / 255.0 for i in (0, 2, 4)], dtype=np.float32)
+    return np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+def smoothstep(e0: float, e1: float, x: np.ndarray) -> np.ndarray:
+    t = np.clip((x - e0) / (e1 - e0), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+def fract(x: np.ndarray) -> np.ndarray:
+    return x - np.floor(x)
+
+def hash21(px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    px = fract(px * np.float32(123.34))
+    py = fract(py * np.float32(345.45))
+    d = px * (px + np.float32(34.345)) + py * (py + np.float32(34.345))
+    return fract((px + d) * (py + d))
+
+def superformula(phi, m, a, b, n1, n2, n3):
+    t1 = np.abs(np.cos(m * phi / 4.0) / a) ** n2
+    t2 = np.abs(np.sin(m * phi / 4.0) / b) ** n3
+    with np.errstate(divide="ignore", over="ignore"):
+        return (t1 + t2) ** (-1.0 / max(0.0001, n1))
+
+def fold_angle(a: np.ndarray, sym: float) -> np.ndarray:
+    k = max(1.0, math.floor(sym))
+    wedge = 2.0 * math.pi / k
+    return np.abs(np.mod(a, wedge) - 0.5 * wedge)
+
+# ---------- GEOMETRIA ----------
+class Geometry:
+    # Tudo o que não depende do tempo, para uma região (x0, y0, x1, y1) da imagem:
+    # grade uv, raio/ângulo dobrado (sem efeito), termos radiais e campo de estrelas.
+    def __init__(self, p: MandalaParams, width: int, height: int, box: Optional[Tuple[int, int, int, int]] = None):
+        x0, y0, x1, y1 = box or (0, 0, width, height)
+        self.shape = (y1 - y0, x1 - x0)
+        # gl_FragCoord: centro do pixel, origem embaixo à esquerda; linha 0 da imagem é o topo
+        fx = np.arange(x0, x1, dtype=np.float32) + np.float32(0.5)
+        fy = np.float32(height) - np.arange(y0, y1, dtype=np.float32) - np.float32(0.5)
+        fx, fy = np.meshgrid(fx, fy)
+        self.ux = (fx - np.float32(0.5 * width)) / np.float32(height) - np.float32(p.centerX)
+        self.uy = (fy - np.float32(0.5 * height)) / np.float32(height) - np.float32(p.centerY)
+        self.r0 = np.hypot(self.ux, self.uy)
+
+        self.effect = 0 if p.effectType <= 0.5 else (1 if p.effectType < 1.5 else 2)
+        self.r_mod = self.a_fold = self.fall = self.aura = self.radial = None
+        if self.effect == 0:
+            self._radial_terms(self.r0, np.arctan2(self.uy, self.ux), p)
+
+        self.stars = None
+        if p.starsOn:
+            seed = np.float32(p.starSeed * 100.0)
+            h = hash21(fx * np.float32(0.5) + seed, fy * np.float32(0.5) + seed)
+            stars = (h >= np.float32(1.0 - p.starDensity)).astype(np.float32) * np.float32(p.starIntensity)
+            self.stars = stars[..., None]
+
+        self.col1 = hex_to_linear(p.col1)
+        self.col2 = hex_to_linear(p.col2)
+        self.col3 = hex_to_linear(p.col3)
+        c3 = self.col3 + np.float32(0.2)
+        self.aura_col = (c3 / np.linalg.norm(c3)).astype(np.float32)
+
+    def _radial_terms(self, r: np.ndarray, a: np.ndarray, p: MandalaParams) -> None:
+        self.a_fold = fold_angle(a, p.sym)
+        self.r_mod = r * np.float32(p.scale)
+        self.fall = np.exp(np.float32(-2.0) * self.r_mod * self.r_mod)
+        self.aura = (smoothstep(1.2, 0.2, self.r_mod) * np.float32(0.35))[..., None]
+        self.radial = smoothstep(0.0, 1.2, self.r_mod)
+
+    def at_time(self, p: MandalaParams, t: float) -> "Geometry":
+        # Com ripple/wave o raio e o ângulo dependem do tempo
+        if self.effect == 0:
+            return self
+        amp = np.float32(p.effectAmp * 0.12)
+        if self.effect == 1:
+            k = np.float32(6.2831 * (1.0 + 4.0 * p.effectFreq))
+            ripple = np.sin(self.r0 * k - np.float32(t * 2.0)) * amp
+            dx = self.ux * (1.0 + ripple)
+            dy = self.uy * (1.0 + ripple)
+        else:
+            k = np.float32(10.0 * (1.0 + 9.0 * p.effectFreq))
+            dx = self.ux + np.sin(self.uy * k + np.float32(t * 2.0)) * amp
+            dy = self.uy + np.cos(self.ux * k + np.float32(t * 2.0)) * amp
+        frame = object.__new__(Geometry)
+        frame.__dict__.update(self.__dict__)
+        frame._radial_terms(np.hypot(dx, dy), np.arctan2(dy, dx), p)
+        return frame
+
+# ---------- SHADER ----------
+def shade(geom: Geometry, p: MandalaParams, time: Optional[float] = None) -> np.ndarray:
+    # Retorna float32 (h, w, 3) já com gamma, em [0, 1]
+    t = (p.time if time is None else time) * p.speed
+    frame = geom.at_time(p, t)
+    r_mod, a_fold = frame.r_mod, frame.a_fold
+
+    a_mod = a_fold + np.float32(0.25 * math.sin(t * 0.33))
+    m = 6.0 + 4.0 * math.sin(t * 0.2 + p.seed * 6.2831)
+    sf = superformula(a_mod, np.float32(m), 1.0, 1.0, 0.6 + 0.4 * math.sin(t * 0.11), 8.0, 8.0)
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        bands = np.sin(np.float32(10.0) * r_mod - sf * np.float32(6.0) + np.float32(t)) \
+            + np.float32(0.5) * np.sin(np.float32(21.0) * r_mod + np.float32(0.7 * t))
+    petals = np.cos(np.float32(m * 0.5) * a_mod + np.float32(2.0 * math.sin(t * 0.17)))
+    field = np.nan_to_num(bands * petals)
+
+    gl = smoothstep(0.4, 0.0, np.abs(field)) * frame.fall
+    gl = gl ** np.float32(0.8) * (np.float32(0.6) + np.float32(0.4) * np.sin(np.float32(t * 0.5) + r_mod * np.float32(3.0)))
+
+    g = frame.radial + (np.clip(gl, 0.0, 1.0) - frame.radial) * np.float32(p.gradMix)
+    w12 = smoothstep(0.0, 0.6, g)[..., None]
+    w3 = smoothstep(0.35, 1.0, g)[..., None]
+    col12 = geom.col1 + (geom.col2 - geom.col1) * w12
+    col = col12 + (geom.col3 - col12) * w3
+    col += frame.aura * geom.aura_col
+
+    if geom.stars is not None:
+        col += geom.stars
+    col *= np.float32(max(0.0, p.glow) * (1.0 - p.bgDim))
+    np.clip(col, 0.0, 1.0, out=col)
+    return col ** np.float32(0.4545)
+
+def to_rgb8(col: np.ndarray) -> np.ndarray:
+    return (col * np.float32(255.0) + np.float32(0.5)).astype(np.uint8)
+
+def render(p: MandalaParams, width: int, height: int, box: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    # uint8 (h, w, 3) da região `box` (ou da imagem inteira)
+    return to_rgb8(shade(Geometry(p, width, height, box), p))
@@ -0,0 +1,215 @@
+# backend/metrics.py
+# Métricas em processo no formato texto do Prometheus, sem coletor externo:
+# contadores, gauges e histogramas com labels, um middleware ASGI por rota
+# (template, não o path cru) e o /api/metrics que expõe tudo.
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+router = APIRouter()
+
+# Segundos; cobre de respostas em cache até exports longos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+# ---------- PRIMITIVAS ----------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # por série: [contagem por bucket..., soma, total]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for k, s in items:
+            acc = 0.0
+            for bound, n in zip(self.buckets, s):
+                acc += n
+                le = 'le="%s"' % _fmt_value(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {_fmt_value(acc)}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {_fmt_value(s[-1])}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {_fmt_value(s[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {_fmt_value(s[-1])}")
+        return lines
+
+# ---------- REGISTRO ----------
+_metrics: List[_Metric] = []
+# Coletores extras: funções que devolvem linhas prontas (ex.: stats do StatusWriter)
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+def register(metric: _Metric) -> _Metric:
+    _metrics.append(metric)
+    return metric
+
+def register_collector(fn: Callable[[], Iterable[str]]) -> None:
+    _collectors.append(fn)
+
+def gauge_lines(name: str, help: str, values: Dict[str, float]) -> List[str]:
+    # Helper para coletores: um gauge sem labels por chave de `values`
+    lines = []
+    for key, v in values.items():
+        lines += [f"# HELP {name}_{key} {help}", f"# TYPE {name}_{key} gauge", f"{name}_{key} {_fmt_value(v)}"]
+    return lines
+
+def render_text() -> str:
+    lines: List[str] = []
+    for m in _metrics:
+        lines += m.collect()
+    for fn in _collectors:
+        lines += list(fn())
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUESTS = register(Counter("http_requests_total", "Requisições HTTP por rota", ("method", "route", "status")))
+HTTP_IN_FLIGHT = register(Gauge("http_requests_in_flight", "Requisições HTTP em andamento por rota", ("method", "route")))
+HTTP_LATENCY = register(Histogram("http_request_duration_seconds", "Latência HTTP por rota", ("method", "route")))
+SUPABASE_CALLS = register(Counter("supabase_requests_total", "Chamadas .execute() ao Supabase", ("table", "operation", "outcome")))
+SUPABASE_LATENCY = register(Histogram("supabase_request_duration_seconds", "Latência das chamadas ao Supabase", ("table", "operation")))
+
+# ---------- SUPABASE ----------
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+def describe_query(query) -> Tuple[str, str]:
+    # (tabela, operação) a partir do request builder do postgrest
+    req = getattr(query, "request", query)
+    path = str(getattr(req, "path", "") or "")
+    table = path.rstrip("/").rsplit("/", 1)[-1] or "unknown"
+    method = getattr(req, "http_method", "") or ""
+    operation = _OPERATIONS.get(method.upper(), method.lower() or "unknown")
+    headers = getattr(req, "headers", None)
+    if operation == "insert" and headers is not None and "resolution=" in (headers.get("prefer") or ""):
+        operation = "upsert"
+    return table, operation
+
+def observe_supabase(table: str, operation: str, seconds: float, outcome: str) -> None:
+    SUPABASE_CALLS.inc(table, operation, outcome)
+    SUPABASE_LATENCY.observe(table, operation, value=seconds)
+
+# ---------- MIDDLEWARE ----------
+class MetricsMiddleware:
+    # ASGI puro (sem BaseHTTPMiddleware): só embrulha o send para pegar o status
+    def __init__(self, app, routes_app=None, cache_size: int = 10000):
+        self.app = app
+        self.routes_app = routes_app
+        self.cache_size = cache_size
+        self._templates: Dict[Tuple[str, str], str] = {}
+
+    def route_template(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is not None:
+            return template
+        template = "unmatched"
+        partial: Optional[str] = None
+        for route in getattr(self.routes_app, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        else:
+            template = partial or template
+        # Paths com parâmetros (emails, ids) não podem crescer o cache sem limite
+        if len(self._templates) >= self.cache_size:
+            self._templates.clear()
+        self._templates[key] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        route = self.route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe(method, route, value=time.perf_counter() - started)
+            HTTP_IN_FLIGHT.dec(method, route)
+            HTTP_REQUESTS.inc(method, route, str(status["code"]))
+
+# ---------- ROTA ----------
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(render_text(), media_type="text/plain; version=0.0.4")
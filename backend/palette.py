@@ -0,0 +1,239 @@
+# backend/palette.py
+# /api/palette: paleta de 3 cores extraída de uma imagem, pronta para col1/col2/col3
+# (u_col1..3 do shader). k-means vetorizado sobre a imagem reduzida, com orçamento
+# de tempo por imagem: estourou, devolve os centróides que já tem.
+# Resultado em cache pelo hash do conteúdo (o mesmo id de /api/textures), então
+# reenviar a mesma imagem ou pedir por uma textura já enviada sai na hora.
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from textures import TEXTURE_MAX_PIXELS, TEXTURE_MAX_UPLOAD, _texture_dir, _valid_digest
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PALETTE_SAMPLE_SIDE = int(os.getenv("PALETTE_SAMPLE_SIDE", "96"))
+PALETTE_K = int(os.getenv("PALETTE_K", "8"))
+PALETTE_MAX_ITER = int(os.getenv("PALETTE_MAX_ITER", "30"))
+PALETTE_BUDGET_MS = float(os.getenv("PALETTE_BUDGET_MS", "50"))
+PALETTE_CACHE = int(os.getenv("PALETTE_CACHE", "1024"))
+# Distância mínima (sRGB 0..1) entre as cores escolhidas: evita 3 tons do mesmo fundo
+PALETTE_MIN_DISTANCE = float(os.getenv("PALETTE_MIN_DISTANCE", "0.12"))
+
+router = APIRouter(prefix="/palette")
+
+# ---------- AMOSTRA ----------
+def sample_pixels(data: bytes, side: int = PALETTE_SAMPLE_SIDE) -> "np.ndarray":
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as im:
+        if im.width * im.height > TEXTURE_MAX_PIXELS:
+            raise HTTPException(status_code=413, detail="Imagem grande demais")
+        # JPEG já decodifica reduzido; o resto é um thumbnail barato
+        im.draft("RGB", (side * 2, side * 2))
+        im = ImageOps.exif_transpose(im).convert("RGBA")
+        im.thumbnail((side, side), Image.BILINEAR)
+        rgba = np.asarray(im).reshape(-1, 4)
+    # Pixels transparentes não contam (PNG de recorte)
+    opaque = rgba[rgba[:, 3] >= 128]
+    if len(opaque):
+        rgba = opaque
+    return rgba[:, :3].astype(np.float32) / np.float32(255.0)
+
+# ---------- K-MEANS ----------
+def _sq_distances(px: "np.ndarray", centers: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    # |x|² - 2x·c + |c|², uma matmul em vez de (n, k, 3) em memória
+    d = (px * px).sum(1)[:, None] - 2.0 * (px @ centers.T) + (centers * centers).sum(1)[None, :]
+    return np.maximum(d, 0.0, out=d)
+
+def _init_centers(px: "np.ndarray", k: int, rng) -> "np.ndarray":
+    import numpy as np
+
+    # k-means++: cada novo centro sorteado proporcional à distância aos já escolhidos
+    centers = [px[rng.integers(len(px))]]
+    closest = ((px - centers[0]) ** 2).sum(1)
+    for _ in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            break
+        centers.append(px[rng.choice(len(px), p=closest / total)])
+        closest = np.minimum(closest, ((px - centers[-1]) ** 2).sum(1))
+    return np.array(centers, dtype=np.float32)
+
+def kmeans(px: "np.ndarray", k: int, max_iter: int, deadline: float, seed: int = 0) -> Tuple["np.ndarray", "np.ndarray", int, bool]:
+    # (centros, população de cada um, iterações, convergiu)
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = _init_centers(px, min(k, len(px)), rng)
+    k = len(centers)
+    labels = np.zeros(len(px), dtype=np.intp)
+    converged = False
+    iterations = 0
+    while iterations < max_iter and time.perf_counter() < deadline:
+        new_labels = _sq_distances(px, centers).argmin(1)
+        iterations += 1
+        if iterations > 1 and np.array_equal(new_labels, labels):
+            converged = True
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.stack([np.bincount(labels, weights=px[:, c], minlength=k) for c in range(3)], axis=1)
+        filled = counts > 0
+        # Cluster vazio mantém o centro anterior
+        centers[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    if not iterations:
+        labels = _sq_distances(px, centers).argmin(1)
+    counts = np.bincount(labels, minlength=k)
+    return centers, counts, iterations, converged
+
+# ---------- RANKING ----------
+def _hex(rgb: "np.ndarray") -> str:
+    r, g, b = (int(round(min(1.0, max(0.0, float(c))) * 255)) for c in rgb)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+def rank(centers: "np.ndarray", counts: "np.ndarray") -> Tuple[List[int], "np.ndarray", "np.ndarray"]:
+    # Peso = fração de pixels, com bônus de saturação: fundo cinza/preto dominante
+    # não deve ganhar de uma cor viva que ocupa menos área
+    import numpy as np
+
+    share = counts / max(1, int(counts.sum()))
+    mx, mn = centers.max(1), centers.min(1)
+    saturation = (mx - mn) / np.maximum(mx, 1e-6)
+    score = share * (0.25 + saturation)
+    order = [int(i) for i in np.argsort(-score, kind="stable") if counts[i] > 0]
+    return order, share, score
+
+def pick3(centers: "np.ndarray", order: List[int]) -> List[int]:
+    # As 3 melhores respeitando PALETTE_MIN_DISTANCE; se faltar, completa pela ordem
+    import numpy as np
+
+    chosen: List[int] = []
+    for i in order:
+        if all(np.linalg.norm(centers[i] - centers[j]) >= PALETTE_MIN_DISTANCE for j in chosen):
+            chosen.append(i)
+            if len(chosen) == 3:
+                return chosen
+    for i in order:
+        if len(chosen) == 3:
+            break
+        if i not in chosen:
+            chosen.append(i)
+    while len(chosen) < 3:
+        chosen.append(chosen[-1])
+    return chosen
+
+def extract(data: bytes, budget_ms: float = PALETTE_BUDGET_MS) -> dict:
+    started = time.perf_counter()
+    try:
+        px = sample_pixels(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Imagem inválida: {e}")
+    if not len(px):
+        raise HTTPException(status_code=422, detail="Imagem vazia")
+    centers, counts, iterations, converged = kmeans(
+        px, PALETTE_K, PALETTE_MAX_ITER, started + budget_ms / 1000.0,
+    )
+    order, share, score = rank(centers, counts)
+    col1, col2, col3 = (_hex(centers[i]) for i in pick3(centers, order))
+    return {
+        "col1": col1,
+        "col2": col2,
+        "col3": col3,
+        "palette": [
+            {"hex": _hex(centers[i]), "share": round(float(share[i]), 4), "score": round(float(score[i]), 4)}
+            for i in order
+        ],
+        "pixels": int(len(px)),
+        "iterations": iterations,
+        "converged": converged,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+# ---------- CACHE ----------
+class PaletteCache:
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            result = self._items.get(digest)
+            if result is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(digest)
+            self.hits += 1
+            return result
+
+    def put(self, digest: str, result: dict) -> None:
+        with self._lock:
+            self._items[digest] = result
+            self._items.move_to_end(digest)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"items": len(self._items), "hits": self.hits, "misses": self.misses}
+
+palette_cache = PaletteCache(PALETTE_CACHE)
+
+def palette_for(digest: str, data: bytes) -> dict:
+    cached = palette_cache.get(digest)
+    if cached is not None:
+        return {"id": digest, **cached, "cached": True}
+    result = extract(data)
+    palette_cache.put(digest, result)
+    return {"id": digest, **result, "cached": False}
+
+def _texture_bytes(digest: str) -> bytes:
+    # Textura já enviada: usa o menor nível com lado >= amostra (já reduzido e em disco)
+    if not _valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Textura não encontrada")
+    folder = _texture_dir(digest)
+    levels = sorted(folder.glob("L*.png"), key=lambda p: int(p.stem[1:]))
+    if not levels:
+        raise HTTPException(status_code=404, detail="Textura não encontrada")
+    from PIL import Image
+
+    for path in reversed(levels):
+        with Image.open(path) as im:
+            if max(im.size) >= PALETTE_SAMPLE_SIDE:
+                return path.read_bytes()
+    return levels[0].read_bytes()
+
+# ---------- ROTAS ----------
+@router.post("")
+async def palette_from_upload(file: UploadFile = File(...)):
+    data = await file.read(TEXTURE_MAX_UPLOAD + 1)
+    if len(data) > TEXTURE_MAX_UPLOAD:
+        raise HTTPException(status_code=413, detail=f"Upload maior que {TEXTURE_MAX_UPLOAD // (1024 * 1024)}MB")
+    # Mesmo hash de /api/textures: o id serve para as duas rotas
+    digest = hashlib.sha256(data).hexdigest()
+    return await run_in_threadpool(palette_for, digest, data)
+
+@router.get("/{digest}")
+async def palette_from_texture(digest: str):
+    cached = palette_cache.get(digest)
+    if cached is not None:
+        return {"id": digest, **cached, "cached": True}
+    data = await run_in_threadpool(_texture_bytes, digest)
+    result = await run_in_threadpool(extract, data)
+    palette_cache.put(digest, result)
+    return {"id": digest, **result, "cached": False}
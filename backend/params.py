@@ -0,0 +1,87 @@
+# backend/params.py
+# Parâmetros do mandala (mesmos nomes do preset da UI) e regras de tamanho.
+# Sem NumPy: é o que as rotas importam no startup; a porta do shader
+# (mandala.py) só é carregada quando algo é de fato renderizado.
+import math
+from typing import Tuple
+
+from pydantic import AfterValidator, BaseModel, FiniteFloat, StringConstraints
+from typing_extensions import Annotated
+
+# Versão da porta; entra na chave do cache de render
+RENDERER_VERSION = 1
+
+# Proporções do seletor de aspect da UI (aspectMap)
+ASPECT_MAP = {
+    "1:1": (1, 1),
+    "4:5": (4, 5),
+    "16:9": (16, 9),
+    "9:16": (9, 16),
+}
+
+def _check_aspect(value: str) -> str:
+    if value not in ASPECT_MAP:
+        raise ValueError(f"aspect deve ser um de {list(ASPECT_MAP)}")
+    return value
+
+# Campo `aspect` de render/export/animação/jobs: proporção desconhecida é 422
+# na validação, em vez de cair em 1:1 no export_size
+Aspect = Annotated[str, AfterValidator(_check_aspect)]
+
+# Cor hex como o input type=color da UI manda; 3 dígitos também (hex_to_linear expande)
+HexColor = Annotated[str, StringConstraints(pattern=r"^#?(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")]
+
+class MandalaParams(BaseModel):
+    # Mesmos nomes e defaults do preset salvo pela UI (savePreset).
+    # inf/nan e cor fora do formato são 422 aqui, não 500 no canonical()/renderer;
+    # anotados no campo (não em model_config) para valer também no GET com Depends()
+    sym: FiniteFloat = 12
+    glow: FiniteFloat = 1.2
+    speed: FiniteFloat = 0.6
+    scale: FiniteFloat = 1.2
+    centerX: FiniteFloat = 0.0
+    centerY: FiniteFloat = 0.0
+    col1: HexColor = "#ff6b6b"
+    col2: HexColor = "#ffa726"
+    col3: HexColor = "#ffcc02"
+    gradMix: FiniteFloat = 0.7
+    seed: FiniteFloat = 0.5
+    bgDim: FiniteFloat = 0.0
+    starsOn: bool = False
+    starDensity: FiniteFloat = 0.05
+    starIntensity: FiniteFloat = 0.8
+    starSeed: FiniteFloat = 0.5
+    effectType: FiniteFloat = 0
+    effectAmp: FiniteFloat = 0.3
+    effectFreq: FiniteFloat = 0.8
+    time: FiniteFloat = 0.0
+
+    def canonical(self) -> dict:
+        # Só o que muda a imagem: o shader usa time*speed, e parâmetros de
+        # estrelas/efeito desligados não entram na chave
+        out = {
+            "v": RENDERER_VERSION,
+            "sym": max(1.0, math.floor(self.sym)),
+            "glow": _q(max(0.0, self.glow)),
+            "t": _q(self.time * self.speed),
+            "scale": _q(self.scale),
+            "center": [_q(self.centerX), _q(self.centerY)],
+            "cols": [c.lower() for c in (self.col1, self.col2, self.col3)],
+            "gradMix": _q(self.gradMix),
+            "seed": _q(self.seed),
+            "bgDim": _q(self.bgDim),
+        }
+        if self.starsOn:
+            out["stars"] = [_q(self.starDensity), _q(self.starIntensity), _q(self.starSeed)]
+        if self.effectType > 0.5:
+            out["effect"] = [1 if self.effectType < 1.5 else 2, _q(self.effectAmp), _q(self.effectFreq)]
+        return out
+
+def _q(x: float) -> float:
+    return float(f"{x:.6g}")
+
+def export_size(size: int, aspect: str) -> Tuple[int, int]:
+    # Mesma regra do savePNG da UI: `size` é a largura, altura pela proporção
+    aw, ah = ASPECT_MAP.get(aspect, (1, 1))
+    # Math.round do JS (meio arredonda para cima), não o round bancário do Python
+    return max(1, size), max(1, math.floor(size * ah / aw + 0.5))
@@ -0,0 +1,69 @@
+# backend/png.py
+# Encoder PNG mínimo (RGB 8 bits) só com zlib, para poder gerar a imagem
+# em blocos de linhas sem montar o arquivo inteiro em memória.
+import struct
+import zlib
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def header(width: int, height: int) -> bytes:
+    # IHDR: 8 bits por canal, cor RGB (2), sem entrelaçamento
+    return PNG_SIGNATURE + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+def filter_rows(rows: "np.ndarray", prev: Optional["np.ndarray"]) -> bytes:
+    # Filtro "Up" (tipo 2) vetorizado: cada linha menos a anterior, mod 256
+    import numpy as np
+
+    h, w, _ = rows.shape
+    flat = rows.reshape(h, w * 3)
+    above = np.empty_like(flat)
+    above[0] = 0 if prev is None else prev.reshape(w * 3)
+    above[1:] = flat[:-1]
+    out = np.empty((h, w * 3 + 1), dtype=np.uint8)
+    out[:, 0] = 2
+    np.subtract(flat, above, out=out[:, 1:], dtype=np.uint8, casting="unsafe")
+    return out.tobytes()
+
+def iter_png(blocks: Iterable["np.ndarray"], width: int, height: int, level: int = 6) -> Iterator[bytes]:
+    # blocks: arrays uint8 (linhas, width, 3), de cima para baixo
+    yield header(width, height)
+    z = zlib.compressobj(level)
+    prev = None
+    for rows in blocks:
+        data = z.compress(filter_rows(rows, prev))
+        prev = rows[-1].copy()
+        if data:
+            yield chunk(b"IDAT", data)
+    yield chunk(b"IDAT", z.flush())
+    yield chunk(b"IEND", b"")
+
+def encode_png(rgb: "np.ndarray", level: int = 6) -> bytes:
+    h, w, _ = rgb.shape
+    return b"".join(iter_png([rgb], w, h, level))
+
+def compress_image(rgb: "np.ndarray", level: int = 6) -> bytes:
+    # Payload zlib de uma imagem inteira (IDAT/fdAT), pronto para ser embrulhado
+    return zlib.compress(filter_rows(rgb, None), level)
+
+def png_from_payload(width: int, height: int, payload: bytes) -> bytes:
+    return header(width, height) + chunk(b"IDAT", payload) + chunk(b"IEND", b"")
+
+# ---------- APNG ----------
+def apng_header(width: int, height: int, num_frames: int, num_plays: int = 0) -> bytes:
+    return header(width, height) + chunk(b"acTL", struct.pack(">II", num_frames, num_plays))
+
+def apng_frame(index: int, width: int, height: int, payload: bytes, delay_num: int, delay_den: int) -> bytes:
+    # fcTL e fdAT compartilham a numeração: quadro 0 usa IDAT (seq 0),
+    # os demais usam fcTL (seq 2i-1) + fdAT (seq 2i)
+    seq = 0 if index == 0 else 2 * index - 1
+    fctl = chunk(b"fcTL", struct.pack(">IIIIIHHBB", seq, width, height, 0, 0, delay_num, delay_den, 0, 0))
+    if index == 0:
+        return fctl + chunk(b"IDAT", payload)
+    return fctl + chunk(b"fdAT", struct.pack(">I", seq + 1) + payload)
@@ -0,0 +1,187 @@
+# backend/presets.py
+# /api/presets: presets da UI (antes só no localStorage, mandala_preset_*) guardados
+# no Supabase por usuário, com ETag forte, paginação por cursor e sync incremental.
+#
+# Tabela esperada:
+#   create sequence presets_version_seq;
+#   create table presets (
+#     user_email text not null,
+#     name       text not null,
+#     data       jsonb not null default '{}',
+#     version    bigint not null default 0,
+#     deleted    boolean not null default false,
+#     updated_at timestamptz not null default now(),
+#     primary key (user_email, name)
+#   );
+#   create index on presets (user_email, version);
+#
+#   create function presets_stamp() returns trigger language plpgsql as $$
+#   begin
+#     -- Escritas do mesmo usuário em fila até o commit: a próxima só pega
+#     -- nextval depois que esta estiver visível
+#     perform pg_advisory_xact_lock(hashtext('presets:' || new.user_email));
+#     new.version := nextval('presets_version_seq');
+#     new.updated_at := now();
+#     return new;
+#   end $$;
+#   create trigger presets_stamp before insert or update on presets
+#     for each row execute function presets_stamp();
+#
+# `version` vem do banco (volta no `returning` das escritas), nunca do relógio
+# de um processo, e cresce a cada escrita, inclusive delete, que vira tombstone.
+# Com o lock por usuário, as versões de um usuário ficam na ordem de commit:
+# quem leu até V no /changes não vê aparecer depois uma linha < V. Por isso o
+# maior version do usuário identifica o estado inteiro da coleção.
+import base64
+import binascii
+import hashlib
+import json
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from auth import get_current_user
+from db import execute, get_supabase
+from resilience import SupabaseUnavailable
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+router = APIRouter(prefix="/presets")
+
+COLUMNS = "name,data,version,deleted,updated_at"
+
+class PresetIn(BaseModel):
+    data: dict
+
+# ---------- VERSÃO ----------
+async def current_version(supabase: "AsyncClient", email: str) -> int:
+    res = await execute(
+        supabase.table("presets").select("version").eq("user_email", email)
+        .order("version", desc=True).limit(1)
+    )
+    return res.data[0]["version"] if res.data else 0
+
+# ---------- CURSOR / ETAG ----------
+def encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"n": name}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)["n"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:32] + '"'
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+# ---------- ROTAS ----------
+@router.get("")
+async def list_presets(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    email = user["email"]
+    # ETag pelo estado da coleção + página: o 304 sai sem ler nenhum preset
+    version = await current_version(supabase, email)
+    etag = make_etag(email, version, cursor, limit)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    query = (
+        supabase.table("presets").select(COLUMNS)
+        .eq("user_email", email).eq("deleted", False)
+        .order("name").limit(limit + 1)
+    )
+    if cursor:
+        query = query.gt("name", decode_cursor(cursor))
+    res = await execute(query)
+    rows = res.data or []
+    next_cursor = encode_cursor(rows[limit - 1]["name"]) if len(rows) > limit else None
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return {"presets": rows[:limit], "next_cursor": next_cursor, "version": version}
+
+@router.get("/changes")
+async def preset_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    user=Depends(get_current_user),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    # Só o que mudou desde `since`, incluindo tombstones (deleted=true)
+    res = await execute(
+        supabase.table("presets").select(COLUMNS)
+        .eq("user_email", user["email"]).gt("version", since)
+        .order("version").limit(limit)
+    )
+    rows = res.data or []
+    version = rows[-1]["version"] if rows else since
+    return {"changes": rows, "version": version, "has_more": len(rows) == limit}
+
+@router.get("/{name}")
+async def get_preset(
+    name: str,
+    request: Request,
+    user=Depends(get_current_user),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    res = await execute(
+        supabase.table("presets").select(COLUMNS)
+        .eq("user_email", user["email"]).eq("name", name).eq("deleted", False).limit(1)
+    )
+    if not res.data:
+        raise HTTPException(status_code=404, detail="Preset não encontrado")
+    row = res.data[0]
+    etag = make_etag(user["email"], name, row["version"])
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=json.dumps(row),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+@router.put("/{name}")
+async def save_preset(
+    name: str,
+    input: PresetIn,
+    user=Depends(get_current_user),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    # version e updated_at ficam com o trigger presets_stamp
+    row = {"user_email": user["email"], "name": name, "data": input.data, "deleted": False}
+    try:
+        res = await execute(supabase.table("presets").upsert(row, on_conflict="user_email,name"))
+    except SupabaseUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao salvar preset: {e}")
+    return {"name": name, "version": res.data[0]["version"]}
+
+@router.delete("/{name}")
+async def delete_preset(
+    name: str,
+    user=Depends(get_current_user),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    # Tombstone em vez de delete físico, para o /changes propagar a remoção
+    res = await execute(
+        supabase.table("presets")
+        .update({"data": {}, "deleted": True})
+        .eq("user_email", user["email"]).eq("name", name).eq("deleted", False)
+    )
+    if not res.data:
+        raise HTTPException(status_code=404, detail="Preset não encontrado")
+    return {"name": name, "version": res.data[0]["version"]}
@@ -0,0 +1,253 @@
+# backend/profiler.py
+# Profiler por amostragem, ligado por requisição: header X-Profile assinado ou
+# "armar" as próximas N requisições pelo admin. Uma thread amostra a pilha da
+# task da requisição a cada PROFILE_INTERVAL_MS:
+#   - se a task está rodando, a pilha real da thread do loop (CPU: JWT, serialização...)
+#   - se está suspensa, a cadeia de awaits da corrotina, com o awaitable na ponta
+#     (I/O do Supabase, single-flight do auth...)
+# O resultado fica em memória no formato "collapsed stacks" (flamegraph.pl,
+# speedscope, inferno) e sai pelo GET /api/admin/profiles/{id}.
+#
+# Sem ADMIN_TOKEN o middleware nem é instalado; com ele e nada armado, o custo
+# por requisição é olhar um bool e os headers. A thread só existe durante um perfil.
+import asyncio
+import hashlib
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally, OrderedDict
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOKEN_MAX_TTL = 3600
+
+router = APIRouter(prefix="/admin")
+
+# ---------- HEADER ASSINADO ----------
+def sign_token(expires: int, key: str = ADMIN_TOKEN) -> str:
+    mac = hmac.new(key.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{mac}"
+
+def valid_token(token: str, key: str = ADMIN_TOKEN) -> bool:
+    expires, _, _ = token.partition(".")
+    if not key or not expires.isdigit():
+        return False
+    remaining = int(expires) - time.time()
+    if remaining <= 0 or remaining > PROFILE_TOKEN_MAX_TTL:
+        return False
+    return hmac.compare_digest(token, sign_token(int(expires), key))
+
+# ---------- AMOSTRAGEM ----------
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def _await_chain(coro) -> List[str]:
+    # Corrotina suspensa: segue cr_await até o awaitable que a prende
+    names = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        nxt = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        if nxt is None:
+            break
+        if not (hasattr(nxt, "cr_frame") or hasattr(nxt, "gi_frame")):
+            names.append(f"[await {type(nxt).__name__}]")
+            break
+        coro = nxt
+    return names
+
+class Session:
+    def __init__(self, id: str, method: str, path: str, task: asyncio.Task, thread_id: int, root_frame):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.task = task
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.stacks: Tally = Tally()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status = 0
+
+    def sample(self, frames: Dict[int, object]) -> None:
+        task = self.task
+        if task is None:
+            return
+        # Task rodando agora: a pilha da thread passa pelo frame raiz desta requisição
+        stack: List[str] = []
+        frame = frames.get(self.thread_id)
+        while frame is not None:
+            stack.append(_frame_name(frame))
+            if frame is self.root_frame:
+                break
+            frame = frame.f_back
+        if frame is not None:
+            stack.reverse()
+        else:
+            stack = ["[suspended]"] + _await_chain(task.get_coro())
+        self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL * 1000,
+        }
+
+class Profiler:
+    def __init__(self, interval: float = PROFILE_INTERVAL, keep: int = PROFILE_KEEP):
+        self.interval = interval
+        self.keep = keep
+        self._active: Dict[str, Session] = {}
+        self._done: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        # Modo armado pelo admin: próximas `armed` requisições com path em `prefix`
+        self.armed = 0
+        self.prefix = "/api/"
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                sessions = list(self._active.values())
+                if not sessions:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for session in sessions:
+                try:
+                    session.sample(frames)
+                except Exception:
+                    # Pilha mudou no meio da leitura: descarta a amostra
+                    pass
+            del frames
+            time.sleep(self.interval)
+
+    def begin(self, method: str, path: str, root_frame) -> Session:
+        session = Session(
+            f"{int(time.time())}-{next(self._ids)}", method, path,
+            asyncio.current_task(), threading.get_ident(), root_frame,
+        )
+        with self._lock:
+            self._active[session.id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def end(self, session: Session) -> None:
+        session.duration_ms = (time.perf_counter() - session.started) * 1000
+        session.task = session.root_frame = None
+        with self._lock:
+            self._active.pop(session.id, None)
+            self._done[session.id] = session
+            while len(self._done) > self.keep:
+                self._done.popitem(last=False)
+
+    def take_armed(self, path: str) -> bool:
+        if self.armed > 0 and path.startswith(self.prefix):
+            self.armed -= 1
+            return True
+        return False
+
+    def get(self, id: str) -> Optional[Session]:
+        with self._lock:
+            return self._done.get(id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [s.summary() for s in reversed(self._done.values())]
+
+profiler = Profiler()
+
+# ---------- MIDDLEWARE ----------
+class ProfilingMiddleware:
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def wanted(self, scope) -> bool:
+        for key, value in scope.get("headers", ()):
+            if key == b"x-profile":
+                return valid_token(value.decode("latin-1"))
+        return self.profiler.take_armed(scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wanted(scope):
+            return await self.app(scope, receive, send)
+        session = self.profiler.begin(scope["method"], scope["path"], sys._getframe())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.end(session)
+
+# ---------- ROTAS (admin) ----------
+def require_admin(x_admin_token: str = Header("")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de admin inválido")
+
+class ArmRequest(BaseModel):
+    count: int = Field(1, ge=1, le=1000)
+    path_prefix: str = "/api/"
+
+@router.post("/profiler/token", dependencies=[Depends(require_admin)])
+async def profile_token(ttl: int = Query(300, ge=1, le=PROFILE_TOKEN_MAX_TTL)):
+    # Valor para o header X-Profile; vale até expirar, para qualquer rota
+    return {"header": "X-Profile", "value": sign_token(int(time.time()) + ttl), "ttl": ttl}
+
+@router.post("/profiler", dependencies=[Depends(require_admin)])
+async def arm_profiler(input: ArmRequest):
+    profiler.armed = input.count
+    profiler.prefix = input.path_prefix
+    return {"armed": profiler.armed, "path_prefix": profiler.prefix}
+
+@router.delete("/profiler", dependencies=[Depends(require_admin)])
+async def disarm_profiler():
+    profiler.armed = 0
+    return {"armed": 0}
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return {"armed": profiler.armed, "path_prefix": profiler.prefix, "profiles": profiler.list()}
+
+@router.get("/profiles/{id}", dependencies=[Depends(require_admin)])
+async def get_profile(id: str):
+    session = profiler.get(id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{id}.collapsed"'},
+    )
@@ -0,0 +1,247 @@
+# backend/render.py
+# /api/render: PNG do mandala renderizado no servidor (mandala.py), com cache
+# endereçado por conteúdo (hash dos parâmetros canônicos) em memória e em disco.
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import Field
+from starlette.concurrency import run_in_threadpool
+
+from params import Aspect, MandalaParams, export_size
+from png import encode_png
+
+log = logging.getLogger("mandala5")
+
+RENDER_MAX_SIDE = int(os.getenv("RENDER_MAX_SIDE", "2048"))
+# Misses renderizando ao mesmo tempo (cada um aloca centenas de MB em float32
+# a 2048²) e quantos podem esperar vaga antes de virar 503
+RENDER_MAX_CONCURRENT = int(os.getenv("RENDER_MAX_CONCURRENT", "0")) or os.cpu_count() or 1
+RENDER_MAX_QUEUED = int(os.getenv("RENDER_MAX_QUEUED", "16"))
+
+router = APIRouter()
+
+# ---------- MODELOS ----------
+class RenderRequest(MandalaParams):
+    width: int = Field(512, ge=16, le=RENDER_MAX_SIDE)
+    # Sem height, a altura sai do aspect (mesma regra do export da UI)
+    height: Optional[int] = Field(None, ge=16, le=RENDER_MAX_SIDE)
+    aspect: Aspect = "1:1"
+
+    def size(self) -> Tuple[int, int]:
+        if self.height is not None:
+            return self.width, self.height
+        w, h = export_size(self.width, self.aspect)
+        return w, min(h, RENDER_MAX_SIDE)
+
+def cache_key(params: MandalaParams, width: int, height: int) -> str:
+    canon = {**params.canonical(), "size": [width, height]}
+    raw = json.dumps(canon, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+# ---------- CACHE ----------
+class RenderCache:
+    # LRU em memória (limitado em bytes) na frente de um diretório em disco, também
+    # LRU: hit em disco renova o mtime do arquivo e, passado max_disk_bytes, uma
+    # varredura apaga os mais antigos até 90% do limite. A varredura lê o
+    # diretório de verdade, então vale para vários workers no mesmo diretório.
+    def __init__(self, directory: Optional[Path], max_bytes: int, max_disk_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Estimativa do disco; None até a primeira varredura (no primeiro put)
+        self._disk_bytes: Optional[int] = None
+        # get/put rodam no threadpool
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Tuple[Optional[bytes], str]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits_mem += 1
+                return data, "hit-mem"
+        if self.directory is not None:
+            try:
+                data = self._path(key).read_bytes()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                self.hits_disk += 1
+                self._touch(self._path(key))
+                self._remember(key, data)
+                return data, "hit-disk"
+        self.misses += 1
+        return None, "miss"
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.directory is not None:
+            path = self._path(key)
+            path.parent.mkdir(exist_ok=True)
+            # Escrita atômica: outro worker nunca lê um PNG pela metade
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(data)
+                over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+            if over:
+                self.sweep()
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def sweep(self) -> None:
+        # Uma varredura por vez; quem chegar durante uma já em curso não repete
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            for path in self.directory.glob("*/*.png"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in files)
+            if total > self.max_disk_bytes:
+                target = self.max_disk_bytes * 0.9
+                for _, size, path in sorted(files, key=lambda f: f[0]):
+                    if total <= target:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    self.disk_evictions += 1
+            with self._lock:
+                self._disk_bytes = total
+        finally:
+            self._sweep_lock.release()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._mem[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._mem),
+            "bytes": self._bytes,
+            "hits_mem": self.hits_mem,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "disk_bytes": self._disk_bytes or 0,
+            "disk_evictions": self.disk_evictions,
+        }
+
+_cache: Optional[RenderCache] = None
+
+def get_render_cache() -> RenderCache:
+    global _cache
+    if _cache is None:
+        directory = os.getenv("RENDER_CACHE_DIR", str(Path(tempfile.gettempdir()) / "mandala5-render"))
+        _cache = RenderCache(
+            Path(directory) if directory else None,
+            int(os.getenv("RENDER_CACHE_MEM_MB", "64")) * 1024 * 1024,
+            int(os.getenv("RENDER_CACHE_DISK_MB", "1024")) * 1024 * 1024,
+        )
+    return _cache
+
+# Renders em andamento por chave: pedidos iguais simultâneos esperam o mesmo
+_inflight: Dict[str, asyncio.Future] = {}
+# Vagas de render (misses): a rota é pública e fora do controle de admissão
+_render_slots = asyncio.Semaphore(RENDER_MAX_CONCURRENT)
+_render_waiting = 0
+
+def _render_and_store(req: RenderRequest, width: int, height: int, key: str) -> bytes:
+    from mandala import render
+
+    data = encode_png(render(req, width, height))
+    get_render_cache().put(key, data)
+    return data
+
+async def _render_limited(req: RenderRequest, width: int, height: int, key: str) -> bytes:
+    global _render_waiting
+    if _render_slots.locked() and _render_waiting >= RENDER_MAX_QUEUED:
+        raise HTTPException(status_code=503, detail="Renders em andamento demais", headers={"Retry-After": "5"})
+    _render_waiting += 1
+    try:
+        await _render_slots.acquire()
+    finally:
+        _render_waiting -= 1
+    try:
+        return await run_in_threadpool(_render_and_store, req, width, height, key)
+    finally:
+        _render_slots.release()
+
+async def render_cached(req: RenderRequest) -> Tuple[str, bytes, str]:
+    width, height = req.size()
+    key = cache_key(req, width, height)
+    cache = get_render_cache()
+    data, source = await run_in_threadpool(cache.get, key)
+    if data is not None:
+        return key, data, source
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(_render_limited(req, width, height, key))
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+    return key, await asyncio.shield(fut), "miss"
+
+# ---------- ROTAS ----------
+async def _png_response(request: Request, req: RenderRequest) -> Response:
+    width, height = req.size()
+    etag = f'"{cache_key(req, width, height)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    _, data, source = await render_cached(req)
+    headers["X-Render-Cache"] = source
+    return Response(content=data, media_type="image/png", headers=headers)
+
+@router.post("/render")
+async def render_post(req: RenderRequest, request: Request):
+    return await _png_response(request, req)
+
+@router.get("/render")
+async def render_get(request: Request, req: RenderRequest = Depends()):
+    # Versão GET para <img src>: mesmos parâmetros na query string
+    return await _png_response(request, req)
+
+@router.get("/render/cache")
+async def render_cache_stats():
+    return get_render_cache().stats()
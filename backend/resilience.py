@@ -0,0 +1,320 @@
+# backend/resilience.py
+# Camada de resiliência em volta das chamadas ao Supabase (usada por db.execute):
+#   - prazo por operação: leituras desistem antes das escritas (SUPABASE_READ_TIMEOUT)
+#   - hedge opcional para leituras: se a primeira não voltou em SUPABASE_HEDGE_MS,
+#     dispara uma segunda igual e fica com a que chegar antes
+#   - circuit breaker: com a taxa de falhas de infraestrutura alta, as chamadas
+#     falham na hora (503 + Retry-After) em vez de prender requisições até o timeout
+#   - cache stale-while-revalidate para as respostas de user_access: durante uma
+#     queda curta, o auth continua respondendo com a última resposta boa
+# Estado do breaker em /api/health e em /api/metrics.
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+import httpx
+from fastapi import APIRouter
+
+from metrics import Counter, gauge_lines, register, register_collector
+
+log = logging.getLogger("mandala5")
+
+# Escritas seguem com SUPABASE_TIMEOUT (db.pool_settings)
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "3"))
+# 0 desliga; um valor perto do p95 das leituras limita o custo extra a ~5% das chamadas
+SUPABASE_HEDGE_MS = float(os.getenv("SUPABASE_HEDGE_MS", "0"))
+
+BREAKER = os.getenv("BREAKER", "1").lower() in ("1", "true", "yes")
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "10"))  # segundos
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "5"))
+
+USER_ACCESS_TTL = float(os.getenv("USER_ACCESS_TTL", "5"))
+USER_ACCESS_SWR = float(os.getenv("USER_ACCESS_SWR", "30"))
+USER_ACCESS_STALE_IF_ERROR = float(os.getenv("USER_ACCESS_STALE_IF_ERROR", "300"))
+USER_ACCESS_CACHE_SIZE = int(os.getenv("USER_ACCESS_CACHE_SIZE", "100000"))
+
+# Relógio do breaker e do cache (os testes trocam só este, não o do event loop)
+_now = time.monotonic
+
+HEDGES = register(Counter("supabase_hedges_total", "Leituras com segunda requisição (hedge)", ("outcome",)))
+STALE_SERVED = register(Counter("stale_served_total", "Respostas servidas do cache stale", ("cache", "reason")))
+
+router = APIRouter()
+
+class SupabaseUnavailable(Exception):
+    # Vira 503 + Retry-After (handler em server.py)
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Supabase indisponível ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+# Códigos do Postgres/PostgREST que indicam banco doente, não requisição errada:
+# conexão (08), recursos (53), cancelado/statement timeout e shutdown (57),
+# erro interno (XX) e PGRST000-003 (PostgREST sem conexão/pool esgotado)
+_INFRA_CODE_PREFIXES = ("08", "53", "57", "XX", "PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+def is_infra_failure(exc: BaseException) -> bool:
+    if isinstance(exc, (SupabaseUnavailable, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        # APIError sem JSON (gateway): o código é o status HTTP
+        return code >= 500
+    return isinstance(code, str) and code.startswith(_INFRA_CODE_PREFIXES)
+
+# ---------- CIRCUIT BREAKER ----------
+class CircuitBreaker:
+    # closed -> open quando, na janela de BREAKER_WINDOW s, há >= min_calls chamadas e a
+    # taxa de falhas passa de failure_rate. Depois de open_seconds vai a half_open:
+    # uma única chamada de teste; sucesso fecha, falha reabre.
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(
+        self,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        enabled: bool = BREAKER,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+        self.state = self.CLOSED
+        # Um balde [ok, falha] por segundo da janela
+        self._buckets: Dict[int, List[int]] = {}
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened_total = 0
+        self.short_circuited = 0
+        self.last_error = ""
+
+    def _prune(self, now: float) -> None:
+        oldest = int(now) - self.window + 1
+        for second in [s for s in self._buckets if s < oldest]:
+            del self._buckets[second]
+
+    def _counts(self, now: float) -> Tuple[int, int]:
+        self._prune(now)
+        ok = sum(b[0] for b in self._buckets.values())
+        failed = sum(b[1] for b in self._buckets.values())
+        return ok, failed
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - _now())
+
+    def before_call(self) -> bool:
+        # True se a chamada é o teste do half_open; SupabaseUnavailable se o circuito está aberto
+        if not self.enabled or self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.short_circuited += 1
+        raise SupabaseUnavailable("circuit_open", max(1.0, self.retry_after()))
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record(self, ok: bool, probe: bool = False, error: str = "") -> None:
+        if not self.enabled:
+            return
+        now = _now()
+        if probe:
+            self._probing = False
+            if ok:
+                self._close()
+            else:
+                self._open(now, error)
+            return
+        if int(now) not in self._buckets:
+            # Um balde novo por segundo: descarta os que saíram da janela mesmo sem falhas
+            self._prune(now)
+        bucket = self._buckets.setdefault(int(now), [0, 0])
+        bucket[0 if ok else 1] += 1
+        if ok:
+            return
+        self.last_error = error
+        if self.state == self.CLOSED:
+            total_ok, failed = self._counts(now)
+            total = total_ok + failed
+            if total >= self.min_calls and failed / total >= self.failure_rate:
+                self._open(now, error)
+
+    def _open(self, now: float, error: str) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        self.opened_total += 1
+        self.last_error = error
+        log.warning(f"Circuit breaker do Supabase ABERTO por {self.open_seconds}s: {error}")
+
+    def _close(self) -> None:
+        self.state = self.CLOSED
+        self._buckets.clear()
+        log.info("Circuit breaker do Supabase fechado.")
+
+    def stats(self) -> dict:
+        ok, failed = self._counts(_now())
+        return {
+            "state": self.state,
+            "window_ok": ok,
+            "window_failed": failed,
+            "opened_total": self.opened_total,
+            "short_circuited": self.short_circuited,
+            "retry_after_seconds": round(self.retry_after(), 3) if self.state != self.CLOSED else 0,
+            "last_error": self.last_error,
+        }
+
+breaker = CircuitBreaker()
+
+# ---------- HEDGE ----------
+async def hedged(call: Callable[[], Awaitable], delay: float):
+    # Segunda requisição só se a primeira passar de `delay`; a que perder é cancelada
+    first = asyncio.ensure_future(call())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            HEDGES.inc("fired")
+            tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        HEDGES.inc("won")
+                    return task.result()
+        # Todas falharam: vale o erro da original
+        return first.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+# ---------- STALE-WHILE-REVALIDATE ----------
+K = TypeVar("K")
+V = TypeVar("V")
+
+class StaleCache(Generic[K, V]):
+    # até ttl: serve direto; até swr: serve e revalida em background (uma vez por chave);
+    # até stale_if_error: só se a consulta falhar por infraestrutura.
+    # invalidate avança a geração da chave: uma consulta que começou antes dele
+    # (revalidação ou miss em andamento) ainda responde a quem esperava por ela,
+    # mas não grava a linha velha de volta no cache.
+    def __init__(self, name: str, ttl: float, swr: float, stale_if_error: float, max_items: int):
+        self.name = name
+        self.ttl = ttl
+        self.swr = max(swr, ttl)
+        self.stale_if_error = max(stale_if_error, self.swr)
+        self.max_items = max_items
+        self._items: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self._revalidating: Dict[K, asyncio.Task] = {}
+        # Só chaves já invalidadas; as demais estão na geração 0
+        self._generations: "OrderedDict[K, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, key: K) -> int:
+        return self._generations.get(key, 0)
+
+    def _store(self, key: K, value: V, generation: int) -> V:
+        if generation != self.generation(key):
+            return value
+        self._items[key] = (value, _now())
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return value
+
+    def peek(self, key: K, max_age: float) -> Tuple[bool, Optional[V]]:
+        entry = self._items.get(key)
+        if entry is None or _now() - entry[1] > max_age:
+            return False, None
+        return True, entry[0]
+
+    def invalidate(self, key: K) -> None:
+        self._items.pop(key, None)
+        self._generations[key] = self.generation(key) + 1
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.max_items:
+            self._generations.popitem(last=False)
+        task = self._revalidating.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def _revalidate(self, key: K, loader: Callable[[K], Awaitable[V]]) -> None:
+        if key in self._revalidating:
+            return
+
+        generation = self.generation(key)
+
+        async def run():
+            try:
+                self._store(key, await loader(key), generation)
+            except Exception as e:
+                log.info(f"{self.name}: revalidação de {key} falhou: {e}")
+            finally:
+                if self._revalidating.get(key) is task:
+                    del self._revalidating[key]
+
+        task = self._revalidating[key] = asyncio.create_task(run())
+
+    async def get(self, key: K, loader: Callable[[K], Awaitable[V]]) -> V:
+        entry = self._items.get(key)
+        age = _now() - entry[1] if entry is not None else None
+        if age is not None and age <= self.ttl:
+            self.hits += 1
+            return entry[0]
+        if age is not None and age <= self.swr:
+            self.hits += 1
+            self._revalidate(key, loader)
+            return entry[0]
+        self.misses += 1
+        generation = self.generation(key)
+        try:
+            return self._store(key, await loader(key), generation)
+        except Exception as e:
+            if age is not None and age <= self.stale_if_error and is_infra_failure(e):
+                STALE_SERVED.inc(self.name, getattr(e, "reason", type(e).__name__))
+                return entry[0]
+            raise
+
+    def stats(self) -> dict:
+        return {"items": len(self._items), "hits": self.hits, "misses": self.misses, "revalidating": len(self._revalidating)}
+
+# email -> linha de user_access (None = sem acesso); usado por auth.get_user_access
+user_access_cache: StaleCache = StaleCache(
+    "user_access", USER_ACCESS_TTL, USER_ACCESS_SWR, USER_ACCESS_STALE_IF_ERROR, USER_ACCESS_CACHE_SIZE,
+)
+
+def _metrics() -> List[str]:
+    stats = breaker.stats()
+    state = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}[stats["state"]]
+    values = {k: v for k, v in stats.items() if k not in ("state", "last_error")}
+    return (
+        gauge_lines("supabase_breaker", "Circuit breaker do Supabase (state: 0=closed 1=half_open 2=open)", {"state": state, **values})
+        + gauge_lines("user_access_cache", "Cache stale-while-revalidate de user_access", user_access_cache.stats())
+    )
+
+register_collector(_metrics)
+
+# ---------- ROTAS ----------
+@router.get("/health")
+async def health():
+    # 200 mesmo com o breaker aberto: o processo está de pé, quem depende do
+    # Supabase é que responde 503. Serve para o operador ver o estado.
+    state = breaker.stats()
+    return {"status": "ok" if state["state"] == CircuitBreaker.CLOSED else "degraded", "supabase": state}
@@ -0,0 +1,190 @@
+# backend/responses.py
+# Caminho rápido de resposta: JSON via orjson como response class padrão,
+# msgpack quando o cliente pede no Accept e compressão (br/gzip) só acima de
+# COMPRESS_MIN_SIZE e só para tipos que comprimem (PNG/zip passam direto).
+# orjson, msgpack e brotli são opcionais: sem eles, json da stdlib / só JSON / só gzip.
+import contextvars
+import json
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-ndjson", "text/")
+# SSE fica aberto por horas: um compressor por conexão (~300KB de estado zlib)
+# custa mais que os poucos bytes de cada evento
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Formato negociado para a requisição atual (ver NegotiationMiddleware)
+_wants_msgpack: contextvars.ContextVar[bool] = contextvars.ContextVar("wants_msgpack", default=False)
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    # Response class padrão do app: orjson, ou msgpack se negociado pelo Accept
+    def render(self, content: Any) -> bytes:
+        if _wants_msgpack.get():
+            msgpack = _msgpack()
+            if msgpack is not None:
+                self.media_type = "application/msgpack"
+                # datetimes já chegam como string (jsonable_encoder / model_dump mode=json)
+                return msgpack.packb(content, use_bin_type=True, default=str)
+        return dumps(content)
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        if self.status_code != 204:
+            MutableHeaders(raw=self.raw_headers).add_vary_header("Accept")
+
+# ---------- NEGOCIAÇÃO ----------
+def parse_qlist(header: str) -> Dict[str, float]:
+    # "a/b;q=0.5, c" -> {"a/b": 0.5, "c": 1.0}
+    out: Dict[str, float] = {}
+    for part in header.lower().split(","):
+        name, *params = [x.strip() for x in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        out[name] = q
+    return out
+
+def accepts_msgpack(accept: str) -> bool:
+    offered = parse_qlist(accept)
+    q = max((offered.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    return q > 0 and q >= offered.get("application/json", 0.0)
+
+class NegotiationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _wants_msgpack.set(accepts_msgpack(Headers(scope=scope).get("accept", "")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _wants_msgpack.reset(token)
+
+# ---------- COMPRESSÃO ----------
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = parse_qlist(accept_encoding)
+    if offered.get("br", 0) > 0 and _brotli() is not None:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = _brotli().Compressor(quality=BROTLI_QUALITY)
+            self._z = None
+        else:
+            self._br = None
+            self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush por chunk: em streaming (NDJSON) cada página sai assim que chega
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.finish()
+        return self._z.compress(data) + self._z.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: dict = {}
+        state = {"mode": None}  # None até o primeiro body; depois "pass" ou "compress"
+        compressor: Optional[_Compressor] = None
+
+        async def send_wrapper(message):
+            nonlocal compressor
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if state["mode"] is None:
+                headers = MutableHeaders(raw=start["headers"])
+                ctype = headers.get("content-type", "")
+                compressible = (
+                    "content-encoding" not in headers
+                    and ctype.startswith(COMPRESSIBLE_TYPES)
+                    and not ctype.startswith(UNCOMPRESSED_TYPES)
+                    and (more or len(body) >= self.minimum_size)
+                )
+                if not compressible:
+                    state["mode"] = "pass"
+                    await send(start)
+                    return await send(message)
+                state["mode"] = "compress"
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more:
+                    del headers["Content-Length"]
+                    body = compressor.chunk(body)
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                return await send({"type": "http.response.body", "body": body, "more_body": more})
+
+            if state["mode"] == "pass":
+                return await send(message)
+            body = compressor.chunk(body) if more else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
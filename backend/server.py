@@ -1,22 +1,139 @@
 # backend/server.py
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request
-from starlette.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
-import os, uuid, logging
+# startup primeiro: o cronômetro do cold start começa antes dos imports pesados
+from startup import phase, phases, report_ready, report_warmup
 
-from auth import get_current_user
-from supabase import create_client, Client
+with phase("import_framework"):
+    from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+    from fastapi.responses import StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+    from starlette.datastructures import MutableHeaders
+    from starlette.middleware.cors import CORSMiddleware
+    from pydantic import BaseModel, Field, ValidationError
+    from contextlib import asynccontextmanager
+    from datetime import datetime
+    from typing import TYPE_CHECKING, AsyncIterator, List, Optional
+    import os, uuid, logging, time, json, asyncio, importlib, base64, binascii
+
+with phase("import_core"):
+    from access_events import hub as access_events_hub, router as access_events_router
+    from access_index import get_access_index, router as access_router, start_access_index, stop_access_index
+    from admission import AdmissionMiddleware
+    from auth import JWT_SECRET, get_current_user, get_user_access, install_token_log_filter
+    from db import init_db, close_db, configure_threadpool, execute, get_supabase
+    from status_writer import StatusWriter
+    from profiler import ADMIN_TOKEN, ProfilingMiddleware, router as admin_router
+    from resilience import SupabaseUnavailable, router as health_router, user_access_cache
+    from responses import CompressionMiddleware, FastJSONResponse, NegotiationMiddleware, dumps
+    from metrics import MetricsMiddleware, gauge_lines, register_collector, router as metrics_router
+
+# Rotas de imagem só importam params/png; NumPy, PIL e a porta do shader
+# (mandala.py) carregam no primeiro render ou no aquecimento em background
+with phase("import_routes"):
+    from render import router as render_router
+    from export import router as export_router, shutdown_pool as shutdown_export_pool
+    from animation import router as animation_router
+    from presets import router as presets_router
+    from textures import router as textures_router
+    from palette import palette_cache, router as palette_router
+    from jobs import manager as job_manager, router as jobs_router
+    from render import get_render_cache
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 # ---------- LOGGING ----------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 log = logging.getLogger("mandala5")
 
+# ---------- STATUS (write-behind opcional) ----------
+STATUS_WRITE_BEHIND = os.getenv("STATUS_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", "500"))
+STATUS_BULK_MAX = int(os.getenv("STATUS_BULK_MAX", "10000"))
+# Corpo do /status/bulk, checado enquanto é lido (antes do parse)
+STATUS_BULK_MAX_BYTES = int(os.getenv("STATUS_BULK_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# ---------- STATUS (leitura) ----------
+# Índices esperados para a paginação por (timestamp, id):
+#   create index on status_checks (timestamp desc, id desc);
+#   create index on status_checks (client_name, timestamp desc, id desc);
+STATUS_PAGE_MAX = int(os.getenv("STATUS_PAGE_MAX", "1000"))
+STATUS_STREAM_PAGE = int(os.getenv("STATUS_STREAM_PAGE", "1000"))
+STATUS_COLUMNS = ("id", "client_name", "timestamp")
+
+# ---------- USER STATUS (lote) ----------
+USER_STATUS_BATCH_MAX = int(os.getenv("USER_STATUS_BATCH_MAX", "500"))
+# Emails por query `in`: mantém a URL do PostgREST num tamanho seguro
+USER_STATUS_IN_CHUNK = int(os.getenv("USER_STATUS_IN_CHUNK", "150"))
+
+# ---------- CICLO DE VIDA ----------
+# STARTUP_WARMUP=0: nada além do essencial no startup; cliente Supabase e NumPy
+# são criados/importados no primeiro uso. Com 1 (padrão), o aquecimento roda em
+# background depois que o app já está aceitando conexões.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1").lower() in ("1", "true", "yes")
+WARMUP_MODULES = ("mandala", "PIL.Image")
+
+async def _warmup():
+    with phase("warmup_supabase"):
+        try:
+            # Cliente async único (db.py), compartilhado com auth.py
+            await init_db()
+        except Exception as e:
+            log.error(f"Aquecimento: cliente Supabase não criado ({e}); nova tentativa no primeiro uso.")
+    with phase("warmup_imports"):
+        for name in WARMUP_MODULES:
+            await run_in_threadpool(importlib.import_module, name)
+    report_warmup()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with phase("lifespan"):
+        configure_threadpool()
+        # Depois do dictConfig do uvicorn: ?access_token= não vai para o access log
+        install_token_log_filter()
+        app.state.status_writer = None
+        if STATUS_WRITE_BEHIND:
+            writer = StatusWriter(
+                max_batch=STATUS_BATCH_SIZE,
+                flush_interval=float(os.getenv("STATUS_FLUSH_INTERVAL", "0.25")),
+                max_queue=int(os.getenv("STATUS_QUEUE_MAX", "10000")),
+                max_retries=int(os.getenv("STATUS_FLUSH_RETRIES", "5")),
+            )
+            await writer.start()
+            app.state.status_writer = writer
+        # Índice de user_access (ACCESS_INDEX=1): a carga inicial roda em background
+        await start_access_index()
+        await access_events_hub.start()
+        await job_manager.start()
+    report_ready()
+    warmup = asyncio.create_task(_warmup()) if STARTUP_WARMUP else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    # Jobs em execução viram "cancelled" antes de o pool ser desligado
+    await job_manager.stop()
+    await access_events_hub.stop()
+    await stop_access_index()
+    # Esvazia a fila de write-behind antes de fechar o pool
+    if app.state.status_writer is not None:
+        await app.state.status_writer.stop()
+    shutdown_export_pool()
+    await close_db()
+
 # ---------- APP ----------
-app = FastAPI()
+# orjson (ou msgpack via Accept) em todas as rotas que devolvem dict/model
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 api = APIRouter(prefix="/api")
 
+@app.exception_handler(SupabaseUnavailable)
+async def supabase_unavailable(request: Request, exc: SupabaseUnavailable):
+    # Circuit breaker aberto ou prazo estourado (resilience.py): falha rápida e honesta
+    return FastJSONResponse({"detail": str(exc)}, status_code=503, headers=exc.headers())
+
+# ---------- ADMISSÃO ----------
+# Registrado antes do CORS = camada mais interna: 429/503 ainda levam os
+# headers de CORS e o front consegue ler o Retry-After
+app.add_middleware(AdmissionMiddleware, secret=JWT_SECRET)
+
 # ---------- CORS ----------
 ALLOWED_ORIGINS = [
     "https://yantralab.netlify.app",
@@ -29,26 +146,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Next-Cursor"],
 )
 
-# ---------- SUPABASE (em app.state) ----------
-def create_supabase_client() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")  # service role só no backend
-    if not url or not key:
-        # Log claro no Render; não vaza a chave inteira
-        log.error("Env faltando: SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY ausentes.")
-        raise RuntimeError("Defina SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY no Render/Env Group")
-    log.info(f"SUPABASE_URL OK; SERVICE_ROLE_KEY prefix: {key[:6]}******")
-    return create_client(url, key)
-
-@app.on_event("startup")
-def on_startup():
-    app.state.supabase = create_supabase_client()
-    log.info("Supabase client inicializado.")
-
-def get_supabase(request: Request) -> Client:
-    return request.app.state.supabase
+# ---------- SERIALIZAÇÃO / COMPRESSÃO ----------
+# br/gzip só acima de COMPRESS_MIN_SIZE e só para JSON/NDJSON/msgpack/texto
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(NegotiationMiddleware)
+
+# ---------- PROFILER ----------
+# Só com ADMIN_TOKEN. Todos os middlewares são ASGI puro: a task amostrada é a
+# mesma que roda o handler e as dependências
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
+# ---------- TIMING ----------
+# ASGI puro (era @app.middleware("http")): o BaseHTTPMiddleware põe uma task e
+# um stream intermediários em cada resposta, o que dobrava a memória de cada
+# conexão SSE aberta (/api/access-events)
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                timings = [f"total;dur={total_ms:.1f}"]
+                # auth_ms é preenchido por get_current_user (auth.py) em request.state
+                auth_ms = scope.get("state", {}).get("auth_ms")
+                if auth_ms is not None:
+                    timings.append(f"auth;dur={auth_ms:.1f}")
+                    log.info(f"{scope['method']} {scope['path']} total={total_ms:.1f}ms auth={auth_ms:.1f}ms")
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                headers["Server-Timing"] = ", ".join(timings)
+                message["headers"] = headers.raw
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+app.add_middleware(ServerTimingMiddleware)
+
+# ---------- MÉTRICAS ----------
+# Registrado por último = camada mais externa: mede CORS e Server-Timing também
+app.add_middleware(MetricsMiddleware, routes_app=app)
+
+def get_status_writer(request: Request) -> Optional[StatusWriter]:
+    return request.app.state.status_writer
+
+def _status_writer_metrics():
+    writer = getattr(app.state, "status_writer", None)
+    if writer is None:
+        return []
+    return gauge_lines("status_writer", "Contadores do write-behind de status_checks", writer.stats())
+
+register_collector(_status_writer_metrics)
+def _access_index_metrics():
+    index = get_access_index()
+    if index is None:
+        return []
+    return gauge_lines("access_index", "Índice em memória de user_access", index.stats())
+
+register_collector(_access_index_metrics)
+register_collector(lambda: gauge_lines("startup_ms", "Duração das fases do cold start (ms)", phases()))
+register_collector(lambda: gauge_lines("render_cache", "Cache de render (/api/render)", get_render_cache().stats()))
+register_collector(lambda: gauge_lines("palette_cache", "Cache de paletas (/api/palette)", palette_cache.stats()))
 
 # ---------- MODELOS ----------
 class StatusCheck(BaseModel):
@@ -59,33 +225,312 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class UserStatusBatch(BaseModel):
+    emails: List[str]
+
 # ---------- ROTAS ----------
 @api.get("/")
-def root():
+async def root():
     return {"message": "OK"}
 
 @api.post("/status", response_model=StatusCheck)
-def create_status_check(input: StatusCheckCreate, supabase: Client = Depends(get_supabase)):
-    obj = StatusCheck(client_name=input.client_name)
+async def create_status_check(
+    input: StatusCheckCreate,
+    supabase: "AsyncClient" = Depends(get_supabase),
+    writer: Optional[StatusWriter] = Depends(get_status_writer),
+):
+    # model_dump(mode="json") (pydantic-core) no lugar do jsonable_encoder; a resposta
+    # sai pronta, sem o FastAPI validar e serializar o StatusCheck de novo
+    row = StatusCheck(client_name=input.client_name).model_dump(mode="json")
+    if writer is not None:
+        try:
+            await writer.submit(row)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Fila de status cheia", headers={"Retry-After": "1"})
+        return FastJSONResponse(row)
     try:
-        supabase.table("status_checks").insert(obj.dict()).execute()
+        await execute(supabase.table("status_checks").insert(row))
+    except SupabaseUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Falha ao salvar status: {e}")
-    return obj
+    return FastJSONResponse(row)
+
+def _body_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Corpo maior que {STATUS_BULK_MAX_BYTES} bytes")
+
+async def _limited_stream(request: Request) -> AsyncIterator[bytes]:
+    # Corta pelo Content-Length declarado e, sem ele (chunked), pelo que já chegou
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > STATUS_BULK_MAX_BYTES:
+        raise _body_too_large()
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > STATUS_BULK_MAX_BYTES:
+            raise _body_too_large()
+        yield chunk
+
+async def _read_status_items(request: Request) -> AsyncIterator[dict]:
+    # Aceita array JSON ou NDJSON (application/x-ndjson), este lido em streaming
+    ctype = request.headers.get("content-type", "")
+    if "ndjson" in ctype or "jsonlines" in ctype:
+        buf = b""
+        async for chunk in _limited_stream(request):
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buf.strip():
+            yield json.loads(buf)
+        return
+    body = b"".join([chunk async for chunk in _limited_stream(request)])
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Esperado um array de StatusCheckCreate")
+    for item in items:
+        yield item
+
+@api.post("/status/bulk")
+async def create_status_checks_bulk(
+    request: Request,
+    supabase: "AsyncClient" = Depends(get_supabase),
+    writer: Optional[StatusWriter] = Depends(get_status_writer),
+):
+    accepted = 0
+    batch = []
+
+    async def flush():
+        nonlocal accepted
+        try:
+            await execute(supabase.table("status_checks").insert(batch))
+        except SupabaseUnavailable as e:
+            raise HTTPException(status_code=503, detail=f"{e} (aceitos: {accepted})", headers=e.headers())
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Falha ao salvar status: {e} (aceitos: {accepted})")
+        accepted += len(batch)
+        batch.clear()
+
+    index = 0
+    try:
+        async for item in _read_status_items(request):
+            if index >= STATUS_BULK_MAX:
+                raise HTTPException(status_code=413, detail=f"Máximo de {STATUS_BULK_MAX} itens por requisição")
+            try:
+                input = StatusCheckCreate(**item)
+            except (ValidationError, TypeError) as e:
+                raise HTTPException(status_code=422, detail=f"Item {index} inválido: {e} (aceitos: {accepted})")
+            index += 1
+            row = StatusCheck(client_name=input.client_name).model_dump(mode="json")
+            if writer is not None:
+                try:
+                    await writer.submit(row)
+                except asyncio.QueueFull:
+                    raise HTTPException(
+                        status_code=503,
+                        detail=f"Fila de status cheia (aceitos: {accepted})",
+                        headers={"Retry-After": "1"},
+                    )
+                accepted += 1
+            else:
+                batch.append(row)
+                if len(batch) >= STATUS_BATCH_SIZE:
+                    await flush()
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"JSON inválido no item {index}: {e} (aceitos: {accepted})")
+    if batch:
+        await flush()
+    return {"accepted": accepted}
+
+# ---------- LEITURA (keyset) ----------
+def _encode_status_cursor(row: dict) -> str:
+    raw = json.dumps([row["timestamp"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_status_cursor(cursor: str) -> tuple:
+    # ts e id vão para o filtro or_ do PostgREST: só passam depois de reparseados
+    # (timestamp ISO e UUID), nunca como texto vindo do cliente
+    try:
+        ts, id_ = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(ts).isoformat(), str(uuid.UUID(id_))
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _status_query(supabase, select: str, order: str, client_name, since, until, after, limit: int):
+    desc = order == "desc"
+    query = supabase.table("status_checks").select(select)
+    if client_name is not None:
+        query = query.eq("client_name", client_name)
+    if since is not None:
+        query = query.gte("timestamp", since.isoformat())
+    if until is not None:
+        query = query.lt("timestamp", until.isoformat())
+    if after is not None:
+        # Próxima página depois de (ts, id), na direção da ordenação
+        ts, id_ = after
+        op = "lt" if desc else "gt"
+        query = query.or_(f'timestamp.{op}."{ts}",and(timestamp.eq."{ts}",id.{op}."{id_}")')
+    return query.order("timestamp", desc=desc).order("id", desc=desc).limit(limit)
+
+@api.get("/status")
+async def list_status_checks(
+    request: Request,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Colunas separadas por vírgula (id, client_name, timestamp)"),
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    supabase: "AsyncClient" = Depends(get_supabase),
+):
+    # JSON: uma página (lista), com o cursor da próxima em X-Next-Cursor/Link.
+    # NDJSON: todas as linhas a partir do cursor, página a página, memória constante.
+    columns = list(STATUS_COLUMNS)
+    if fields:
+        columns = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [c for c in columns if c not in STATUS_COLUMNS]
+        if unknown or not columns:
+            raise HTTPException(status_code=422, detail=f"fields deve conter só {list(STATUS_COLUMNS)}")
+    # timestamp e id sempre vêm do banco: são a chave do cursor
+    select = ",".join(dict.fromkeys(columns + ["timestamp", "id"]))
+    extra = [c for c in ("timestamp", "id") if c not in columns]
+    after = _decode_status_cursor(cursor) if cursor else None
+
+    def project(row: dict) -> dict:
+        for c in extra:
+            row.pop(c, None)
+        return row
+
+    ndjson = format == "ndjson" or (format is None and "application/x-ndjson" in request.headers.get("accept", ""))
+    if not ndjson:
+        limit = min(limit, STATUS_PAGE_MAX)
+        query = _status_query(supabase, select, order, client_name, since, until, after, limit + 1)
+        try:
+            res = await execute(query)
+        except SupabaseUnavailable:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Falha ao ler status: {e}")
+        rows = res.data or []
+        headers = {}
+        if len(rows) > limit:
+            next_cursor = _encode_status_cursor(rows[limit - 1])
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+        return FastJSONResponse([project(r) for r in rows[:limit]], headers=headers)
+
+    async def fetch(position):
+        res = await execute(_status_query(supabase, select, order, client_name, since, until, position, STATUS_STREAM_PAGE))
+        return res.data or []
+
+    # Primeira página antes do 200: erro do banco ainda vira 500
+    try:
+        first = await fetch(after)
+    except SupabaseUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao ler status: {e}")
+
+    async def stream(rows: List[dict]) -> AsyncIterator[bytes]:
+        # A próxima página é pedida antes de escrever a atual: rede e envio se sobrepõem
+        pending = None
+        try:
+            while True:
+                if len(rows) == STATUS_STREAM_PAGE:
+                    pending = asyncio.ensure_future(fetch((rows[-1]["timestamp"], rows[-1]["id"])))
+                if rows:
+                    yield b"".join(dumps(project(r)) + b"\n" for r in rows)
+                if pending is None:
+                    return
+                rows, pending = await pending, None
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    return StreamingResponse(stream(first), media_type="application/x-ndjson")
+
+@api.get("/status/writer")
+async def status_writer_stats(writer: Optional[StatusWriter] = Depends(get_status_writer)):
+    if writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **writer.stats()}
 
 @api.get("/user-status/{email}")
-def user_status(email: str, supabase: Client = Depends(get_supabase)):
+async def user_status(email: str, supabase: "AsyncClient" = Depends(get_supabase)):
     # Chame do front com encodeURIComponent(email)
+    # Mesmo caminho do auth (índice, cache SWR, single-flight). Email sem linha é
+    # "none"; Supabase fora sem cópia stale é 503, não um "none" falso.
     try:
-        res = supabase.table("user_access").select("status").eq("email", email).single().execute()
-        data = res.data or {}
-        return {"status": data.get("status", "none")}
+        row = await get_user_access(email)
+    except SupabaseUnavailable:
+        raise
     except Exception:
-        # Quando não encontra/erro, devolve "none" (evita 500)
         return {"status": "none"}
+    return {"status": (row or {}).get("status") or "none"}
+
+@api.post("/user-status/batch")
+async def user_status_batch(input: UserStatusBatch, supabase: "AsyncClient" = Depends(get_supabase)):
+    emails = list(dict.fromkeys(input.emails))
+    if len(emails) > USER_STATUS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Máximo de {USER_STATUS_BATCH_MAX} emails por requisição")
+
+    # Com o índice fresco, só os emails que ele não responde vão ao banco
+    statuses = {}
+    index = get_access_index()
+    if index is not None:
+        for email in emails:
+            hit, row = index.lookup(email)
+            if hit:
+                statuses[email] = (row or {}).get("status") or "none"
+        emails = [e for e in emails if e not in statuses]
+    # Depois, o cache SWR do auth dentro do TTL
+    for email in emails:
+        hit, row = user_access_cache.peek(email, user_access_cache.ttl)
+        if hit:
+            statuses[email] = (row or {}).get("status") or "none"
+    emails = [e for e in emails if e not in statuses]
+
+    async def lookup(chunk: List[str]) -> dict:
+        try:
+            res = await execute(supabase.table("user_access").select("email,status").in_("email", chunk))
+        except SupabaseUnavailable:
+            # Queda curta: vale a última resposta boa do cache; sem ela, 503
+            stale = {}
+            for email in chunk:
+                hit, row = user_access_cache.peek(email, user_access_cache.stale_if_error)
+                if not hit:
+                    raise
+                stale[email] = (row or {}).get("status") or "none"
+            return stale
+        except Exception:
+            # Mesmo contrato da rota individual: erro vira "none"
+            return {}
+        return {row["email"]: row.get("status") or "none" for row in res.data or []}
+
+    chunks = [emails[i:i + USER_STATUS_IN_CHUNK] for i in range(0, len(emails), USER_STATUS_IN_CHUNK)]
+    found = {}
+    for part in await asyncio.gather(*(lookup(c) for c in chunks)):
+        found.update(part)
+    statuses.update((email, found.get(email, "none")) for email in emails)
+    return {"statuses": {email: statuses[email] for email in dict.fromkeys(input.emails)}}
 
 @api.get("/protected")
-def protected_route(user=Depends(get_current_user)):
+async def protected_route(user=Depends(get_current_user)):
     return {"message": f"Olá, {user['email']}", "plan": user["subscription_plan"]}
 
+api.include_router(render_router)
+api.include_router(export_router)
+api.include_router(animation_router)
+api.include_router(presets_router)
+api.include_router(textures_router)
+api.include_router(palette_router)
+api.include_router(jobs_router)
+api.include_router(metrics_router)
+api.include_router(access_router)
+api.include_router(access_events_router)
+api.include_router(admin_router)
+api.include_router(health_router)
 app.include_router(api)
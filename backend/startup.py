@@ -0,0 +1,46 @@
+# backend/startup.py
+# Cronômetro do cold start: cada fase (imports do server.py, lifespan, aquecimento
+# em background) é medida, logada numa linha só e exposta no /api/metrics.
+# COLD_START_BUDGET_MS define o orçamento; estourar gera um warning no log.
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+log = logging.getLogger("mandala5")
+
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "1500"))
+
+# Referência: primeiro import deste módulo (topo do server.py)
+STARTED = time.perf_counter()
+_phases: Dict[str, float] = {}
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = (time.perf_counter() - started) * 1000
+
+def phases() -> Dict[str, float]:
+    return dict(_phases)
+
+def _breakdown(names: List[str]) -> str:
+    return ", ".join(f"{n}={_phases[n]:.0f}ms" for n in names)
+
+def report_ready() -> float:
+    # Chamado no fim do lifespan: tudo que veio antes do app aceitar conexões
+    total = (time.perf_counter() - STARTED) * 1000
+    _phases["ready"] = total
+    names = [n for n in _phases if n != "ready" and not n.startswith("warmup")]
+    log.info(f"Cold start: pronto em {total:.0f}ms ({_breakdown(names)}).")
+    if total > COLD_START_BUDGET_MS:
+        log.warning(f"Cold start de {total:.0f}ms acima do orçamento de {COLD_START_BUDGET_MS:.0f}ms.")
+    return total
+
+def report_warmup() -> None:
+    names = [n for n in _phases if n.startswith("warmup")]
+    if names:
+        log.info(f"Aquecimento em background concluído ({_breakdown(names)}).")
@@ -0,0 +1,160 @@
+# backend/status_writer.py
+# Write-behind para status_checks: os checks entram numa fila em memória e são
+# gravados em inserts multi-linha, por tamanho de lote ou por tempo.
+# O endpoint já respondeu quando o lote é gravado: falha de infraestrutura
+# (timeout, breaker aberto, 5xx) tenta de novo com backoff, até max_retries;
+# só erro da requisição (APIError 4xx) descarta o lote na hora. Enquanto o
+# writer espera, a fila enche e submit passa a recusar (503 no endpoint).
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from db import execute, get_client
+from resilience import SupabaseUnavailable, is_infra_failure
+
+log = logging.getLogger("mandala5")
+
+_STOP = object()
+
+class StatusWriter:
+    def __init__(
+        self,
+        table: str = "status_checks",
+        max_batch: int = 500,
+        flush_interval: float = 0.25,
+        max_queue: int = 10000,
+        put_timeout: float = 0.5,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        retry_backoff_max: float = 10.0,
+    ):
+        self.table = table
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        # contadores
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.flushes = 0
+        self.flush_ms_total = 0.0
+        self.flush_ms_max = 0.0
+        self.flush_ms_last = 0.0
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        log.info(
+            f"StatusWriter ativo (batch={self.max_batch}, interval={self.flush_interval}s, "
+            f"queue={self._queue.maxsize})."
+        )
+
+    async def stop(self) -> None:
+        # Tudo o que entrou antes do sentinela é gravado antes de sair
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        log.info(f"StatusWriter parado; {self.flushed} gravados, {self.failed} com falha.")
+
+    async def submit(self, row: dict) -> None:
+        # Backpressure: espera até put_timeout por espaço na fila, depois recusa
+        if self._closing:
+            raise asyncio.QueueFull()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(row), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise asyncio.QueueFull()
+        self.enqueued += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "flushes": self.flushes,
+            "flush_ms_last": round(self.flush_ms_last, 2),
+            "flush_ms_max": round(self.flush_ms_max, 2),
+            "flush_ms_avg": round(self.flush_ms_total / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        delay = min(self.retry_backoff_max, self.retry_backoff * 2 ** attempt)
+        if isinstance(error, SupabaseUnavailable):
+            # Breaker aberto: não adianta tentar antes de ele liberar o teste
+            delay = max(delay, min(self.retry_backoff_max, error.retry_after))
+        return delay
+
+    async def _flush(self, rows: List[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    client = await get_client()
+                    await execute(client.table(self.table).insert(rows))
+                    self.flushed += len(rows)
+                    return
+                except Exception as e:
+                    if attempt < self.max_retries and is_infra_failure(e):
+                        self.retries += 1
+                        delay = self._retry_delay(attempt, e)
+                        log.warning(
+                            f"StatusWriter: lote de {len(rows)} falhou ({e}); "
+                            f"tentativa {attempt + 2}/{self.max_retries + 1} em {delay:.1f}s"
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    # Write-behind: o cliente já recebeu resposta; registramos a perda
+                    self.failed += len(rows)
+                    log.error(f"StatusWriter: falha ao gravar lote de {len(rows)}: {e}")
+                    return
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flush_ms_last = ms
+            self.flush_ms_total += ms
+            self.flush_ms_max = max(self.flush_ms_max, ms)
@@ -0,0 +1,281 @@
+# backend/textures.py
+# /api/textures: ingestão das imagens do caleidoscópio (useTex / u_tex).
+# A imagem é decodificada, reduzida para potência de 2 (o three usa RepeatWrapping
+# + mipmaps), ganha uma pirâmide de mips pré-calculada e fica guardada por hash
+# do conteúdo enviado: o mesmo arquivo enviado duas vezes é processado uma vez.
+# O upload é público: no máximo TEXTURE_MAX_CONCURRENT decodificações/LANCZOS ao
+# mesmo tempo (fila curta, depois 503) e o diretório é LRU limitado a
+# TEXTURE_STORE_MB, como o cache em disco do render (servir renova o mtime).
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from png import encode_png
+
+if TYPE_CHECKING:
+    import numpy as np
+
+log = logging.getLogger("mandala5")
+
+TEXTURE_DIR = Path(os.getenv("TEXTURE_DIR", str(Path(tempfile.gettempdir()) / "mandala5-textures")))
+TEXTURE_MAX_SIZE = int(os.getenv("TEXTURE_MAX_SIZE", "2048"))
+TEXTURE_MAX_UPLOAD = int(os.getenv("TEXTURE_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+TEXTURE_MAX_PIXELS = int(os.getenv("TEXTURE_MAX_PIXELS", str(64 * 1024 * 1024)))
+TEXTURE_MMAP_CACHE = int(os.getenv("TEXTURE_MMAP_CACHE", "256"))
+TEXTURE_STORE_MB = int(os.getenv("TEXTURE_STORE_MB", "2048"))
+TEXTURE_MAX_CONCURRENT = int(os.getenv("TEXTURE_MAX_CONCURRENT", "2"))
+TEXTURE_MAX_QUEUED = int(os.getenv("TEXTURE_MAX_QUEUED", "8"))
+CHUNK = 256 * 1024
+
+router = APIRouter(prefix="/textures")
+
+def _texture_dir(digest: str) -> Path:
+    return TEXTURE_DIR / digest[:2] / digest
+
+def _valid_digest(digest: str) -> bool:
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+# ---------- PROCESSAMENTO ----------
+def pow2_floor(n: int) -> int:
+    return 1 << (max(1, n).bit_length() - 1)
+
+def downsample2(img: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    # Box filter 2x2 vetorizado; eixo de tamanho 1 não é reduzido
+    h, w, c = img.shape
+    fh, fw = (2 if h > 1 else 1), (2 if w > 1 else 1)
+    blocks = img.reshape(h // fh, fh, w // fw, fw, c).astype(np.float32)
+    return (blocks.mean(axis=(1, 3)) + 0.5).astype(np.uint8)
+
+def build_levels(data: bytes) -> List["np.ndarray"]:
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as im:
+        if im.width * im.height > TEXTURE_MAX_PIXELS:
+            raise HTTPException(status_code=413, detail="Imagem grande demais")
+        # JPEG: decodifica já reduzido (DCT scaling), nunca abaixo do alvo
+        im.draft("RGB", (min(pow2_floor(im.width), TEXTURE_MAX_SIZE), min(pow2_floor(im.height), TEXTURE_MAX_SIZE)))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        # Potência de 2 em cada eixo, sem ampliar, limitada a TEXTURE_MAX_SIZE
+        w = min(pow2_floor(im.width), TEXTURE_MAX_SIZE)
+        h = min(pow2_floor(im.height), TEXTURE_MAX_SIZE)
+        base = np.asarray(im.resize((w, h), Image.LANCZOS, reducing_gap=3.0))
+    levels = [base]
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        levels.append(downsample2(levels[-1]))
+    return levels
+
+def ingest(data: bytes) -> dict:
+    digest = hashlib.sha256(data).hexdigest()
+    folder = _texture_dir(digest)
+    manifest_path = folder / "manifest.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        return {**manifest, "deduplicated": True}
+
+    try:
+        levels = build_levels(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Imagem inválida: {e}")
+
+    # Grava numa pasta temporária e troca de nome no fim: uploads simultâneos
+    # do mesmo arquivo nunca deixam uma pirâmide pela metade
+    folder.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=folder.parent, prefix=f".{digest[:8]}-"))
+    manifest = {
+        "id": digest,
+        "levels": [{"level": i, "width": int(lv.shape[1]), "height": int(lv.shape[0])} for i, lv in enumerate(levels)],
+    }
+    for i, lv in enumerate(levels):
+        (tmp / f"L{i}.png").write_bytes(encode_png(lv))
+    (tmp / "manifest.json").write_text(json.dumps(manifest))
+    try:
+        os.rename(tmp, folder)
+    except OSError:
+        # Outro upload igual terminou antes
+        for f in tmp.iterdir():
+            f.unlink()
+        tmp.rmdir()
+        return {**json.loads(manifest_path.read_text()), "deduplicated": True}
+    log.info(f"Textura {digest[:12]} ingerida: {levels[0].shape[1]}x{levels[0].shape[0]}, {len(levels)} níveis.")
+    _account(_folder_size(folder))
+    return {**manifest, "deduplicated": False}
+
+# ---------- LIMITE DO DIRETÓRIO ----------
+# Bytes no diretório; None até a primeira varredura (no primeiro upload)
+_store_bytes: Optional[int] = None
+_store_lock = threading.Lock()
+_sweep_lock = threading.Lock()
+
+def _folder_size(folder: Path) -> int:
+    return sum(f.stat().st_size for f in folder.iterdir())
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def sweep() -> None:
+    # Apaga as texturas servidas há mais tempo até 90% do limite; uma varredura por vez
+    global _store_bytes
+    if not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        max_bytes = TEXTURE_STORE_MB * 1024 * 1024
+        folders = []
+        # [0-9a-f]*: pula as pastas temporárias (".xxxxxxxx-") de ingest em andamento
+        for manifest in TEXTURE_DIR.glob("*/[0-9a-f]*/manifest.json"):
+            try:
+                folders.append((manifest.stat().st_mtime, _folder_size(manifest.parent), manifest.parent))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in folders)
+        if total > max_bytes:
+            target = max_bytes * 0.9
+            for _, size, folder in sorted(folders, key=lambda f: f[0]):
+                if total <= target:
+                    break
+                # Stream já mapeado continua legível depois do unlink
+                shutil.rmtree(folder, ignore_errors=True)
+                total -= size
+                log.info(f"Textura {folder.name[:12]} removida (TEXTURE_STORE_MB).")
+        with _store_lock:
+            _store_bytes = total
+    finally:
+        _sweep_lock.release()
+
+def _account(added: int) -> None:
+    global _store_bytes
+    with _store_lock:
+        if _store_bytes is not None:
+            _store_bytes += added
+        over = _store_bytes is None or _store_bytes > TEXTURE_STORE_MB * 1024 * 1024
+    if over:
+        sweep()
+
+# ---------- LEITURA (mmap) ----------
+class MappedFiles:
+    # Mantém os níveis mais servidos mapeados: sem open/read/close por requisição
+    def __init__(self, max_open: int):
+        self.max_open = max_open
+        self._maps: "OrderedDict[Path, mmap.mmap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> mmap.mmap:
+        with self._lock:
+            mm = self._maps.get(path)
+            if mm is not None:
+                self._maps.move_to_end(path)
+                return mm
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            self._maps[path] = mm
+            while len(self._maps) > self.max_open:
+                # Não fecha explicitamente: pode haver stream lendo; o GC desmapeia
+                self._maps.popitem(last=False)
+        return mm
+
+_mapped = MappedFiles(TEXTURE_MMAP_CACHE)
+
+def _iter_mapped(mm: mmap.mmap) -> Iterator[memoryview]:
+    # Fatias de memoryview: apontam para as páginas do mmap, sem cópia para bytes
+    view = memoryview(mm)
+    for i in range(0, len(view), CHUNK):
+        yield view[i:i + CHUNK]
+
+class MappedResponse(StreamingResponse):
+    # O StreamingResponse converte todo chunk que não é bytes (copiaria a
+    # memoryview); aqui os chunks vão como estão ao servidor (transport.write
+    # aceita qualquer buffer)
+    async def stream_response(self, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def _manifest(digest: str) -> dict:
+    if not _valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Textura não encontrada")
+    path = _texture_dir(digest) / "manifest.json"
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Textura não encontrada")
+    # Uso recente para o LRU do diretório
+    _touch(path)
+    return manifest
+
+_ingest_slots = asyncio.Semaphore(TEXTURE_MAX_CONCURRENT)
+_ingest_waiting = 0
+
+async def _ingest_limited(data: bytes) -> dict:
+    # Mesmo esquema do render: poucas decodificações ao mesmo tempo, fila curta
+    global _ingest_waiting
+    if _ingest_slots.locked() and _ingest_waiting >= TEXTURE_MAX_QUEUED:
+        raise HTTPException(status_code=503, detail="Uploads de textura em andamento demais", headers={"Retry-After": "5"})
+    _ingest_waiting += 1
+    try:
+        await _ingest_slots.acquire()
+    finally:
+        _ingest_waiting -= 1
+    try:
+        return await run_in_threadpool(ingest, data)
+    finally:
+        _ingest_slots.release()
+
+# ---------- ROTAS ----------
+@router.post("")
+async def upload_texture(file: UploadFile = File(...)):
+    data = await file.read(TEXTURE_MAX_UPLOAD + 1)
+    if len(data) > TEXTURE_MAX_UPLOAD:
+        raise HTTPException(status_code=413, detail=f"Upload maior que {TEXTURE_MAX_UPLOAD // (1024 * 1024)}MB")
+    return await _ingest_limited(data)
+
+@router.get("/{digest}")
+async def texture_manifest(digest: str):
+    return await run_in_threadpool(_manifest, digest)
+
+@router.get("/{digest}/image")
+async def texture_image(
+    digest: str,
+    request: Request,
+    level: Optional[int] = Query(None, ge=0),
+    max_size: Optional[int] = Query(None, ge=1),
+):
+    # Nível explícito, ou o maior nível cujo lado maior cabe em max_size
+    manifest = await run_in_threadpool(_manifest, digest)
+    levels = manifest["levels"]
+    if level is None:
+        level = 0
+        if max_size is not None:
+            level = next((lv["level"] for lv in levels if max(lv["width"], lv["height"]) <= max_size), len(levels) - 1)
+    if level >= len(levels):
+        raise HTTPException(status_code=404, detail="Nível inexistente")
+
+    etag = f'"{digest}-{level}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    mm = await run_in_threadpool(_mapped.get, _texture_dir(digest) / f"L{level}.png")
+    headers["Content-Length"] = str(len(mm))
+    return MappedResponse(_iter_mapped(mm), media_type="image/png", headers=headers)
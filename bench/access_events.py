@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Fan-out harness for GET /api/access-events (SSE).
+Spawns `uvicorn server:app` against the fake Supabase, opens thousands of
+idle subscriber connections spread over --users emails, then flips the
+status of --changes users through the invalidation webhook and measures
+how long each change takes to reach every subscriber of that email.
+Reports server RSS per connection and delivery latency p50/p95/p99.
+
+    python bench/access_events.py --subscribers 5000 --users 1000 --changes 200
+    python bench/access_events.py --env ACCESS_INDEX=1 --out bench/access_events.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_supabase import FakeSupabase, free_port  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+JWT_SECRET = "bench-jwt-secret-0123456789abcdef0123"
+WEBHOOK_SECRET = "bench-webhook-secret"
+
+
+def rss_kb(pid: int) -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    return 0
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Subscriber:
+    def __init__(self, email: str, port: int):
+        self.email = email
+        self.port = port
+        self.status = None
+        self.error = None
+        self.changed = asyncio.Event()
+        self.received_at = 0.0
+
+    async def connect(self, ready: asyncio.Event) -> None:
+        token = jwt.encode({"email": self.email}, JWT_SECRET, algorithm="HS256")
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(
+            f"GET /api/access-events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n"
+            f"Authorization: Bearer {token}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        self.writer = writer
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            # 429/503 (limites, Supabase lento): conta como falha e fecha
+            self.error = status_line.decode(errors="replace").strip() or "connection closed"
+            ready.set()
+            writer.close()
+            return
+        # Lê linha a linha; tamanhos de chunk (transfer-encoding) são ignorados
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: "):
+                self.status = json.loads(line[6:])["status"]
+                self.received_at = time.perf_counter()
+                self.changed.set()
+                ready.set()
+
+    def close(self) -> None:
+        writer = getattr(self, "writer", None)
+        if writer is not None:
+            writer.close()
+
+
+async def run(args, port: int, pid: int, fake: FakeSupabase) -> dict:
+    emails = [f"user{i}@bench.local" for i in range(args.users)]
+    subs: Dict[str, List[Subscriber]] = defaultdict(list)
+    tasks = []
+    rss_before = rss_kb(pid)
+
+    gate = asyncio.Semaphore(args.connect_concurrency)
+    started = time.perf_counter()
+
+    async def open_one(i: int) -> None:
+        sub = Subscriber(emails[i % len(emails)], port)
+        subs[sub.email].append(sub)
+        ready = asyncio.Event()
+        async with gate:
+            tasks.append(asyncio.create_task(sub.connect(ready)))
+            await asyncio.wait_for(ready.wait(), 60)
+
+    await asyncio.gather(*(open_one(i) for i in range(args.subscribers)))
+    connect_s = time.perf_counter() - started
+    failed = [s for group in subs.values() for s in group if s.error]
+    if failed:
+        print(f"{len(failed)} subscribers failed to connect, e.g. {failed[0].error!r}")
+        for email in list(subs):
+            subs[email] = [s for s in subs[email] if not s.error]
+    await asyncio.sleep(1.0)
+    rss_after = rss_kb(pid)
+    per_conn_kb = (rss_after - rss_before) / max(1, args.subscribers - len(failed))
+    print(f"{args.subscribers} subscribers connected in {connect_s:.1f}s; "
+          f"server RSS {rss_before / 1024:.0f}MB -> {rss_after / 1024:.0f}MB ({per_conn_kb:.1f}KB/connection)")
+
+    # Cada mudança: status no "banco" + webhook; mede até o último assinante daquele email
+    latencies: List[float] = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+        rows = {r["email"]: r for r in fake.tables["user_access"]}
+        for email in emails[: args.changes]:
+            for sub in subs[email]:
+                sub.changed.clear()
+            rows[email]["status"] = "active"
+            sent = time.perf_counter()
+            r = await client.post(
+                "/api/user-access/invalidate", json={"email": email}, headers={"X-Webhook-Secret": WEBHOOK_SECRET}
+            )
+            r.raise_for_status()
+            await asyncio.wait_for(asyncio.gather(*(s.changed.wait() for s in subs[email])), 30)
+            assert all(s.status == "active" for s in subs[email])
+            latencies.append((max(s.received_at for s in subs[email]) - sent) * 1000)
+        metrics = (await client.get("/api/metrics")).text
+
+    for sub in (s for group in subs.values() for s in group):
+        sub.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    connections = next(
+        (float(line.split()[-1]) for line in metrics.splitlines() if line.startswith("access_events_connections ")), -1
+    )
+    result = {
+        "subscribers": args.subscribers,
+        "users": args.users,
+        "connect_seconds": round(connect_s, 2),
+        "rss_before_kb": rss_before,
+        "rss_after_kb": rss_after,
+        "kb_per_connection": round(per_conn_kb, 2),
+        "failed_connections": len(failed),
+        "hub_connections": connections,
+        "changes": len(latencies),
+        "delivery_ms": {
+            "p50": round(statistics.median(latencies), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+    }
+    print(f"{len(latencies)} changes delivered to {args.subscribers // args.users} subscribers each: "
+          f"p50 {result['delivery_ms']['p50']:.1f}ms  p95 {result['delivery_ms']['p95']:.1f}ms  "
+          f"p99 {result['delivery_ms']['p99']:.1f}ms (webhook round trip included)")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="fake Supabase latency")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app environment")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+    args.changes = min(args.changes, args.users)
+
+    # Um socket por assinante, dos dois lados (o servidor herda o limite)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    need = args.subscribers * 2 + 256
+    if soft < need:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(need, hard), hard))
+
+    fake = FakeSupabase(latency_ms=args.latency_ms)
+    fake.tables["user_access"] = [
+        {"email": f"user{i}@bench.local", "status": "pending", "subscription_plan": "pro"} for i in range(args.users)
+    ]
+    url = fake.start()
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": url,
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role-key",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "ACCESS_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "ACCESS_EVENTS_MAX_PER_USER": str(max(10, -(-args.subscribers // args.users))),
+        "ACCESS_EVENTS_MAX": str(args.subscribers * 2),
+        "STARTUP_WARMUP": "0",
+        "ADMISSION": "0",
+    }
+    env.update(kv.split("=", 1) for kv in args.env)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--timeout-graceful-shutdown", "1", "--backlog", str(args.subscribers)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.perf_counter() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/", timeout=0.5).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline or proc.poll() is not None:
+                raise RuntimeError("server did not start")
+            time.sleep(0.05)
+        result = asyncio.run(run(args, port, proc.pid, fake))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+        fake.stop()
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **result}, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: spawns `uvicorn server:app` as a fresh process and
+measures the time until GET /api/ answers 200, over several runs. Fails
+when the median exceeds --budget-ms, so it can gate CI.
+
+    python bench/coldstart.py --runs 5 --budget-ms 3000 --out bench/coldstart.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_supabase import free_port  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def cold_start(env: dict, timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/", timeout=0.5).status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"/api/ did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=3000.0, help="process spawn to first 200, interpreter included")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app environment")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    # Só o health é medido: o Supabase não precisa existir, o cliente é criado sob demanda
+    env = {
+        **os.environ,
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role-key",
+        "SUPABASE_JWT_SECRET": "bench-jwt-secret-0123456789abcdef0123",
+    }
+    env.update(kv.split("=", 1) for kv in args.env)
+
+    samples = []
+    for i in range(args.runs):
+        ms = cold_start(env, args.timeout)
+        samples.append(round(ms, 1))
+        print(f"run {i + 1}: {ms:.0f}ms")
+    median = statistics.median(samples)
+    print(f"median {median:.0f}ms, min {min(samples):.0f}ms, max {max(samples):.0f}ms (budget {args.budget_ms:.0f}ms)")
+
+    if args.out:
+        result = {"samples_ms": samples, "median_ms": median, "budget_ms": args.budget_ms}
+        Path(args.out).write_text(json.dumps(result, indent=2) + "\n")
+    if median > args.budget_ms:
+        print("cold start over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Fake PostgREST/Supabase server for local benchmarks.
+Implements the subset of the PostgREST REST API the backend uses
+(select/insert/upsert/update/delete, eq/neq/gt/gte/lt/lte/in/is/or filters,
+order, limit, offset, single object responses) over in-memory tables,
+with configurable injected latency and error rate.
+"""
+
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.tables: Dict[str, List[dict]] = {}
+        # table -> column filled from a global counter on every insert/update,
+        # like a `before insert or update` trigger doing nextval()
+        self.sequences: Dict[str, str] = {}
+        self._sequence_value = 0
+        self.requests = 0
+        self.errors_injected = 0
+        self._rng = random.Random(seed)
+        self._server: Optional[uvicorn.Server] = None
+        self.url = ""
+        self.app = Starlette(routes=[
+            Route("/rest/v1/{table}", self.handle, methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]),
+        ])
+
+    # ---------- filters ----------
+    @staticmethod
+    def _as_text(value) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return str(value)
+
+    def _match(self, row: dict, column: str, expr: str) -> bool:
+        op, _, value = expr.partition(".")
+        negate = op == "not"
+        if negate:
+            op, _, value = value.partition(".")
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        current = row.get(column)
+        text = self._as_text(current)
+        if op == "eq":
+            result = text == value
+        elif op == "neq":
+            result = text != value
+        elif op == "in":
+            inner = value.strip("()")
+            options = [v.strip().strip('"') for v in inner.split(",")] if inner else []
+            result = text in options
+        elif op in ("gt", "gte", "lt", "lte"):
+            if current is None:
+                return False
+            if isinstance(current, (int, float)) and not isinstance(current, bool):
+                left, right = current, type(current)(value)
+            else:
+                left, right = text, value
+            result = {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+        elif op == "is":
+            result = current is None if value == "null" else text == value
+        else:
+            raise ValueError(f"unsupported operator {op}")
+        return not result if negate else result
+
+    @staticmethod
+    def _split_top_level(expr: str) -> List[str]:
+        parts, depth, current = [], 0, ""
+        for ch in expr:
+            if ch == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+            depth += ch == "("
+            depth -= ch == ")"
+            current += ch
+        parts.append(current)
+        return parts
+
+    def _match_logical(self, row: dict, expr: str, mode: str = "or") -> bool:
+        results = []
+        for part in self._split_top_level(expr.strip()[1:-1]):
+            if part.startswith("and("):
+                results.append(self._match_logical(row, part[3:], "and"))
+            elif part.startswith("or("):
+                results.append(self._match_logical(row, part[2:], "or"))
+            else:
+                column, rest = part.split(".", 1)
+                results.append(self._match(row, column, rest))
+        return any(results) if mode == "or" else all(results)
+
+    def _filter(self, rows: List[dict], params) -> List[dict]:
+        out = rows
+        for key, value in params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                out = [r for r in out if self._match_logical(r, value, key)]
+            else:
+                out = [r for r in out if self._match(r, key, value)]
+        return out
+
+    @staticmethod
+    def _sort_key(column: str):
+        def key(row):
+            value = row.get(column)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return (value is None, value, "")
+            return (value is None, 0, "" if value is None else str(value))
+        return key
+
+    def _stamp(self, table: str, row: dict) -> dict:
+        column = self.sequences.get(table)
+        if column is not None:
+            self._sequence_value += 1
+            row[column] = self._sequence_value
+        return row
+
+    # ---------- handler ----------
+    async def handle(self, request: Request):
+        self.requests += 1
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000.0)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors_injected += 1
+            return JSONResponse({"code": "57014", "message": "injected error", "details": None, "hint": None}, status_code=500)
+
+        table = request.path_params["table"]
+        rows = self.tables.setdefault(table, [])
+        params = request.query_params
+        single = "vnd.pgrst.object" in request.headers.get("accept", "")
+
+        if request.method in ("GET", "HEAD"):
+            out = self._filter(rows, params)
+            if "order" in params:
+                for spec in reversed(params["order"].split(",")):
+                    column, *mods = spec.split(".")
+                    out = sorted(out, key=self._sort_key(column), reverse="desc" in mods)
+            out = out[int(params.get("offset", 0)):]
+            if "limit" in params:
+                out = out[: int(params["limit"])]
+            select = params.get("select", "*")
+            if select != "*":
+                columns = select.split(",")
+                out = [{c: r.get(c) for c in columns} for r in out]
+            if single:
+                if len(out) != 1:
+                    return JSONResponse(
+                        {"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned",
+                         "details": f"The result contains {len(out)} rows", "hint": None},
+                        status_code=406,
+                    )
+                return JSONResponse(out[0])
+            return JSONResponse(out)
+
+        body = json.loads(await request.body() or b"null")
+        if request.method == "POST":
+            items = body if isinstance(body, list) else [body]
+            stored = []
+            if "merge-duplicates" in request.headers.get("prefer", ""):
+                keys = params.get("on_conflict", "id").split(",")
+                for item in items:
+                    existing = next((r for r in rows if all(r.get(k) == item.get(k) for k in keys)), None)
+                    if existing is not None:
+                        existing.update(item)
+                    else:
+                        existing = dict(item)
+                        rows.append(existing)
+                    stored.append(self._stamp(table, existing))
+            else:
+                for item in items:
+                    stored.append(self._stamp(table, dict(item)))
+                    rows.append(stored[-1])
+            return JSONResponse(stored, status_code=201)
+        if request.method == "PATCH":
+            out = self._filter(rows, params)
+            for row in out:
+                row.update(body)
+                self._stamp(table, row)
+            return JSONResponse(out)
+        if request.method == "DELETE":
+            out = self._filter(rows, params)
+            for row in out:
+                rows.remove(row)
+            return JSONResponse(out)
+        return Response(status_code=405)
+
+    # ---------- lifecycle ----------
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        port = port or free_port(host)
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, daemon=True).start()
+        wait_started(self._server)
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def wait_started(server: uvicorn.Server, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not start")
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake Supabase server standalone")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeSupabase(args.latency_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port, log_level="info")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline load benchmark for the backend.
+Starts the FastAPI app in-process (uvicorn in a thread) against the fake
+Supabase server, drives concurrent load at the Supabase-backed routes and
+reports throughput and p50/p95/p99 per scenario. Results can be written to
+a JSON baseline and compared against a previous run.
+
+    python bench/run.py --duration 10 --concurrency 64 --latency-ms 20 --out bench/baseline.json
+    python bench/run.py --compare bench/baseline.json --max-regression 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+import jwt
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_supabase import FakeSupabase, free_port, wait_started  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+JWT_SECRET = "bench-jwt-secret-0123456789abcdef0123"
+SERVICE_KEY = "bench-service-role-key"
+SCENARIOS = ("status", "user_status", "protected")
+
+
+def seed(fake: FakeSupabase, users: int) -> List[str]:
+    emails = [f"user{i}@bench.local" for i in range(users)]
+    fake.tables["user_access"] = [
+        {"email": e, "status": "active" if i % 10 else "inactive", "subscription_plan": "pro", "updated_at": "2024-01-01T00:00:00+00:00"}
+        for i, e in enumerate(emails)
+    ]
+    fake.tables["status_checks"] = []
+    return emails
+
+
+def start_app(env: Dict[str, str]) -> uvicorn.Server:
+    # O app lê o ambiente no import: configura antes de importar o server
+    os.environ.update(env)
+    sys.path.insert(0, str(BACKEND_DIR))
+    from server import app
+
+    # Log por requisição (Server-Timing, httpx) distorce a medição
+    logging.getLogger().setLevel(os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+    port = free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_started(server, timeout=30.0)
+    server.url = f"http://127.0.0.1:{port}"
+    return server
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+    latencies.sort()
+    total = len(latencies)
+    ok = sum(n for code, n in statuses.items() if code.startswith("2"))
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "error_rate": round((total - ok) / total, 4) if total else 0.0,
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def make_request(name: str, emails: List[str], rng: random.Random) -> Callable[[httpx.AsyncClient], "asyncio.Future"]:
+    tokens = {e: jwt.encode({"email": e, "exp": int(time.time()) + 3600}, JWT_SECRET, algorithm="HS256") for e in emails}
+    active = [e for e in emails if int(e[4:].split("@")[0]) % 10]
+    counter = iter(range(10**12))
+
+    if name == "status":
+        return lambda c: c.post("/api/status", json={"client_name": f"bench-{next(counter)}"})
+    if name == "user_status":
+        return lambda c: c.get(f"/api/user-status/{rng.choice(emails)}")
+    if name == "protected":
+        return lambda c: c.get("/api/protected", headers={"Authorization": f"Bearer {tokens[rng.choice(active)]}"})
+    raise ValueError(f"unknown scenario {name}")
+
+
+async def run_scenario(base_url: str, name: str, emails: List[str], concurrency: int, duration: float, warmup: float) -> dict:
+    rng = random.Random(name)
+    send = make_request(name, emails, rng)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        # Aquecimento: conexões abertas, caches e pools quentes antes de medir
+        warm_until = time.perf_counter() + warmup
+        while time.perf_counter() < warm_until:
+            await asyncio.gather(*(send(client) for _ in range(concurrency)), return_exceptions=True)
+
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    res = await send(client)
+                    code = str(res.status_code)
+                except httpx.HTTPError as e:
+                    code = type(e).__name__
+                latencies.append(time.perf_counter() - t0)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    # Regressão: vazão caiu ou p95/p99 subiram além da tolerância
+    failures = []
+    print(f"\n{'scenario':<12} {'metric':<7} {'baseline':>10} {'current':>10} {'delta':>8}")
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in (("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+            b, c = base[metric], cur[metric]
+            delta = (c - b) / b if b else 0.0
+            worse = -delta if higher_is_better else delta
+            flag = ""
+            if metric != "p50_ms" and worse > max_regression:
+                flag = "  REGRESSION"
+                failures.append(f"{name}.{metric}: {b} -> {c} ({delta:+.1%})")
+            print(f"{name:<12} {metric:<7} {b:>10} {c:>10} {delta:>+8.1%}{flag}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated: " + ",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="injected Supabase latency")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Supabase calls that fail")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app environment")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated relative regression")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(args.latency_ms, args.jitter_ms, args.error_rate)
+    fake_url = fake.start()
+    emails = seed(fake, args.users)
+
+    env = {
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_SERVICE_ROLE_KEY": SERVICE_KEY,
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        # Um só cliente gera toda a carga: o rate limit por IP a recusaria
+        "ADMISSION": "0",
+    }
+    env.update(kv.split("=", 1) for kv in args.env)
+    app_server = start_app(env)
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users": args.users,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "env": dict(kv.split("=", 1) for kv in args.env),
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios.split(","):
+            summary = asyncio.run(
+                run_scenario(app_server.url, name, emails, args.concurrency, args.duration, args.warmup)
+            )
+            results["scenarios"][name] = summary
+            print(
+                f"{name:<12} {summary['rps']:>9.1f} req/s  p50 {summary['p50_ms']:>7.2f}ms  "
+                f"p95 {summary['p95_ms']:>7.2f}ms  p99 {summary['p99_ms']:>7.2f}ms  errors {summary['errors']}"
+            )
+    finally:
+        app_server.should_exit = True
+        fake.stop()
+        time.sleep(0.5)
+
+    results["supabase"] = {"requests": fake.requests, "errors_injected": fake.errors_injected}
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nresults written to {args.out}")
+    if args.compare:
+        failures = compare(results, json.loads(Path(args.compare).read_text()), args.max_regression)
+        if failures:
+            print("\nregressions:\n  " + "\n  ".join(failures))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Serialization micro-benchmark for StatusCheck and list responses.
+Compares the previous path (jsonable_encoder + stdlib json JSONResponse)
+with the current one (model_dump(mode="json") + FastJSONResponse/orjson),
+and msgpack when installed.
+
+    python bench/serialization.py --rows 1000 --out bench/serialization.json
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from responses import FastJSONResponse, _msgpack, _wants_msgpack  # noqa: E402
+from server import StatusCheck  # noqa: E402
+
+
+def per_call_us(fn, number: int) -> float:
+    # Melhor de 5 repetições, em microssegundos por chamada
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows in the list response")
+    parser.add_argument("--number", type=int, default=2000, help="iterations for single-object cases")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    obj = StatusCheck(client_name="bench-agent")
+    rows = [StatusCheck(client_name=f"agent-{i}").model_dump(mode="json") for i in range(args.rows)]
+    list_number = max(5, args.number // max(1, args.rows // 10))
+
+    cases = {
+        "model_validate": lambda: StatusCheck(client_name="bench-agent"),
+        "encode_jsonable_encoder": lambda: jsonable_encoder(obj),
+        "encode_model_dump_json": lambda: obj.model_dump(mode="json"),
+        "response_object_before": lambda: JSONResponse(jsonable_encoder(obj)),
+        "response_object_after": lambda: FastJSONResponse(obj.model_dump(mode="json")),
+    }
+    list_cases = {
+        "response_list_before": lambda: JSONResponse(jsonable_encoder(rows)),
+        "response_list_after": lambda: FastJSONResponse(rows),
+    }
+    if _msgpack() is not None:
+        def msgpack_list():
+            token = _wants_msgpack.set(True)
+            try:
+                return FastJSONResponse(rows)
+            finally:
+                _wants_msgpack.reset(token)
+        list_cases["response_list_msgpack"] = msgpack_list
+
+    results = {"created_at": datetime.utcnow().isoformat(), "rows": args.rows, "us_per_call": {}}
+    for name, fn in cases.items():
+        results["us_per_call"][name] = round(per_call_us(fn, args.number), 2)
+    for name, fn in list_cases.items():
+        results["us_per_call"][name] = round(per_call_us(fn, list_number), 2)
+    results["bytes"] = {
+        "list_json": len(FastJSONResponse(rows).body),
+    }
+
+    for name, us in results["us_per_call"].items():
+        print(f"{name:<28} {us:>12.2f} us")
+    us = results["us_per_call"]
+    print(f"\nobject speedup {us['response_object_before'] / us['response_object_after']:.1f}x, "
+          f"list speedup {us['response_list_before'] / us['response_list_after']:.1f}x")
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,8 +15,20 @@ function AuthorizationGuard({ children }) {
   const [hasAccess, setHasAccess] = useState(false);
 
   useEffect(() => {
+    let source = null;
+    let retry = null;
+    let stopped = false;
+
+    const fetchStatus = async (email) => {
+      const res = await fetch(`${API}/user-status/${encodeURIComponent(email)}`);
+      const json = await res.json();
+      setHasAccess(json.status === "active");
+      setLoading(false);
+    };
+
     const check = async () => {
       const { data: session } = await supabase.auth.getSession();
+      if (stopped) return;
       if (!session.session) {
         setUser(null);
         setHasAccess(false);
@@ -26,13 +38,31 @@ function AuthorizationGuard({ children }) {
 
       // Verifica se o usuário está "active" na tabela user_access
       const email = session.session.user.email;
-      const res = await fetch(`${API}/user-status/${email}`);
-      const json = await res.json();
       setUser(session.session.user);
-      setHasAccess(json.status === "active");
-      setLoading(false);
+      if (typeof EventSource === "undefined") return fetchStatus(email);
+
+      // Uma conexão SSE: status atual na abertura e cada mudança (ativação/expiração)
+      const token = encodeURIComponent(session.session.access_token);
+      source = new EventSource(`${API}/access-events?access_token=${token}`);
+      source.addEventListener("status", (e) => {
+        setHasAccess(JSON.parse(e.data).status === "active");
+        setLoading(false);
+      });
+      source.onerror = () => {
+        // Erros de rede o EventSource reconecta sozinho; CLOSED = recusado
+        // (ex.: token expirado): busca uma sessão nova e reabre
+        if (source.readyState !== EventSource.CLOSED) return;
+        source.close();
+        fetchStatus(email).catch(() => setLoading(false));
+        retry = setTimeout(check, 30000);
+      };
     };
     check();
+    return () => {
+      stopped = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
   }, []);
 
   if (loading) return <p style={{ padding: 32 }}>Verificando acesso...</p>;
@@ -0,0 +1,69 @@
+# tests/conftest.py
+# Backend contra o Supabase falso de bench/ (PostgREST em memória). O ambiente é
+# montado antes de qualquer import do backend: os módulos leem a config no import.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import jwt
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+# Depois do backend: bench/ tem scripts com o mesmo nome de módulos do app
+sys.path.append(str(ROOT / "bench"))
+
+from fake_supabase import FakeSupabase  # noqa: E402
+
+JWT_SECRET = "test-jwt-secret-0123456789abcdef0123"
+WEBHOOK_SECRET = "test-webhook-secret"
+_TMP = tempfile.mkdtemp(prefix="mandala5-tests-")
+
+_fake = FakeSupabase()
+os.environ.update(
+    SUPABASE_URL=_fake.start(),
+    SUPABASE_SERVICE_ROLE_KEY="test-service-role-key",
+    SUPABASE_JWT_SECRET=JWT_SECRET,
+    ACCESS_WEBHOOK_SECRET=WEBHOOK_SECRET,
+    STARTUP_WARMUP="0",
+    ADMISSION="0",
+    # Sem cache de user_access entre testes: cada teste monta as suas linhas
+    USER_ACCESS_TTL="0",
+    USER_ACCESS_SWR="0",
+    USER_ACCESS_STALE_IF_ERROR="0",
+    RENDER_CACHE_DIR=str(Path(_TMP) / "render"),
+    JOBS_STORE_DIR=str(Path(_TMP) / "jobs"),
+    TEXTURE_DIR=str(Path(_TMP) / "textures"),
+)
+
+def token(email: str) -> str:
+    return jwt.encode({"email": email}, JWT_SECRET, algorithm="HS256")
+
+def bearer(email: str) -> dict:
+    return {"Authorization": f"Bearer {token(email)}"}
+
+@pytest.fixture
+def fake():
+    _fake.tables.clear()
+    _fake.sequences.clear()
+    _fake.error_rate = 0.0
+    _fake.latency_ms = 0.0
+    yield _fake
+    _fake.tables.clear()
+    _fake.error_rate = 0.0
+
+@pytest.fixture
+def active_user(fake):
+    email = "ana@example.com"
+    fake.tables["user_access"] = [{"email": email, "status": "active", "subscription_plan": "pro"}]
+    return email
+
+@pytest.fixture
+def client(fake):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    with TestClient(server.app) as c:
+        yield c
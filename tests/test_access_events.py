@@ -0,0 +1,112 @@
+# tests/test_access_events.py
+import asyncio
+import logging
+
+import pytest
+from fastapi import HTTPException
+
+import access_events
+from access_events import AccessEventHub
+from auth import RedactTokenFilter
+from resilience import SupabaseUnavailable
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = AccessEventHub(max_subscribers=3, max_per_user=2)
+    monkeypatch.setattr(access_events, "hub", hub)
+    return hub
+
+def _slow_access(monkeypatch, status="active"):
+    async def get_user_access(email):
+        await asyncio.sleep(0.01)
+        return {"email": email, "status": status}
+    monkeypatch.setattr(access_events, "get_user_access", get_user_access)
+
+async def _connect(email):
+    try:
+        return await access_events.access_events(email)
+    except HTTPException as e:
+        return e.status_code
+
+# ---------- LIMITES ----------
+def test_concurrent_connects_respect_per_user_limit(hub, monkeypatch):
+    _slow_access(monkeypatch)
+
+    async def main():
+        return await asyncio.gather(*(_connect("ana@example.com") for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert sum(1 for r in results if r == 429) == 2
+    assert hub.connections == 2
+
+def test_concurrent_connects_respect_global_limit(hub, monkeypatch):
+    _slow_access(monkeypatch)
+
+    async def main():
+        return await asyncio.gather(*(_connect(f"user{i}@example.com") for i in range(5)))
+
+    results = asyncio.run(main())
+    assert sum(1 for r in results if r == 503) == 2
+    assert hub.connections == 3
+
+def test_failed_access_read_releases_reservation(hub, monkeypatch):
+    async def get_user_access(email):
+        raise SupabaseUnavailable("fora do ar", retry_after=5)
+    monkeypatch.setattr(access_events, "get_user_access", get_user_access)
+
+    assert asyncio.run(_connect("ana@example.com")) == 503
+    assert hub.connections == 0 and hub.stats()["emails"] == 0
+
+def test_response_releases_slot_when_client_leaves_before_first_chunk(hub, monkeypatch):
+    _slow_access(monkeypatch)
+
+    async def main():
+        response = await access_events.access_events("ana@example.com")
+        assert hub.connections == 1
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await asyncio.sleep(0)
+
+        await response({"type": "http", "method": "GET"}, receive, send)
+
+    asyncio.run(main())
+    assert hub.connections == 0 and hub.stats()["emails"] == 0
+
+# ---------- PUBLICAÇÃO ----------
+def test_publish_delivers_only_changes_to_subscribers(hub):
+    async def main():
+        first, second = hub.reserve("ana@example.com"), hub.reserve("ana@example.com")
+        hub.activate(first, "active")
+        hub.activate(second, "pending")
+        hub.on_row("ana@example.com", {"status": "active"})
+        assert first.pending is None
+        hub.on_row("ana@example.com", {"status": "expired"})
+        hub.on_row("bia@example.com", {"status": "active"})
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.pending == second.pending == "expired"
+    assert first.wake.is_set() and second.wake.is_set()
+    assert hub.stats()["published"] == 1 and hub.stats()["delivered"] == 2
+
+def test_unsubscribe_is_idempotent(hub):
+    async def main():
+        sub = hub.reserve("ana@example.com")
+        hub.unsubscribe(sub)
+        hub.unsubscribe(sub)
+
+    asyncio.run(main())
+    assert hub.connections == 0
+
+# ---------- ACCESS LOG ----------
+def test_access_log_redacts_query_token():
+    record = logging.LogRecord(
+        "uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s HTTP/%s" %d',
+        ("127.0.0.1:5000", "GET", "/api/access-events?access_token=eyJ.abc.def&x=1", "1.1", 200), None,
+    )
+    assert RedactTokenFilter().filter(record)
+    assert "eyJ" not in record.getMessage()
+    assert "access_token=[redacted]&x=1" in record.getMessage()
@@ -0,0 +1,143 @@
+# tests/test_access_index.py
+import asyncio
+
+import pytest
+
+import access_index
+import db
+from access_index import AccessIndex
+from tests.conftest import WEBHOOK_SECRET
+
+ANA = "ana@example.com"
+
+def _row(email, status, ts="2024-05-01T10:00:00+00:00"):
+    return {"email": email, "status": status, "updated_at": ts}
+
+def _run(coro):
+    # Cliente Supabase é por event loop: fecha ao fim de cada asyncio.run
+    async def main():
+        try:
+            return await coro
+        finally:
+            await db.close_db()
+
+    return asyncio.run(main())
+
+@pytest.fixture
+def index(fake, monkeypatch):
+    fake.tables["user_access"] = [_row(ANA, "active"), _row("bia@example.com", "active")]
+    idx = AccessIndex(refresh_interval=60, max_staleness=60, full_reload=600, page_size=1, delete_scan=0)
+    _run(idx.load())
+    monkeypatch.setattr(access_index, "_index", idx)
+    return idx
+
+def _revoke(fake, email):
+    for row in fake.tables["user_access"]:
+        if row["email"] == email:
+            row["status"] = "revoked"
+
+def _webhook(client, payload, secret=WEBHOOK_SECRET):
+    return client.post("/api/user-access/invalidate", json=payload, headers={"X-Webhook-Secret": secret})
+
+def test_webhook_rereads_the_row(client, fake, index):
+    _revoke(fake, ANA)
+    assert index.lookup(ANA) == (True, _row(ANA, "active"))
+    r = _webhook(client, {"type": "UPDATE", "record": {"email": ANA}})
+    assert r.json() == {"email": ANA, "indexed": True, "reloaded": True, "status": "revoked"}
+    assert index.lookup(ANA)[1]["status"] == "revoked"
+
+def test_webhook_rejects_bad_secret_and_payload(client, index):
+    assert _webhook(client, {"email": ANA}, secret="nope").status_code == 401
+    assert _webhook(client, {"record": {}}).status_code == 422
+    assert index.stats()["invalidations"] == 0
+
+def test_webhook_delete_removes_row(client, fake, index):
+    fake.tables["user_access"] = [r for r in fake.tables["user_access"] if r["email"] != ANA]
+    r = _webhook(client, {"type": "DELETE", "old_record": {"email": ANA}})
+    assert r.json()["status"] == "none"
+    assert index.lookup(ANA) == (True, None)
+
+class Gate:
+    # Segura a primeira página de um sync até o teste liberar
+    def __init__(self, index):
+        self.entered = asyncio.Event()
+        self.release = asyncio.Event()
+        pages = index._pages
+
+        async def gated(since):
+            async for page in pages(since):
+                self.entered.set()
+                await self.release.wait()
+                yield page
+
+        index._pages = gated
+
+def test_load_started_before_invalidate_does_not_restore_old_row(fake, index):
+    async def main():
+        gate = Gate(index)
+        load = asyncio.ensure_future(index.load())
+        await gate.entered.wait()
+        # A carga já leu a linha "active"; a revogação chega e é relida
+        _revoke(fake, ANA)
+        await index.invalidate(ANA)
+        gate.release.set()
+        await load
+
+    _run(main())
+    assert index.lookup(ANA)[1]["status"] == "revoked"
+    assert index.lookup("bia@example.com")[1]["status"] == "active"
+
+def test_load_keeps_dirty_mark_of_invalidate_still_reading(fake, index, monkeypatch):
+    async def main():
+        gate = Gate(index)
+        load = asyncio.ensure_future(index.load())
+        await gate.entered.wait()
+        reading = asyncio.Event()
+
+        async def slow_read(email):
+            await reading.wait()
+            return _row(email, "revoked")
+
+        monkeypatch.setattr(access_index, "read_row", slow_read)
+        invalidate = asyncio.ensure_future(index.invalidate(ANA))
+        await asyncio.sleep(0)
+        gate.release.set()
+        await load
+        # Invalidate ainda relendo: o índice manda consultar o banco
+        assert index.lookup(ANA) == (False, None)
+        reading.set()
+        await invalidate
+
+    _run(main())
+    assert index.lookup(ANA)[1]["status"] == "revoked"
+
+def test_refresh_started_before_invalidate_skips_the_row(fake, index):
+    fake.tables["user_access"][0]["updated_at"] = "2024-05-01T10:00:09+00:00"
+
+    async def main():
+        gate = Gate(index)
+        refresh = asyncio.ensure_future(index.refresh())
+        await gate.entered.wait()
+        _revoke(fake, ANA)
+        await index.invalidate(ANA)
+        gate.release.set()
+        await refresh
+
+    _run(main())
+    assert index.lookup(ANA)[1]["status"] == "revoked"
+    # O próximo sync já começa depois do invalidate: a marca sai
+    _run(index.refresh())
+    assert not index._invalidated
+    assert index.lookup(ANA)[1]["status"] == "revoked"
+
+def test_refresh_scans_physical_deletes(fake, index):
+    seen = []
+    access_index._listeners.append(lambda email, row: seen.append((email, row)))
+    try:
+        fake.tables["user_access"] = [r for r in fake.tables["user_access"] if r["email"] != ANA]
+        _run(index.refresh())
+    finally:
+        access_index._listeners.pop()
+    assert index.lookup(ANA) == (True, None)
+    assert (ANA, None) in seen
+    assert index.stats()["rows_deleted"] == 1
@@ -0,0 +1,196 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import admission
+from admission import AdmissionMiddleware, ConcurrencyLimiter, Overloaded, RateLimiter, is_stream
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+# ---------- RateLimiter ----------
+def test_rate_limiter_burst_then_wait(clock):
+    limiter = RateLimiter(rate=2, burst=3, max_keys=10)
+    assert [limiter.take("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.take("a") == pytest.approx(0.5)
+    # Outra chave tem o próprio balde
+    assert limiter.take("b") == 0.0
+
+def test_rate_limiter_refills_over_time(clock):
+    limiter = RateLimiter(rate=2, burst=2, max_keys=10)
+    limiter.take("a")
+    limiter.take("a")
+    assert limiter.take("a") > 0
+    clock.now += 0.5
+    assert limiter.take("a") == 0.0
+    # O refill para no burst
+    clock.now += 100
+    assert [limiter.take("a") for _ in range(3)][-1] > 0
+
+def test_rate_limiter_evicts_least_recent_key(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    limiter.take("a")
+    limiter.take("b")
+    limiter.take("a")
+    limiter.take("c")
+    assert len(limiter) == 2
+    # "b" saiu do LRU: volta com o balde cheio
+    assert limiter.take("b") == 0.0
+
+# ---------- ConcurrencyLimiter ----------
+def test_concurrency_handoff_keeps_in_flight():
+    async def main():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats() == {"in_flight": 1, "queued": 1, "max_in_flight": 1}
+        with pytest.raises(Overloaded, match="queue_full"):
+            await limiter.acquire()
+        limiter.release()
+        await waiter
+        # A vaga passou direto para quem esperava
+        assert limiter.stats()["in_flight"] == 1
+        limiter.release()
+        assert limiter.stats() == {"in_flight": 0, "queued": 0, "max_in_flight": 1}
+
+    asyncio.run(main())
+
+def test_concurrency_queue_timeout():
+    async def main():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(Overloaded, match="queue_timeout"):
+            await limiter.acquire()
+        assert limiter.stats()["queued"] == 0
+        limiter.release()
+        assert limiter.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+def test_concurrency_slot_handed_over_at_timeout_is_kept(monkeypatch):
+    # A vaga chega no mesmo tick do timeout: acquire fica com ela em vez de
+    # recusar, senão a vaga transferida vazaria (in_flight nunca voltaria a 0)
+    async def main():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        real_wait_for = asyncio.wait_for
+
+        async def wait_for_racing_release(aw, timeout):
+            limiter.release()
+            await asyncio.sleep(0)
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", wait_for_racing_release)
+        try:
+            await limiter.acquire()
+        finally:
+            monkeypatch.setattr(asyncio, "wait_for", real_wait_for)
+        assert limiter.stats() == {"in_flight": 1, "queued": 0, "max_in_flight": 1}
+        limiter.release()
+        assert limiter.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+def test_concurrency_cancelled_after_handoff_returns_slot():
+    async def main():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Cancelado com a vaga já transferida: acquire a devolve
+            assert limiter.stats()["in_flight"] == 0
+        else:
+            # wait_for pode entregar o resultado e engolir o cancelamento; aí a vaga é nossa
+            assert limiter.stats()["in_flight"] == 1
+            limiter.release()
+        assert limiter.stats() == {"in_flight": 0, "queued": 0, "max_in_flight": 1}
+
+    asyncio.run(main())
+
+def test_concurrency_cancelled_while_waiting_leaves_no_waiter():
+    async def main():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        assert limiter.stats() == {"in_flight": 0, "queued": 0, "max_in_flight": 1}
+
+    asyncio.run(main())
+
+# ---------- Middleware ----------
+def _scope(path="/api/status", method="GET", query=b"", accept=None):
+    headers = [(b"accept", accept.encode())] if accept else []
+    return {"type": "http", "method": method, "path": path, "query_string": query, "headers": headers}
+
+def test_is_stream():
+    assert is_stream(_scope(query=b"limit=5&format=ndjson"))
+    assert is_stream(_scope(accept="application/x-ndjson"))
+    assert not is_stream(_scope(query=b"format=json"))
+    assert not is_stream(_scope(method="POST", query=b"format=ndjson"))
+
+@pytest.fixture
+def guarded_app(monkeypatch):
+    monkeypatch.setattr(admission, "RATE_LIMIT_RPS", 1)
+    monkeypatch.setattr(admission, "RATE_LIMIT_BURST", 4)
+    monkeypatch.setattr(admission, "ADMISSION_MAX_STREAMS", 1)
+    holder = {}
+
+    async def ok(request):
+        # Quais vagas esta requisição ocupa enquanto é atendida
+        mw = holder["app"]
+        return JSONResponse({
+            "in_flight": mw.concurrency.stats()["in_flight"],
+            "streams": mw.streams.stats()["in_flight"],
+        })
+
+    app = Starlette(routes=[
+        Route("/api/status", ok),
+        Route("/api/user-access/invalidate", ok, methods=["POST"]),
+    ])
+    holder["app"] = AdmissionMiddleware(app, prefixes=("/api/status", "/api/user-access"), enabled=True)
+    return holder["app"]
+
+def test_webhook_is_not_rate_limited(guarded_app):
+    with TestClient(guarded_app) as c:
+        statuses = [c.post("/api/user-access/invalidate").status_code for _ in range(10)]
+        assert statuses == [200] * 10
+        # A mesma origem numa rota protegida estoura o balde
+        limited = [c.get("/api/status") for _ in range(5)]
+        assert [r.status_code for r in limited] == [200, 200, 200, 200, 429]
+        assert limited[-1].headers["retry-after"] == "1"
+
+def test_streams_have_their_own_cap(guarded_app):
+    with TestClient(guarded_app) as c:
+        assert c.get("/api/status?format=ndjson").json() == {"in_flight": 0, "streams": 1}
+        assert c.get("/api/status").json() == {"in_flight": 1, "streams": 0}
+        # Com o teto de streams tomado, só os streams recebem 503
+        guarded_app.streams.in_flight = guarded_app.streams.max_in_flight
+        refused = c.get("/api/status", headers={"Accept": "application/x-ndjson"})
+        assert refused.status_code == 503
+        assert refused.headers["retry-after"] == "1"
+        assert c.get("/api/status").status_code == 200
@@ -0,0 +1,33 @@
+# tests/test_auth.py
+import jwt
+
+from tests.conftest import JWT_SECRET, bearer
+
+def test_active_user_passes(client, active_user):
+    r = client.get("/api/protected", headers=bearer(active_user))
+    assert r.status_code == 200
+
+def test_inactive_user_gets_403(client, fake):
+    fake.tables["user_access"] = [{"email": "bia@example.com", "status": "pending"}]
+    r = client.get("/api/protected", headers=bearer("bia@example.com"))
+    assert r.status_code == 403
+    assert r.json()["detail"] == "Acesso negado"
+
+def test_unknown_user_gets_403(client, fake):
+    r = client.get("/api/protected", headers=bearer("nobody@example.com"))
+    assert r.status_code == 403
+
+def test_bad_token_gets_401(client, active_user):
+    wrong = jwt.encode({"email": active_user}, "outro-segredo-0123456789abcdef0123", algorithm="HS256")
+    r = client.get("/api/protected", headers={"Authorization": f"Bearer {wrong}"})
+    assert r.status_code == 401
+
+def test_token_without_email_gets_401(client, fake):
+    r = client.get("/api/protected", headers={"Authorization": f"Bearer {jwt.encode({'sub': 'x'}, JWT_SECRET)}"})
+    assert r.status_code == 401
+
+def test_supabase_down_gets_503(client, active_user, fake):
+    fake.error_rate = 1.0
+    r = client.get("/api/protected", headers=bearer(active_user))
+    assert r.status_code == 503
+    assert "Retry-After" in r.headers
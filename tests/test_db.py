@@ -0,0 +1,14 @@
+# tests/test_db.py
+import anyio
+import anyio.to_thread
+
+from db import configure_threadpool
+
+def test_configure_threadpool_sets_loop_limiter(monkeypatch):
+    monkeypatch.setenv("THREADPOOL_LIMIT", "7")
+
+    async def main():
+        configure_threadpool()
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert anyio.run(main) == 7
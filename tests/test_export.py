@@ -0,0 +1,87 @@
+# tests/test_export.py
+import asyncio
+import io
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+
+import export
+from mandala import render
+from params import MandalaParams
+
+class InlinePool:
+    # Executa na hora, no próprio processo; conta futures entregues e ainda não consumidos
+    def __init__(self):
+        self.submitted = 0
+        self.outstanding = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        pool = self
+
+        class Tracked(Future):
+            def result(self, timeout=None):
+                pool.outstanding -= 1
+                return super().result(timeout)
+
+        fut = Tracked()
+        fut.set_result(fn(*args))
+        self.submitted += 1
+        self.outstanding += 1
+        self.peak = max(self.peak, self.outstanding)
+        return fut
+
+def test_export_matches_direct_render_with_bounded_window(monkeypatch, tmp_path):
+    pool = InlinePool()
+    monkeypatch.setattr(export, "get_pool", lambda: pool)
+    monkeypatch.setattr(export, "EXPORT_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(export, "EXPORT_WORKERS", 2)
+    p = MandalaParams(seed=0.3)
+    width, height, tile = 200, 150, 32
+    data = b"".join(export.stream_export(p, width, height, tile))
+
+    img = np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+    assert img.shape == (height, width, 3)
+    assert np.array_equal(img, render(p, width, height))
+    # 7 x 5 tiles, nunca mais que a janela (2 * workers) em voo
+    assert pool.submitted == 35
+    assert pool.peak <= 4
+    assert list(tmp_path.iterdir()) == []
+
+def test_export_cancels_pending_tiles_on_disconnect(monkeypatch, tmp_path):
+    pool = InlinePool()
+    monkeypatch.setattr(export, "get_pool", lambda: pool)
+    monkeypatch.setattr(export, "EXPORT_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(export, "EXPORT_WORKERS", 1)
+    stream = export.stream_export(MandalaParams(), 256, 256, 32)
+    next(stream)
+    next(stream)
+    stream.close()
+    # Só a primeira faixa (mais a janela) foi enviada ao pool, e o buffer sumiu
+    assert pool.submitted < 64
+    assert list(tmp_path.iterdir()) == []
+
+def test_slot_released_when_client_leaves_before_first_chunk(monkeypatch):
+    monkeypatch.setattr(export, "_active", 0)
+    started = []
+
+    def stream():
+        started.append(True)
+        yield b"never"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client gone")
+
+    export.acquire_slot()
+    response = export.SlotStreamingResponse(stream(), media_type="image/png")
+    try:
+        asyncio.run(response({"type": "http", "method": "POST", "path": "/api/export"}, receive, send))
+    except Exception:
+        # OSError, ou ExceptionGroup do task group do Starlette
+        pass
+    assert not started
+    assert export._active == 0
@@ -0,0 +1,202 @@
+# tests/test_jobs.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+import jobs
+from jobs import ArtifactStore, Job, JobManager, TaskQueue
+from tests.conftest import bearer
+
+# ---------- TaskQueue ----------
+def test_task_queue_runs_by_priority_then_arrival():
+    order = []
+    gate = threading.Event()
+
+    async def main():
+        tasks = TaskQueue(1, executor=lambda: ThreadPoolExecutor(1))
+        try:
+            first = tasks.submit(1, gate.wait)
+            futures = [
+                tasks.submit(2, order.append, "low"),
+                tasks.submit(1, order.append, "normal-1"),
+                tasks.submit(0, order.append, "high"),
+                tasks.submit(1, order.append, "normal-2"),
+            ]
+            assert tasks.busy == 1 and tasks.waiting() == 4
+            gate.set()
+            await asyncio.gather(first, *futures)
+        finally:
+            tasks.shutdown()
+
+    asyncio.run(main())
+    assert order == ["high", "normal-1", "normal-2", "low"]
+
+def test_task_queue_skips_cancelled_tasks():
+    ran = []
+    gate = threading.Event()
+
+    async def main():
+        tasks = TaskQueue(1, executor=lambda: ThreadPoolExecutor(1))
+        try:
+            first = tasks.submit(0, gate.wait)
+            dropped = tasks.submit(0, ran.append, "dropped")
+            kept = tasks.submit(0, ran.append, "kept")
+            dropped.cancel()
+            assert tasks.waiting() == 1
+            gate.set()
+            await asyncio.gather(first, kept)
+            assert tasks.submitted == 2
+        finally:
+            tasks.shutdown()
+
+    asyncio.run(main())
+    assert ran == ["kept"]
+
+# ---------- ArtifactStore ----------
+def _artifact(store, job_id, size):
+    tmp = store.temp_path(job_id, ".png")
+    tmp.write_bytes(b"x" * size)
+    return store.put(job_id, tmp)
+
+def test_artifact_store_evicts_least_recently_used(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=1000)
+    store.reset()
+    for job_id in ("a", "b", "c"):
+        assert _artifact(store, job_id, 300)
+    # Download renova `a`: quem sai é `b`
+    assert store.get("a") is not None
+    assert _artifact(store, "d", 300)
+    assert "a" in store and "b" not in store and "c" in store and "d" in store
+    assert store.stats() == {"files": 3, "bytes": 900, "max_bytes": 1000, "evictions": 1}
+    assert len(list(store.directory.iterdir())) == 3
+
+def test_artifact_store_rejects_oversized_artifact(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=100)
+    store.reset()
+    assert not _artifact(store, "big", 101)
+    assert "big" not in store
+    assert list(store.directory.iterdir()) == []
+
+# ---------- JobManager ----------
+class Runner:
+    # Runner de mentira: cada job espera o seu Event e grava um artefato pequeno
+    def __init__(self):
+        self.started = []
+        self.release = {}
+
+    async def __call__(self, manager, job):
+        self.started.append(job.id)
+        gate = self.release.setdefault(job.id, asyncio.Event())
+        await gate.wait()
+        tmp = manager.store.temp_path(job.id, ".png")
+        tmp.write_bytes(b"png")
+        return tmp
+
+    def finish(self, job):
+        self.release.setdefault(job.id, asyncio.Event()).set()
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = Runner()
+    monkeypatch.setattr(jobs, "RUNNERS", {"render": runner})
+    return runner
+
+def _manager(tmp_path, **kwargs):
+    store = ArtifactStore(tmp_path, max_bytes=10_000)
+    store.reset()
+    return JobManager(store, TaskQueue(1), ttl=3600, **kwargs)
+
+def _job(owner, priority="normal"):
+    return Job(owner, "render", priority, {}, "out.png", "image/png")
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_per_user_quotas(tmp_path, runner):
+    async def main():
+        manager = _manager(tmp_path, max_running=2, per_user=1, queued_per_user=2, max_queued=10)
+        ana = [manager.submit(_job("ana")) for _ in range(3)]
+        # Uma rodando por usuário; as outras duas na fila, e a fila da ana está cheia
+        assert [j.state for j in ana] == ["running", "queued", "queued"]
+        with pytest.raises(HTTPException) as e:
+            manager.submit(_job("ana"))
+        assert e.value.status_code == 429
+        # A cota da ana não segura o job da bia
+        bia = manager.submit(_job("bia"))
+        assert bia.state == "running"
+        await _settle()
+        runner.finish(ana[0])
+        await _settle()
+        assert ana[0].state == "done" and ana[1].state == "running"
+        assert manager.stats()["rejected"] == 1
+        await manager.stop()
+
+    asyncio.run(main())
+
+def test_global_queue_limit_is_503(tmp_path, runner):
+    async def main():
+        manager = _manager(tmp_path, max_running=1, per_user=1, queued_per_user=10, max_queued=1)
+        manager.submit(_job("ana"))
+        manager.submit(_job("bia"))
+        with pytest.raises(HTTPException) as e:
+            manager.submit(_job("caio"))
+        assert e.value.status_code == 503 and e.value.headers["Retry-After"] == "30"
+        await manager.stop()
+
+    asyncio.run(main())
+
+def test_queued_jobs_start_by_priority(tmp_path, runner):
+    async def main():
+        manager = _manager(tmp_path, max_running=1, per_user=5, queued_per_user=10)
+        first = manager.submit(_job("ana"))
+        low = manager.submit(_job("ana", "low"))
+        normal = manager.submit(_job("bia"))
+        high = manager.submit(_job("caio", "high"))
+        assert [manager.snapshot(j)["position"] for j in (high, normal, low)] == [0, 1, 2]
+        for job in (first, high, normal, low):
+            await _settle()
+            runner.finish(job)
+        await _settle()
+        assert runner.started == [first.id, high.id, normal.id, low.id]
+        assert all(j.state == "done" for j in (first, low, normal, high))
+        await manager.stop()
+
+    asyncio.run(main())
+
+def test_cancel_queued_and_running(tmp_path, runner):
+    async def main():
+        manager = _manager(tmp_path, max_running=1, per_user=5)
+        running = manager.submit(_job("ana"))
+        queued = manager.submit(_job("ana"))
+        manager.cancel(queued)
+        assert queued.state == "cancelled"
+        await _settle()
+        manager.cancel(running)
+        await _settle()
+        assert running.state == "cancelled"
+        assert running.id not in manager.store
+        assert manager.stats()["cancelled"] == 2
+        assert list(manager.store.directory.glob("*.tmp")) == []
+        await manager.stop()
+
+    asyncio.run(main())
+
+# ---------- ROTAS ----------
+def test_read_routes_require_active_access(client, fake, active_user):
+    fake.tables["user_access"].append({"email": "revogado@example.com", "status": "revoked"})
+    job = _job("revogado@example.com")
+    job.state = "done"
+    jobs.manager.jobs[job.id] = job
+    try:
+        headers = bearer("revogado@example.com")
+        assert client.get("/api/jobs", headers=headers).status_code == 403
+        assert client.get(f"/api/jobs/{job.id}/artifact", headers=headers).status_code == 403
+        r = client.get(f"/api/jobs/{job.id}/events", params={"access_token": headers["Authorization"][7:]})
+        assert r.status_code == 403
+        assert client.get("/api/jobs", headers=bearer(active_user)).json() == {"jobs": []}
+    finally:
+        jobs.manager.jobs.pop(job.id, None)
@@ -0,0 +1,109 @@
+# tests/test_presets.py
+import pytest
+
+from tests.conftest import bearer
+
+@pytest.fixture
+def presets(client, active_user, fake):
+    # Emula o trigger presets_stamp: version sai de uma sequência do "banco"
+    fake.sequences["presets"] = "version"
+    headers = bearer(active_user)
+
+    def put(name, **data):
+        r = client.put(f"/api/presets/{name}", json={"data": data}, headers=headers)
+        assert r.status_code == 200
+        return r.json()["version"]
+
+    return client, headers, put
+
+def test_versions_come_from_the_database(presets, fake):
+    client, headers, put = presets
+    v1 = put("a", sym=6)
+    v2 = put("b", sym=8)
+    assert v2 > v1
+    rows = {r["name"]: r for r in fake.tables["presets"]}
+    assert rows["a"]["version"] == v1 and rows["b"]["version"] == v2
+    # O servidor não manda version/updated_at: quem decide é o trigger
+    assert client.put("/api/presets/a", json={"data": {"sym": 7}}, headers=headers).json()["version"] > v2
+
+def test_list_etag_304_until_collection_changes(presets):
+    client, headers, put = presets
+    put("a", sym=6)
+    first = client.get("/api/presets", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.json()["presets"][0]["name"] == "a"
+
+    r = client.get("/api/presets", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+
+    put("b", sym=8)
+    r = client.get("/api/presets", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert [p["name"] for p in r.json()["presets"]] == ["a", "b"]
+
+def test_single_preset_etag(presets):
+    client, headers, put = presets
+    put("a", sym=6)
+    r = client.get("/api/presets/a", headers=headers)
+    assert r.status_code == 200 and r.json()["data"] == {"sym": 6}
+    r = client.get("/api/presets/a", headers={**headers, "If-None-Match": r.headers["ETag"]})
+    assert r.status_code == 304
+
+def test_tombstone_propagates_through_changes(presets):
+    client, headers, put = presets
+    put("a", sym=6)
+    synced = put("b", sym=8)
+
+    r = client.delete("/api/presets/a", headers=headers)
+    assert r.status_code == 200
+    deleted_at = r.json()["version"]
+    assert deleted_at > synced
+    assert client.delete("/api/presets/a", headers=headers).status_code == 404
+    assert client.get("/api/presets/a", headers=headers).status_code == 404
+
+    r = client.get(f"/api/presets/changes?since={synced}", headers=headers).json()
+    assert [(c["name"], c["deleted"]) for c in r["changes"]] == [("a", True)]
+    assert r["version"] == deleted_at and r["has_more"] is False
+    # Lista não mostra o tombstone
+    assert [p["name"] for p in client.get("/api/presets", headers=headers).json()["presets"]] == ["b"]
+    # Nada novo desde a última versão
+    r = client.get(f"/api/presets/changes?since={deleted_at}", headers=headers).json()
+    assert r == {"changes": [], "version": deleted_at, "has_more": False}
+
+def test_changes_pages_in_version_order(presets):
+    client, headers, put = presets
+    for name in "cab":
+        put(name)
+    r = client.get("/api/presets/changes?since=0&limit=2", headers=headers).json()
+    assert [c["name"] for c in r["changes"]] == ["c", "a"] and r["has_more"] is True
+    r = client.get(f"/api/presets/changes?since={r['version']}&limit=2", headers=headers).json()
+    assert [c["name"] for c in r["changes"]] == ["b"] and r["has_more"] is False
+
+def test_list_cursor_walks_every_preset_once(presets):
+    client, headers, put = presets
+    names = [f"p{i:02d}" for i in range(7)]
+    for name in reversed(names):
+        put(name)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/presets", params=params, headers=headers).json()
+        seen += [p["name"] for p in page["presets"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == names
+
+def test_invalid_cursor_is_400(presets):
+    client, headers, _ = presets
+    assert client.get("/api/presets?cursor=%%%", headers=headers).status_code == 400
+
+def test_presets_are_per_user(presets, fake):
+    client, headers, put = presets
+    put("a", sym=6)
+    fake.tables["user_access"].append({"email": "other@example.com", "status": "active", "subscription_plan": "pro"})
+    other = bearer("other@example.com")
+    assert client.get("/api/presets", headers=other).json()["presets"] == []
+    assert client.get("/api/presets/changes", headers=other).json()["changes"] == []
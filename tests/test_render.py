@@ -0,0 +1,99 @@
+# tests/test_render.py
+import asyncio
+import os
+import time
+
+from fastapi import HTTPException
+
+import render
+from params import MandalaParams
+from render import RenderCache, RenderRequest, cache_key
+
+def test_unknown_aspect_is_422(client):
+    assert client.get("/api/render?width=32&aspect=3:2").status_code == 422
+    assert client.post("/api/render", json={"width": 32, "aspect": "3:2"}).status_code == 422
+    assert client.post("/api/export", json={"size": 64, "aspect": "2:1"}).status_code == 422
+    assert client.post("/api/animate", json={"width": 32, "aspect": "2:1"}).status_code == 422
+
+def test_render_uses_aspect(client):
+    r = client.get("/api/render?width=32&aspect=16:9&seed=0.123")
+    assert r.status_code == 200
+    assert r.content[:8] == b"\x89PNG\r\n\x1a\n"
+    # IHDR: largura e altura big-endian logo depois da assinatura
+    assert int.from_bytes(r.content[16:20], "big") == 32
+    assert int.from_bytes(r.content[20:24], "big") == 18
+    again = client.get("/api/render?width=32&aspect=16:9&seed=0.123")
+    assert again.headers["X-Render-Cache"].startswith("hit")
+
+def _put(cache: RenderCache, seed: float, size: int, age: float) -> str:
+    key = cache_key(MandalaParams(seed=seed), 8, 8)
+    cache.put(key, b"x" * size)
+    old = time.time() - age
+    os.utime(cache._path(key), (old, old))
+    return key
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(tmp_path, max_bytes=0, max_disk_bytes=1000)
+    a = _put(cache, 0.1, 300, age=300)
+    b = _put(cache, 0.2, 300, age=200)
+    c = _put(cache, 0.3, 300, age=100)
+    # Hit em disco renova `a`: o mais antigo passa a ser `b`
+    assert cache.get(a)[1] == "hit-disk"
+    _put(cache, 0.4, 300, age=0)
+    assert cache._path(a).exists()
+    assert not cache._path(b).exists()
+    assert cache._path(c).exists()
+    assert cache.stats()["disk_bytes"] <= 1000
+    assert cache.stats()["disk_evictions"] == 1
+
+def test_disk_cache_counts_existing_files(tmp_path):
+    # Arquivos de outro processo/execução entram na conta na primeira varredura
+    first = RenderCache(tmp_path, max_bytes=0, max_disk_bytes=10_000)
+    for i in range(5):
+        _put(first, i / 10, 300, age=100 - i)
+    second = RenderCache(tmp_path, max_bytes=0, max_disk_bytes=1000)
+    _put(second, 0.9, 300, age=0)
+    assert len(list(tmp_path.glob("*/*.png"))) == 3
+
+def test_concurrent_misses_are_bounded(monkeypatch):
+    running, peak = 0, 0
+
+    def slow_render(req, width, height, key):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.05)
+        running -= 1
+        return b"png"
+
+    async def main():
+        monkeypatch.setattr(render, "_render_slots", asyncio.Semaphore(2))
+        monkeypatch.setattr(render, "RENDER_MAX_QUEUED", 2)
+        monkeypatch.setattr(render, "_render_and_store", slow_render)
+        req = RenderRequest(width=16)
+        return await asyncio.gather(
+            *(render._render_limited(req, 16, 16, str(i)) for i in range(5)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert peak == 2
+    assert results.count(b"png") == 4
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1 and rejected[0].status_code == 503
+
+def test_animation_frame_limit_is_checked_before_building_times(client):
+    started = time.monotonic()
+    r = client.post("/api/animate", json={"width": 32, "duration": 1e7, "fps": 60})
+    assert r.status_code == 422
+    assert time.monotonic() - started < 5
+    assert client.post("/api/animate", json={"width": 32, "duration": "inf"}).status_code == 422
+    assert client.post("/api/animate", json={"width": 32, "duration": 30, "fps": 24}).status_code == 422
+
+def test_invalid_colors_and_non_finite_params_are_422(client):
+    assert client.post("/api/render", json={"width": 16, "col1": "nothex"}).status_code == 422
+    assert client.get("/api/render?width=16&col2=%23zzzzzz").status_code == 422
+    assert client.get("/api/render?width=16&sym=inf").status_code == 422
+    assert client.get("/api/render?width=16&sym=nan").status_code == 422
+    assert client.post("/api/export", json={"size": 64, "glow": "nan"}).status_code == 422
+    assert client.post("/api/animate", json={"width": 32, "col3": "#12345"}).status_code == 422
+    assert client.get("/api/render?width=16&col1=%23abc&col2=ffa726").status_code == 200
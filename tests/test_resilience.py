@@ -0,0 +1,291 @@
+# tests/test_resilience.py
+import asyncio
+
+import pytest
+
+import auth
+import resilience
+from resilience import CircuitBreaker, StaleCache, SupabaseUnavailable, hedged
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Só o relógio de resilience; o do event loop continua real
+    clock = Clock()
+    monkeypatch.setattr(resilience, "_now", clock)
+    return clock
+
+# ---------- CircuitBreaker ----------
+def _breaker():
+    return CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, open_seconds=5, enabled=True)
+
+def test_breaker_opens_on_failure_rate(clock):
+    breaker = _breaker()
+    breaker.record(True)
+    breaker.record(False, error="timeout")
+    breaker.record(False, error="timeout")
+    # Abaixo de min_calls não abre
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False, error="timeout")
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(SupabaseUnavailable) as e:
+        breaker.before_call()
+    assert e.value.reason == "circuit_open"
+    assert e.value.headers() == {"Retry-After": "5"}
+    assert breaker.short_circuited == 1
+
+def test_breaker_old_failures_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 11
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["window_failed"] == 1
+
+def test_breaker_prunes_buckets_on_success_only_traffic(clock):
+    breaker = _breaker()
+    for _ in range(100):
+        breaker.record(True)
+        clock.now += 1
+    assert len(breaker._buckets) <= breaker.window
+
+def test_breaker_half_open_single_probe_closes(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    clock.now += 5
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Só uma chamada de teste por vez
+    with pytest.raises(SupabaseUnavailable):
+        breaker.before_call()
+    breaker.record(True, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+    assert breaker.stats()["window_failed"] == 0
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    clock.now += 5
+    assert breaker.before_call() is True
+    breaker.record(False, probe=True, error="boom")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_total == 2
+    assert breaker.stats()["retry_after_seconds"] == 5
+
+def test_breaker_release_probe_allows_next(clock):
+    # Probe que terminou sem veredito (ex.: erro 4xx) libera a vaga de teste
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False)
+    clock.now += 5
+    assert breaker.before_call() is True
+    breaker.release_probe()
+    assert breaker.before_call() is True
+
+def test_breaker_disabled_never_opens(clock):
+    breaker = CircuitBreaker(window=10, min_calls=1, failure_rate=0.1, open_seconds=5, enabled=False)
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.before_call() is False
+    assert breaker.state == CircuitBreaker.CLOSED
+
+# ---------- hedged ----------
+def test_hedged_fast_call_does_not_fire_second():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "ok"
+
+    assert asyncio.run(hedged(call, 0.05)) == "ok"
+    assert len(calls) == 1
+
+def test_hedged_second_wins_and_first_is_cancelled():
+    started = []
+    cancelled = []
+
+    async def call():
+        n = len(started)
+        started.append(n)
+        try:
+            await asyncio.sleep(1 if n == 0 else 0)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return n
+
+    async def main():
+        result = await hedged(call, 0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 1
+    assert started == [0, 1]
+    assert cancelled == [0]
+
+def test_hedged_first_failure_waits_for_second():
+    started = []
+
+    async def call():
+        n = len(started)
+        started.append(n)
+        if n == 0:
+            await asyncio.sleep(0.02)
+            raise RuntimeError("first")
+        await asyncio.sleep(0.05)
+        return "second"
+
+    assert asyncio.run(hedged(call, 0.01)) == "second"
+
+def test_hedged_all_fail_raises_original_error():
+    started = []
+
+    async def call():
+        n = len(started)
+        started.append(n)
+        await asyncio.sleep(0.02)
+        raise RuntimeError(f"call {n}")
+
+    with pytest.raises(RuntimeError, match="call 0"):
+        asyncio.run(hedged(call, 0.01))
+
+# ---------- StaleCache ----------
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.gate = None
+
+    async def __call__(self, key):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        value = self.values.pop(0)
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+def _cache():
+    return StaleCache("test", ttl=5, swr=30, stale_if_error=300, max_items=10)
+
+def test_stale_cache_fresh_hit(clock):
+    cache, loader = _cache(), Loader("v1")
+
+    async def main():
+        assert await cache.get("k", loader) == "v1"
+        clock.now += 5
+        assert await cache.get("k", loader) == "v1"
+
+    asyncio.run(main())
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+def test_stale_cache_swr_serves_stale_and_revalidates_once(clock):
+    cache, loader = _cache(), Loader("v1", "v2")
+
+    async def main():
+        await cache.get("k", loader)
+        clock.now += 10
+        loader.gate = asyncio.Event()
+        assert await cache.get("k", loader) == "v1"
+        assert await cache.get("k", loader) == "v1"
+        assert cache.stats()["revalidating"] == 1
+        loader.gate.set()
+        await asyncio.sleep(0.01)
+        assert cache.stats()["revalidating"] == 0
+        assert await cache.get("k", loader) == "v2"
+
+    asyncio.run(main())
+    assert loader.calls == 2
+
+def test_stale_cache_stale_if_error_only_on_infra_failure(clock):
+    cache = _cache()
+    loader = Loader("v1", SupabaseUnavailable("circuit_open"), ValueError("bad row"))
+
+    async def main():
+        await cache.get("k", loader)
+        clock.now += 60
+        assert await cache.get("k", loader) == "v1"
+        with pytest.raises(ValueError):
+            await cache.get("k", loader)
+
+    asyncio.run(main())
+
+def test_stale_cache_too_old_raises(clock):
+    cache = _cache()
+    loader = Loader("v1", SupabaseUnavailable("circuit_open"))
+
+    async def main():
+        await cache.get("k", loader)
+        clock.now += 301
+        with pytest.raises(SupabaseUnavailable):
+            await cache.get("k", loader)
+
+    asyncio.run(main())
+
+def test_invalidate_during_revalidation_does_not_restore_old_row(clock):
+    cache, loader = _cache(), Loader("active", "revoked")
+
+    async def main():
+        await cache.get("k", loader)
+        clock.now += 10
+        loader.gate = asyncio.Event()
+        assert await cache.get("k", loader) == "active"
+        await asyncio.sleep(0)
+        cache.invalidate("k")
+        loader.gate.set()
+        await asyncio.sleep(0.01)
+        loader.gate = None
+        assert cache.stats() == {"items": 0, "hits": 1, "misses": 1, "revalidating": 0}
+        assert await cache.get("k", loader) == "revoked"
+
+    asyncio.run(main())
+
+def test_invalidate_during_miss_does_not_store(clock):
+    cache, loader = _cache(), Loader("active", "revoked")
+
+    async def main():
+        loader.gate = asyncio.Event()
+        first = asyncio.ensure_future(cache.get("k", loader))
+        await asyncio.sleep(0)
+        cache.invalidate("k")
+        loader.gate.set()
+        # Quem já esperava recebe a resposta da consulta dele
+        assert await first == "active"
+        loader.gate = None
+        assert await cache.get("k", loader) == "revoked"
+
+    asyncio.run(main())
+
+def test_auth_single_flight_is_not_shared_across_invalidate(monkeypatch):
+    queries = []
+
+    async def query(email):
+        queries.append(email)
+        n = len(queries)
+        await asyncio.sleep(0.01)
+        return n
+
+    monkeypatch.setattr(auth, "_query_user_access", query)
+
+    async def main():
+        first = asyncio.ensure_future(auth.fetch_user_access("ana@example.com"))
+        joined = asyncio.ensure_future(auth.fetch_user_access("ana@example.com"))
+        await asyncio.sleep(0)
+        resilience.user_access_cache.invalidate("ana@example.com")
+        after = asyncio.ensure_future(auth.fetch_user_access("ana@example.com"))
+        return await first, await joined, await after
+
+    assert asyncio.run(main()) == (1, 1, 2)
+    assert not auth._inflight
@@ -0,0 +1,131 @@
+# tests/test_status.py
+import json
+
+import pytest
+
+import server
+from server import _decode_status_cursor, _encode_status_cursor
+
+def _rows():
+    # Timestamps repetidos de propósito: o desempate por id é o que o cursor testa
+    rows = []
+    for i in range(23):
+        rows.append({
+            "id": f"{(i * 7919) % 1000:08d}-0000-4000-8000-{i:012d}",
+            "client_name": "alpha" if i % 3 else "beta",
+            "timestamp": f"2024-05-01T10:00:{i // 4:02d}+00:00",
+        })
+    return rows
+
+def _expected(rows, desc=True, client_name=None):
+    out = [r for r in rows if client_name is None or r["client_name"] == client_name]
+    return sorted(out, key=lambda r: (r["timestamp"], r["id"]), reverse=desc)
+
+@pytest.fixture
+def status_rows(fake):
+    fake.tables["status_checks"] = _rows()
+    return fake.tables["status_checks"]
+
+def _walk(client, params):
+    seen, cursor, pages = [], None, 0
+    while True:
+        r = client.get("/api/status", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += r.json()
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen, pages
+        assert 'rel="next"' in r.headers["Link"]
+
+def test_cursor_round_trip():
+    row = {"timestamp": "2024-05-01T10:00:03+00:00", "id": "6f1c2a5e-0d1b-4c9e-9a57-3f2b8d4e1a20", "client_name": "x"}
+    cursor = _encode_status_cursor(row)
+    assert "=" not in cursor
+    assert _decode_status_cursor(cursor) == (row["timestamp"], row["id"])
+
+def _cursor(ts, id_):
+    return _encode_status_cursor({"timestamp": ts, "id": id_})
+
+@pytest.mark.parametrize("cursor", [
+    "???",
+    "bm90LWpzb24",
+    "WzFd",
+    _cursor(1, 2),
+    # Tentativas de sair das aspas do filtro or_
+    _cursor('2024-05-01T10:00:03+00:00",id.gt."0', "6f1c2a5e-0d1b-4c9e-9a57-3f2b8d4e1a20"),
+    _cursor("2024-05-01T10:00:03+00:00", 'x"),client_name.eq.(beta'),
+])
+def test_invalid_cursor_is_400(client, status_rows, cursor):
+    assert client.get("/api/status", params={"cursor": cursor}).status_code == 400
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_keyset_pages_cover_every_row_once(client, status_rows, order):
+    seen, pages = _walk(client, {"limit": 4, "order": order})
+    assert seen == _expected(status_rows, desc=order == "desc")
+    assert pages == 6
+
+def test_default_order_is_newest_first(client, status_rows):
+    assert client.get("/api/status", params={"limit": 3}).json() == _expected(status_rows)[:3]
+
+def test_filters_combine_with_cursor(client, status_rows):
+    seen, _ = _walk(client, {"limit": 2, "client_name": "beta"})
+    assert seen == _expected(status_rows, client_name="beta")
+    r = client.get("/api/status", params={
+        "since": "2024-05-01T10:00:01+00:00", "until": "2024-05-01T10:00:03+00:00", "order": "asc",
+    })
+    assert [row["timestamp"][17:19] for row in r.json()] == ["01"] * 4 + ["02"] * 4
+
+def test_fields_projection_strips_cursor_columns(client, status_rows):
+    seen, _ = _walk(client, {"limit": 5, "fields": "client_name"})
+    assert seen == [{"client_name": r["client_name"]} for r in _expected(status_rows)]
+
+def test_unknown_field_is_422(client, status_rows):
+    assert client.get("/api/status", params={"fields": "client_name,secret"}).status_code == 422
+    assert client.get("/api/status", params={"fields": ","}).status_code == 422
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_ndjson_streams_every_page(client, status_rows, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_STREAM_PAGE", 5)
+    r = client.get("/api/status", params={"format": "ndjson", "order": "asc", "fields": "id"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert _ndjson(r) == [{"id": row["id"]} for row in _expected(status_rows, desc=False)]
+
+def test_ndjson_by_accept_header_resumes_from_cursor(client, status_rows, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_STREAM_PAGE", 4)
+    expected = _expected(status_rows)
+    first = client.get("/api/status", params={"limit": 6})
+    r = client.get(
+        "/api/status",
+        params={"cursor": first.headers["X-Next-Cursor"]},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert _ndjson(r) == expected[6:]
+
+def test_bulk_insert_accepts_array_and_ndjson(client, fake):
+    r = client.post("/api/status/bulk", json=[{"client_name": "a"}, {"client_name": "b"}])
+    assert r.json() == {"accepted": 2}
+    body = b'{"client_name": "c"}\n\n{"client_name": "d"}'
+    r = client.post("/api/status/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert r.json() == {"accepted": 2}
+    assert [row["client_name"] for row in fake.tables["status_checks"]] == ["a", "b", "c", "d"]
+
+def test_bulk_rejects_invalid_item_with_accepted_count(client, fake):
+    r = client.post("/api/status/bulk", json=[{"client_name": "a"}, {"nope": 1}])
+    assert r.status_code == 422
+    assert "Item 1" in r.json()["detail"]
+    assert "status_checks" not in fake.tables or fake.tables["status_checks"] == []
+
+def test_bulk_body_is_capped_before_parsing(client, fake, monkeypatch):
+    monkeypatch.setattr(server, "STATUS_BULK_MAX_BYTES", 64)
+    items = [{"client_name": f"client-{i}"} for i in range(10)]
+    assert client.post("/api/status/bulk", json=items).status_code == 413
+    # Sem Content-Length (chunked): corta pelo que já foi lido
+    def chunks():
+        yield b'{"client_name": "a"}\n' * 10
+
+    r = client.post("/api/status/bulk", content=chunks(), headers={"Content-Type": "application/x-ndjson"})
+    assert r.status_code == 413
+    assert client.post("/api/status/bulk", json=items[:1]).json() == {"accepted": 1}
@@ -0,0 +1,69 @@
+# tests/test_status_writer.py
+import asyncio
+
+from postgrest.exceptions import APIError
+
+import status_writer
+from resilience import SupabaseUnavailable
+from status_writer import StatusWriter
+
+class FlakyInsert:
+    # Falha com os erros da lista, em ordem, depois grava
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.rows = []
+        self.calls = 0
+
+    async def __call__(self, query):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        self.rows.extend(query)
+
+class FakeTable:
+    def insert(self, rows):
+        return rows
+
+class FakeClient:
+    def table(self, name):
+        return FakeTable()
+
+def _writer(monkeypatch, insert, **kwargs):
+    async def get_client():
+        return FakeClient()
+
+    monkeypatch.setattr(status_writer, "get_client", get_client)
+    monkeypatch.setattr(status_writer, "execute", insert)
+    return StatusWriter(flush_interval=0.01, retry_backoff=0.001, **kwargs)
+
+def _run(writer, rows):
+    async def main():
+        await writer.start()
+        for row in rows:
+            await writer.submit(row)
+        await writer.stop()
+
+    asyncio.run(main())
+
+def test_infra_failures_are_retried(monkeypatch):
+    insert = FlakyInsert(SupabaseUnavailable("circuit_open", 0.001), TimeoutError())
+    writer = _writer(monkeypatch, insert)
+    _run(writer, [{"client_name": "a"}, {"client_name": "b"}])
+    assert insert.rows == [{"client_name": "a"}, {"client_name": "b"}]
+    assert writer.stats()["retries"] == 2
+    assert writer.stats()["failed"] == 0
+
+def test_batch_dropped_after_max_retries(monkeypatch):
+    insert = FlakyInsert(*(SupabaseUnavailable("timeout", 0.001) for _ in range(3)))
+    writer = _writer(monkeypatch, insert, max_retries=2)
+    _run(writer, [{"client_name": "a"}])
+    assert insert.calls == 3
+    assert writer.stats()["failed"] == 1
+
+def test_request_error_is_not_retried(monkeypatch):
+    insert = FlakyInsert(APIError({"message": "bad column", "code": "42703"}))
+    writer = _writer(monkeypatch, insert)
+    _run(writer, [{"client_name": "a"}])
+    assert insert.calls == 1
+    assert writer.stats()["retries"] == 0
+    assert writer.stats()["failed"] == 1
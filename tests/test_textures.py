@@ -0,0 +1,82 @@
+# tests/test_textures.py
+import asyncio
+import io
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+import textures
+
+def _png(color, size=(8, 8)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(textures, "TEXTURE_DIR", tmp_path)
+    monkeypatch.setattr(textures, "_store_bytes", None)
+    return tmp_path
+
+def _upload(client, data):
+    return client.post("/api/textures", files={"file": ("t.png", data, "image/png")})
+
+def test_upload_dedupes_and_serves_levels(client, store):
+    first = _upload(client, _png((255, 0, 0))).json()
+    assert first["deduplicated"] is False
+    assert [lv["width"] for lv in first["levels"]] == [8, 4, 2, 1]
+    assert _upload(client, _png((255, 0, 0))).json()["deduplicated"] is True
+    r = client.get(f"/api/textures/{first['id']}/image", params={"level": 1})
+    assert r.status_code == 200
+    assert r.content == (textures._texture_dir(first["id"]) / "L1.png").read_bytes()
+    etag = r.headers["etag"]
+    assert client.get(f"/api/textures/{first['id']}/image", params={"level": 1}, headers={"If-None-Match": etag}).status_code == 304
+
+def test_mapped_chunks_are_views(store, monkeypatch):
+    monkeypatch.setattr(textures, "CHUNK", 16)
+    path = store / "blob"
+    path.write_bytes(bytes(range(40)))
+    mm = textures.MappedFiles(4).get(path)
+    chunks = list(textures._iter_mapped(mm))
+    assert all(isinstance(c, memoryview) for c in chunks)
+    assert [len(c) for c in chunks] == [16, 16, 8]
+    assert b"".join(chunks) == bytes(range(40))
+
+def test_store_evicts_least_recently_served(client, store, monkeypatch):
+    old = _upload(client, _png((1, 2, 3))).json()["id"]
+    size = textures._folder_size(textures._texture_dir(old))
+    # Cabe uma textura e meia
+    monkeypatch.setattr(textures, "TEXTURE_STORE_MB", size * 1.5 / (1024 * 1024))
+    monkeypatch.setattr(textures, "_store_bytes", None)
+    past = time.time() - 600
+    os.utime(textures._texture_dir(old) / "manifest.json", (past, past))
+    new = _upload(client, _png((4, 5, 6))).json()["id"]
+    assert client.get(f"/api/textures/{old}").status_code == 404
+    assert client.get(f"/api/textures/{new}").status_code == 200
+    assert textures._store_bytes <= size * 1.5
+
+def test_concurrent_ingests_are_bounded(monkeypatch):
+    running, peak = 0, 0
+
+    def slow_ingest(data):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        time.sleep(0.05)
+        running -= 1
+        return {"id": "x"}
+
+    async def main():
+        monkeypatch.setattr(textures, "_ingest_slots", asyncio.Semaphore(1))
+        monkeypatch.setattr(textures, "TEXTURE_MAX_QUEUED", 1)
+        monkeypatch.setattr(textures, "ingest", slow_ingest)
+        return await asyncio.gather(*(textures._ingest_limited(b"") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert peak == 1
+    assert results.count({"id": "x"}) == 2
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1 and rejected[0].status_code == 503